@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+搜索前沿策略基准测试：用录制的磁带离线比较 DFS 与 best-first
+
+使用方法:
+    python benchmark_frontier.py data/cassette.jsonl.gz
+    python benchmark_frontier.py data/cassette.jsonl.gz --requests 2000 --max-depth 3
+
+每个策略都从同一份磁带回放，在相同的请求预算内运行收集器，输出每 1000 个请求
+发现的新标签数。磁带中没有录制的请求按未命中计入预算（真实运行同样要消耗请求），
+未命中比例过高说明磁带覆盖不足，应先用 PIXIV_CASSETTE_MODE=record 录制更长的运行。
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from src.api.cassette import Cassette
+from src.api.client import NetworkClient
+from src.api.search import SearchAPI
+from src.frontier import FRONTIERS
+from src.recommendation_collector import RecommendationBasedCollector
+from src.storage import TagStorage
+
+logging.basicConfig(
+    level=getattr(logging, os.getenv("LOG_LEVEL", "WARNING").upper()),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_strategy(
+    cassette_path: str, strategy: str, budget: int, max_depth: int
+) -> dict:
+    """在请求预算内用指定前沿策略回放一次收集"""
+    cassette = Cassette(cassette_path, Cassette.REPLAY)
+    client = NetworkClient(cassette=cassette)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = TagStorage(os.path.join(tmp_dir, "tags.json"))
+        collector = RecommendationBasedCollector(
+            SearchAPI(client), storage, max_depth=max_depth, frontier=strategy
+        )
+        collector.set_stop_flag(
+            lambda: cassette.replayed + cassette.misses >= budget
+        )
+
+        start = time.perf_counter()
+        new_tags = collector.collect_from_recommendations()
+        elapsed = time.perf_counter() - start
+        client.close()
+        storage.close()
+
+    requests = cassette.replayed + cassette.misses
+    return {
+        "strategy": strategy,
+        "requests": requests,
+        "misses": cassette.misses,
+        "new_tags": new_tags,
+        "per_1000": new_tags * 1000 / requests if requests else 0.0,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较搜索前沿策略的发现效率")
+    parser.add_argument("cassette", help="录制的磁带文件 (PIXIV_CASSETTE_MODE=record)")
+    parser.add_argument("--requests", type=int, default=1000, help="每个策略的请求预算")
+    parser.add_argument("--max-depth", type=int, default=int(os.getenv("MAX_DEPTH", "3")))
+    parser.add_argument(
+        "--strategies", nargs="+", default=list(FRONTIERS), choices=list(FRONTIERS)
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cassette):
+        logger.error(f"磁带文件不存在: {args.cassette}")
+        return 1
+
+    # 基准测试只在内存和临时目录中进行，不写入正式数据
+    os.environ["PERSISTENT_MODE"] = "json"
+
+    print(f"{'策略':<12}{'请求数':>8}{'未命中':>8}{'新标签':>8}{'每千请求':>10}{'用时(s)':>10}")
+    for strategy in args.strategies:
+        result = run_strategy(args.cassette, strategy, args.requests, args.max_depth)
+        print(
+            f"{result['strategy']:<12}{result['requests']:>8}{result['misses']:>8}"
+            f"{result['new_tags']:>8}{result['per_1000']:>10.1f}{result['elapsed']:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+标签模型内存基准测试：用 tracemalloc 比较 PixivTag 与普通 dataclass 的内存占用
+
+使用方法:
+    python benchmark_models.py
+    python benchmark_models.py --tags 1000000 --distinct 50000
+
+模拟收集时的情况：每个标签对象都从新解析的 API 响应数据创建（标签名是新的字符串对象），
+共 --tags 个标签对象、--distinct 个不同的标签名。对照组是字段相同、
+没有 __slots__ 和字符串驻留的普通 dataclass。
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from src.models import PixivTag
+
+
+@dataclass
+class PlainTag:
+    """对照组：与 PixivTag 字段相同的普通 dataclass"""
+
+    name: str
+    official_translation: Optional[str] = None
+    chinese_translation: str = ""
+    english_translation: str = ""
+    frequency: int = 0
+    chinese_reviewed: bool = False
+    english_reviewed: bool = False
+
+
+def measure(cls, payloads) -> dict:
+    """从 API 响应数据创建全部标签对象，返回 tracemalloc 统计"""
+    gc.collect()
+    tracemalloc.start()
+    tags = []
+    for payload in payloads:
+        # 每个响应单独解析，与真实收集一样得到新的字符串对象
+        for tag_data in json.loads(payload)["tags"]:
+            tags.append(
+                cls(
+                    name=tag_data["name"],
+                    official_translation=tag_data.get("translated_name"),
+                    frequency=1,
+                )
+            )
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(tags)
+    del tags
+    return {"count": count, "current": current, "peak": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较标签模型的内存占用")
+    parser.add_argument("--tags", type=int, default=1000000, help="标签对象数")
+    parser.add_argument("--distinct", type=int, default=50000, help="不同标签名数")
+    parser.add_argument("--per-illust", type=int, default=10, help="每个插画的标签数")
+    args = parser.parse_args()
+
+    # 预先序列化好的插画响应，不计入测量
+    payloads = []
+    for start in range(0, args.tags, args.per_illust):
+        tags = [
+            {
+                "name": f"オリジナル{(i * 7919) % args.distinct}",
+                "translated_name": f"original {(i * 7919) % args.distinct}" if i % 3 == 0 else None,
+            }
+            for i in range(start, min(start + args.per_illust, args.tags))
+        ]
+        payloads.append(json.dumps({"tags": tags}, ensure_ascii=False))
+
+    print(f"{'模型':<12}{'对象数':>10}{'占用(MB)':>12}{'峰值(MB)':>12}{'每个(字节)':>12}")
+    for label, cls in (("PlainTag", PlainTag), ("PixivTag", PixivTag)):
+        result = measure(cls, payloads)
+        print(
+            f"{label:<12}{result['count']:>10}{result['current'] / 1024 / 1024:>12.1f}"
+            f"{result['peak'] / 1024 / 1024:>12.1f}{result['current'] / result['count']:>12.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
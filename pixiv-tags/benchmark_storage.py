@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+标签加载基准测试：比较 SQLite 模式下全量加载与按需加载的启动时间和峰值内存
+
+使用方法:
+    python benchmark_storage.py
+    python benchmark_storage.py --sizes 100000 1000000 --data-dir /tmp/pixiv-bench
+
+对每个规模生成（或复用）一个合成标签库，在独立子进程中分别以
+TAG_LOADING=full 和 TAG_LOADING=lazy 执行 load_to_memory()，并查询一批标签，
+输出启动用时和子进程峰值 RSS。
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from src.sqlite_connection import SQLiteConnectionManager
+from src.sqlite_storage import SQLiteStorage
+
+
+def build_database(path: str, size: int):
+    """生成含 size 个合成标签的数据库（已存在且规模一致时复用）"""
+    storage = SQLiteStorage(path, SQLiteConnectionManager(path))
+    storage.init()
+    existing = storage.count()
+    if existing == size:
+        storage.close()
+        return
+    if existing:
+        storage.close()
+        raise SystemExit(f"{path} 已有 {existing} 个标签，请换一个目录")
+
+    print(f"生成 {size} 个标签: {path}", file=sys.stderr)
+    batch = 100000
+    with storage._get_connection() as conn:
+        for start in range(0, size, batch):
+            conn.executemany(
+                "INSERT INTO pixiv_tags (name, official_translation, frequency) "
+                "VALUES (?, ?, ?)",
+                (
+                    (f"合成タグ{i:08d}", f"tag {i}" if i % 3 == 0 else None, i % 97 + 1)
+                    for i in range(start, min(start + batch, size))
+                ),
+            )
+            conn.commit()
+    storage.close()
+
+
+def measure(path: str, mode: str, lookups: int) -> dict:
+    """在当前进程中加载标签并查询，返回用时和峰值 RSS（子进程中调用）"""
+    os.environ["PERSISTENT_MODE"] = "sqlite"
+    os.environ["SQLITE_DB_PATH"] = path
+    os.environ["TAG_LOADING"] = mode
+    os.environ["WRITE_BEHIND"] = "false"
+    from src.storage import TagStorage
+
+    start = time.perf_counter()
+    storage = TagStorage()
+    count = storage.load_to_memory()
+    load_seconds = time.perf_counter() - start
+
+    # 一半已存在、一半不存在的名称，模拟收集时的标签查询
+    names = [
+        f"合成タグ{i * 7919 % count:08d}" if i % 2 else f"新タグ{i}"
+        for i in range(lookups)
+    ]
+    start = time.perf_counter()
+    for offset in range(0, len(names), 300):
+        storage.prefetch(names[offset : offset + 300])
+        for name in names[offset : offset + 300]:
+            storage.is_tag_in_memory(name)
+    lookup_seconds = time.perf_counter() - start
+    storage.close()
+
+    return {
+        "tags": count,
+        "load_seconds": load_seconds,
+        "lookup_us": lookup_seconds / lookups * 1e6 if lookups else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较全量加载与按需加载的启动开销")
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=[100000, 1000000, 5000000]
+    )
+    parser.add_argument("--data-dir", default="data/benchmark")
+    parser.add_argument("--modes", nargs="+", default=["full", "lazy"])
+    parser.add_argument("--lookups", type=int, default=30000)
+    parser.add_argument("--measure", nargs=2, metavar=("DB", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], args.measure[1], args.lookups)))
+        return 0
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f"{'标签数':>10}{'模式':>6}{'启动(s)':>10}{'查询(us)':>10}{'峰值RSS(MB)':>14}")
+    for size in args.sizes:
+        path = os.path.join(args.data_dir, f"tags_{size}.db")
+        build_database(path, size)
+        for mode in args.modes:
+            # 每次测量在新进程中进行，峰值 RSS 互不影响
+            proc = subprocess.run(
+                [sys.executable, __file__, "--measure", path, mode, "--lookups", str(args.lookups)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{size:>10}{mode:>6}  失败: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"{size:>10}{mode:>6}{result['load_seconds']:>10.2f}"
+                f"{result['lookup_us']:>10.1f}{result['peak_rss_mb']:>14.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
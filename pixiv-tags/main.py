@@ -5,9 +5,16 @@ import sys
 
 from dotenv import load_dotenv
 from src.api.auth import AuthAPI
-from src.api.client import NetworkClient
-from src.api.search import SearchAPI
+from src.api.cassette import Cassette
+from src.api.client import AsyncNetworkClient, NetworkClient
+from src.api.rate_limiter import AdaptiveRateLimiter
+from src.api.response_cache import ResponseCache
+from src.api.search import AsyncSearchAPI, SearchAPI
+from src.crawl_state import CrawlState, bind_tag_store
 from src.recommendation_collector import RecommendationBasedCollector
+from src.recrawl import RecrawlScheduler
+from src.seen_filter import SeenIllustFilter
+from src import shutdown
 from src.storage import TagStorage
 
 # 加载环境变量
@@ -28,23 +35,13 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# 全局变量用于优雅退出
-should_stop = False
-
-
 def signal_handler(signum, frame):
-    """处理 Ctrl+C 信号"""
-    global should_stop
-    should_stop = True
+    """处理 Ctrl+C 信号：设置退出信号，立即唤醒所有挂起的等待"""
+    shutdown.request_stop()
     logger.info("\n收到退出信号，正在优雅退出...")
     logger.info("数据已自动保存，程序将安全退出")
 
 
-def get_should_stop():
-    """获取停止标志"""
-    return should_stop
-
-
 def main():
     """主函数"""
     # 注册信号处理器
@@ -53,59 +50,131 @@ def main():
 
     # 从环境变量读取配置
     max_depth = int(os.getenv("MAX_DEPTH", "3"))
-    wait_time_429 = int(os.getenv("PIXIV_429_WAIT_TIME", "300"))  # 默认5分钟
+    wait_time_429 = int(os.getenv("PIXIV_429_WAIT_TIME", "300"))  # 退避上限，默认5分钟
+    base_wait_429 = float(os.getenv("PIXIV_429_BASE_WAIT", "5"))  # 首次退避，默认5秒
     max_429_retries = int(os.getenv("PIXIV_429_MAX_RETRIES", "3"))  # 默认3次
     tags_file_path = os.getenv("TAGS_FILE_PATH", "data/tags.json")
     save_interval = int(os.getenv("SAVE_INTERVAL", "20"))
+    requests_per_second = float(os.getenv("PIXIV_REQUESTS_PER_SECOND", "1"))
+    min_requests_per_second = float(os.getenv("PIXIV_MIN_REQUESTS_PER_SECOND", "0.2"))
+    max_requests_per_second = float(os.getenv("PIXIV_MAX_REQUESTS_PER_SECOND", "5"))
+    concurrency = int(os.getenv("COLLECT_CONCURRENCY", "1"))
+    # recommend: 从推荐流发现新标签；recrawl: 按调度重新搜索到期的已知标签
+    collect_mode = os.getenv("COLLECT_MODE", "recommend").lower()
 
     logger.info("🚀 启动 Pixiv 标签收集器 - 推荐流深度优先模式")
     logger.info("按 Ctrl+C 可以安全退出程序")
-    logger.info("💡 推荐模式为无状态，每次重启都会获取新的推荐内容")
+    logger.info("💡 收集进度保存在检查点中，中断后重启会从中断处继续")
     logger.info(
-        f"⚙️  配置: 深度限制={max_depth}, 429等待={wait_time_429 // 60}分钟, 429重试={max_429_retries}次, 保存间隔={save_interval}个标签"
+        f"⚙️  配置: 深度限制={max_depth}, 429退避={base_wait_429:g}~{wait_time_429}秒, 429重试={max_429_retries}次, 保存间隔={save_interval}个标签"
     )
+    logger.info(
+        f"⚙️  请求速率: 初始 {requests_per_second} 次/秒 "
+        f"(自适应范围 {min_requests_per_second}~{max_requests_per_second}), "
+        f"并发搜索: {concurrency}"
+    )
+
+    # 录制/回放磁带：回放模式下不访问 Pixiv，也不需要认证
+    cassette = Cassette.from_env()
+    if cassette:
+        logger.info(f"📼 磁带{cassette.mode}模式: {cassette.path}")
 
     # 初始化组件
     try:
+        # 同步与异步客户端共享同一个自适应速率预算
+        rate_limiter = AdaptiveRateLimiter(
+            requests_per_second,
+            min_rate=min_requests_per_second,
+            max_rate=max_requests_per_second,
+            base_backoff=base_wait_429,
+            max_backoff=wait_time_429,
+        )
         client = NetworkClient(
-            wait_time_429=wait_time_429, max_429_retries=max_429_retries
+            wait_time_429=wait_time_429,
+            max_429_retries=max_429_retries,
+            rate_limiter=rate_limiter,
+            defer_429=True,
+            cassette=cassette,
+        )
+        auth_api = None
+        if not (cassette and cassette.replaying):
+            auth_api = AuthAPI(client)
+            # 设置自动 token 刷新
+            auth_api.setup_token_refresh()
+        # 响应缓存按账号区分，有效期内重复的查询不再消耗请求
+        response_cache = ResponseCache.from_env(
+            ResponseCache.account_id(auth_api.refresh_token if auth_api else None)
         )
-        auth_api = AuthAPI(client)
-        search_api = SearchAPI(client)
+        search_api = SearchAPI(client, cache=response_cache)
         storage = TagStorage(tags_file_path)
 
-        # 设置自动 token 刷新
-        auth_api.setup_token_refresh()
+        # 并发模式：异步客户端的 token 由同步客户端的认证统一维护
+        async_search_api = None
+        if concurrency > 1:
+            async_client = AsyncNetworkClient(
+                wait_time_429=wait_time_429,
+                max_429_retries=max_429_retries,
+                rate_limiter=rate_limiter,
+                defer_429=True,
+                cassette=cassette,
+            )
+            if auth_api:
+                auth_api.attach_client(async_client)
+            async_search_api = AsyncSearchAPI(async_client, cache=response_cache)
 
         # 认证
-        logger.info("Authenticating with refresh token...")
-        auth_api.login_with_refresh_token()
-        logger.info("Authentication successful")
+        if auth_api:
+            logger.info("Authenticating with refresh token...")
+            auth_api.login_with_refresh_token()
+            logger.info("Authentication successful")
 
         # 加载现有标签到内存
         initial_count = storage.load_to_memory()
         logger.info(f"Loaded {initial_count} existing tags from storage")
 
+        # 收集进度检查点与标签数据放在一起（SQLite 模式下为同一个数据库文件）
+        crawl_state = None
+        if os.getenv("CRAWL_CHECKPOINT", "true").lower() == "true":
+            crawl_state = CrawlState(storage.state_path)
+        # 已处理插画集合：同一插画在不同标签的搜索中反复出现时只计数一次
+        seen_filter = None
+        if os.getenv("SEEN_ILLUST_FILTER", "true").lower() == "true":
+            seen_filter = SeenIllustFilter(storage.state_path)
+        # 标签库被删除、重置或更换后不再沿用旧的进度
+        if crawl_state is not None or seen_filter is not None:
+            bind_tag_store(
+                (crawl_state or seen_filter).connection_manager,
+                storage.store_identity,
+                storage.get_memory_count(),
+            )
+
         # 使用推荐流收集器
         logger.info(f"🎯 使用推荐流模式 (深度限制: {max_depth})")
         collector = RecommendationBasedCollector(
-            search_api, storage, max_depth=max_depth
+            search_api,
+            storage,
+            max_depth=max_depth,
+            async_search_api=async_search_api,
+            concurrency=concurrency,
+            crawl_state=crawl_state,
+            seen_filter=seen_filter,
         )
         collector.load_existing_data()
-        collector.set_stop_flag(get_should_stop)
 
         # 收集新标签
-        logger.info("开始从推荐流深度优先收集标签...")
-        new_tags_count = collector.collect_from_recommendations()
+        if collect_mode == "recrawl":
+            logger.info("开始按调度重新搜索已知标签...")
+            new_tags_count = collector.recrawl_known_tags(RecrawlScheduler.from_env())
+        else:
+            logger.info("开始从推荐流深度优先收集标签...")
+            new_tags_count = collector.collect_from_recommendations()
 
         # 最终统计
         final_count = storage.get_memory_count()
 
         # 分析翻译统计和频率统计
-        all_tags = storage.get_memory_tags()
-        translated_count = sum(1 for tag in all_tags if tag.official_translation)
-        total_frequency = sum(tag.frequency for tag in all_tags)
-        avg_frequency = total_frequency / len(all_tags) if all_tags else 0
+        tag_count, total_frequency, translated_count = storage.frequency_summary()
+        avg_frequency = total_frequency / tag_count if tag_count else 0
 
         logger.info("🎉 收集完成！")
         logger.info(f"发现新标签: {new_tags_count} 个，总计: {final_count} 个")
@@ -148,6 +217,13 @@ def main():
         # 清理资源
         if "client" in locals():
             client.close()
+        if cassette:
+            cassette.close()
+        if "response_cache" in locals() and response_cache:
+            response_cache.log_stats()
+            response_cache.close()
+        if "storage" in locals():
+            storage.close()
         logger.info("Pixiv Tags Collector finished")
 
 
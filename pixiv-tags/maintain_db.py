@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Pixiv 标签数据库维护脚本
+
+使用方法:
+    python maintain_db.py rebuild-fts          重建 FTS5 全文索引
+    python maintain_db.py check-stats [--fix]  校验审核统计计数，--fix 时修正偏差
+    python maintain_db.py reset-translation-failures [--all]
+                                               清除已达到最多尝试次数的翻译失败记录，
+                                               --all 时同时清除仍在退避中的记录
+
+环境变量配置（.env 文件）:
+    SQLITE_DB_PATH=data/pixiv_tags.db
+    TRANSLATE_MAX_ATTEMPTS=5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from src.sqlite_storage import SQLiteStorage
+from src.translation_failures import TranslationFailureLog
+
+load_dotenv()
+
+logging.basicConfig(
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper()),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_fts(storage: SQLiteStorage) -> int:
+    """重建 FTS5 全文索引"""
+    logger.info("开始重建 FTS5 索引...")
+    start_time = time.time()
+    count = storage.rebuild_fts_index()
+    logger.info(f"FTS5 索引重建完成: {count:,} 个标签，用时 {time.time() - start_time:.1f} 秒")
+    return 0
+
+
+def check_stats(storage: SQLiteStorage, fix: bool) -> int:
+    """校验审核统计计数表与实际数据是否一致"""
+    report = storage.check_review_counts(fix=fix)
+    has_drift = False
+    for language, result in report.items():
+        stored, actual, drift = result["stored"], result["actual"], result["drift"]
+        logger.info(
+            f"[{language}] 计数表: 总数 {stored['total']:,}，已审核 {stored['reviewed']:,} | "
+            f"实际: 总数 {actual['total']:,}，已审核 {actual['reviewed']:,}"
+        )
+        if any(drift.values()):
+            has_drift = True
+            logger.warning(
+                f"[{language}] 计数偏差: 总数 {drift['total']:+,}，已审核 {drift['reviewed']:+,}"
+            )
+
+    if not has_drift:
+        logger.info("审核统计计数一致")
+        return 0
+    if fix:
+        logger.info("已按实际数据修正审核统计计数")
+        return 0
+    logger.warning("发现计数偏差，可使用 --fix 修正")
+    return 1
+
+
+def reset_translation_failures(storage: SQLiteStorage, include_waiting: bool) -> int:
+    """清除翻译失败记录，让已放弃的标签在下次运行 translate_with_llm.py 时重新翻译"""
+    failures = TranslationFailureLog.from_env(storage.db_path, storage.connection_manager)
+    waiting, exhausted = failures.summary()
+    logger.info(
+        f"翻译失败记录: 退避中 {waiting:,} 个，"
+        f"已达到最多尝试次数 ({failures.max_attempts} 次) {exhausted:,} 个"
+    )
+    count = failures.reset(include_waiting=include_waiting)
+    logger.info(f"已清除 {count:,} 条翻译失败记录")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixiv 标签数据库维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild-fts", help="从 pixiv_tags 重建 FTS5 全文索引")
+    check_parser = subparsers.add_parser("check-stats", help="校验审核统计计数")
+    check_parser.add_argument("--fix", action="store_true", help="用实际数据修正计数")
+    reset_parser = subparsers.add_parser(
+        "reset-translation-failures", help="清除已达到最多尝试次数的翻译失败记录"
+    )
+    reset_parser.add_argument(
+        "--all", action="store_true", help="同时清除仍在退避中的失败记录"
+    )
+    args = parser.parse_args()
+
+    db_path = os.getenv("SQLITE_DB_PATH", "data/pixiv_tags.db")
+    if not os.path.exists(db_path):
+        logger.error(f"数据库文件不存在: {db_path}")
+        return 1
+
+    logger.info(f"数据库: {db_path}")
+    storage = SQLiteStorage(db_path)
+    try:
+        if args.command == "rebuild-fts":
+            return rebuild_fts(storage)
+        if args.command == "check-stats":
+            return check_stats(storage, args.fix)
+        if args.command == "reset-translation-failures":
+            return reset_translation_failures(storage, args.all)
+    finally:
+        storage.close()
+
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
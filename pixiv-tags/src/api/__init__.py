@@ -1,6 +1,20 @@
 # API 模块
-from .client import NetworkClient
+from .cassette import Cassette, CassetteMissError
+from .client import AsyncNetworkClient, NetworkClient, RateLimitedError
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
 from .auth import AuthAPI
-from .search import SearchAPI
+from .search import AsyncSearchAPI, SearchAPI
 
-__all__ = ["NetworkClient", "AuthAPI", "SearchAPI"]
+__all__ = [
+    "NetworkClient",
+    "AsyncNetworkClient",
+    "RateLimitedError",
+    "Cassette",
+    "CassetteMissError",
+    "RateLimiter",
+    "ResponseCache",
+    "AuthAPI",
+    "SearchAPI",
+    "AsyncSearchAPI",
+]
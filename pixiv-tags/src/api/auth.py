@@ -1,8 +1,8 @@
 import os
 import logging
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
-from .client import NetworkClient
+from .client import BaseNetworkClient, NetworkClient
 
 
 logger = logging.getLogger(__name__)
@@ -13,6 +13,8 @@ class AuthAPI:
 
     def __init__(self, client: NetworkClient):
         self.client = client
+        # 共享 access_token 的其他客户端（例如异步客户端）
+        self.attached_clients: List[BaseNetworkClient] = []
         load_dotenv()  # 加载 .env 文件
         self.refresh_token = os.getenv("REFRESH_TOKEN")
 
@@ -42,6 +44,8 @@ class AuthAPI:
                 raise ValueError("No access token in response")
 
             self.client.access_token = access_token
+            for attached in self.attached_clients:
+                attached.access_token = access_token
             logger.info("Successfully obtained access token")
             return access_token
 
@@ -57,3 +61,11 @@ class AuthAPI:
             self.login_with_refresh_token()
 
         self.client._refresh_token = refresh_token
+        for attached in self.attached_clients:
+            attached._refresh_token = refresh_token
+
+    def attach_client(self, client: BaseNetworkClient):
+        """让其他客户端共享本认证的 access_token 与刷新逻辑"""
+        self.attached_clients.append(client)
+        client.access_token = self.client.access_token
+        client._refresh_token = self.client._refresh_token
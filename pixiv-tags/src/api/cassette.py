@@ -0,0 +1,201 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMissError(KeyError):
+    """回放模式下磁带中没有该请求的录制响应"""
+
+
+class Cassette:
+    """请求录制/回放磁带，用于离线基准测试和回归测试
+
+    磁带是 gzip 压缩的 JSON Lines 文件，每行记录一次 GET 请求：
+    {"endpoint": ..., "params": ..., "response": ...}。录制模式下以追加方式
+    写入，每条记录后 flush。录制中断时文件末尾会留下不完整的 gzip 数据：回放时
+    读到该处为止，保留之前的全部记录；再次录制前先把可读的记录重写为完整的
+    文件再追加，因此中断最多丢失最后一条记录。
+
+    回放模式下同一 (endpoint, params) 的多次录制按录制顺序依次返回，
+    用完后重复最后一条，因此同一份磁带的每次回放结果完全相同。
+    latency 为每次回放前模拟的网络延迟（秒）。
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, path: str, mode: str, latency: float = 0.0):
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = max(0.0, latency)
+        self._lock = threading.Lock()
+        self._file = None
+        self._responses: Dict[str, List[Dict]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        if mode == self.REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._repair()
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            logger.info(f"Recording responses to cassette {path}")
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """根据 PIXIV_CASSETTE_MODE / PIXIV_CASSETTE_PATH / PIXIV_CASSETTE_LATENCY 创建磁带，未配置时返回 None"""
+        mode = os.getenv("PIXIV_CASSETTE_MODE", "").strip().lower()
+        if not mode or mode == "off":
+            return None
+        return cls(
+            os.getenv("PIXIV_CASSETTE_PATH", "data/cassette.jsonl.gz"),
+            mode,
+            latency=float(os.getenv("PIXIV_CASSETTE_LATENCY", "0")),
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == self.REPLAY
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == self.RECORD
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict]) -> str:
+        """请求的规范化键：参数按键名排序，值统一转为字符串"""
+        normalized = {str(k): str(v) for k, v in (params or {}).items()}
+        return json.dumps(
+            [endpoint, normalized], sort_keys=True, ensure_ascii=False
+        )
+
+    def _read_entries(self) -> Tuple[List[Dict], bool]:
+        """读取磁带中可解析的记录，返回 (记录, 文件末尾是否不完整)
+
+        逐块解压而不用 gzip.open：遇到录制中断留下的不完整 gzip 成员（之后可能
+        还追加过新的成员）时，gzip 模块会连同出错前已解压的整块数据一起丢弃。
+        """
+        entries: List[Dict] = []
+        buffer = b""
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        in_member = False
+        torn = False
+        with open(self.path, "rb") as f:
+            while not torn:
+                data = f.read(65536)
+                if not data:
+                    # 最后一个成员缺少结束标记
+                    torn = in_member
+                    break
+                while data:
+                    in_member = True
+                    backup = decompressor.copy()
+                    try:
+                        buffer += decompressor.decompress(data)
+                    except zlib.error:
+                        buffer += self._salvage(backup, data)
+                        torn = True
+                        break
+                    if not decompressor.eof:
+                        break
+                    # 一个成员结束，剩余数据属于下一次录制追加的成员
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    in_member = False
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    try:
+                        entries.append(json.loads(line.decode("utf-8")))
+                    except ValueError:
+                        logger.warning(f"Skipping malformed cassette entry in {self.path}")
+        # 没有换行结尾的最后一行是写到一半的记录
+        return entries, torn or bool(buffer.strip())
+
+    @staticmethod
+    def _salvage(decompressor, data: bytes) -> bytes:
+        """解压出错时整块输出都会丢失：逐字节重新解压，保留出错位置之前的内容"""
+        output = []
+        for i in range(len(data)):
+            try:
+                output.append(decompressor.decompress(data[i : i + 1]))
+            except zlib.error:
+                break
+        return b"".join(output)
+
+    def _repair(self):
+        """录制中断后把可读的记录重写为完整文件，避免在不完整的 gzip 数据后追加"""
+        if not os.path.exists(self.path):
+            return
+        entries, torn = self._read_entries()
+        if not torn:
+            return
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        logger.warning(
+            f"Cassette {self.path} ended with a truncated record; "
+            f"rewrote {len(entries)} readable responses"
+        )
+
+    def _load(self):
+        """读取磁带；末尾不完整的数据（录制中断）会被忽略，之前的记录照常回放"""
+        entries, torn = self._read_entries()
+        if torn:
+            logger.warning(f"Cassette {self.path} ends with a truncated record")
+        count = 0
+        for entry in entries:
+            key = self.make_key(entry["endpoint"], entry.get("params"))
+            self._responses[key].append(entry["response"])
+            count += 1
+        logger.info(
+            f"Loaded {count} responses ({len(self._responses)} distinct requests) "
+            f"from cassette {self.path}"
+        )
+
+    def record(self, endpoint: str, params: Optional[Dict], response: Dict):
+        """追加一条录制记录"""
+        line = json.dumps(
+            {"endpoint": endpoint, "params": params or {}, "response": response},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def replay(self, endpoint: str, params: Optional[Dict]) -> Dict:
+        """返回该请求的下一条录制响应"""
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for GET {endpoint} {params}")
+            index = min(self._cursors[key], len(responses) - 1)
+            self._cursors[key] += 1
+            self.replayed += 1
+        return responses[index]
+
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"Recorded {self.recorded} responses to cassette {self.path}")
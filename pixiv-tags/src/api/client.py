@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import logging
 import time
@@ -6,27 +7,62 @@ from typing import Dict, Optional
 
 import httpx
 
+from .. import shutdown
+from .cassette import Cassette
+from .rate_limiter import AdaptiveRateLimiter, RateLimiter, parse_retry_after
+
 logger = logging.getLogger(__name__)
 
 
-class NetworkClient:
-    """网络客户端，自动处理认证和错误重试"""
+API_BASE_URL = "https://app-api.pixiv.net"
 
-    def __init__(self, wait_time_429: int = 300, max_429_retries: int = 3):
-        self.session = httpx.Client(timeout=30.0)
+
+class RateLimitedError(Exception):
+    """请求被限流（429），retry_after 为限速器安排的重试等待秒数
+
+    客户端开启 defer_429 时抛出，由调用方把请求挂起到重试时刻，
+    期间继续处理其他工作，而不是阻塞等待。throttled 为 False 表示请求
+    因全局退避尚未发出，本身并没有收到 429。
+    """
+
+    def __init__(self, endpoint: str, retry_after: float, throttled: bool = True):
+        super().__init__(f"Too Many Requests: {endpoint} (retry after {retry_after:.1f}s)")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+class BaseNetworkClient:
+    """同步/异步网络客户端共用的请求头与认证逻辑"""
+
+    def __init__(
+        self,
+        wait_time_429: int = 300,
+        max_429_retries: int = 3,
+        rate_limiter: Optional[RateLimiter] = None,
+        defer_429: bool = False,
+        cassette: Optional[Cassette] = None,
+    ):
         self.access_token: Optional[str] = None
-        self._429_wait_time = wait_time_429  # 429等待时间（秒）
+        self._429_wait_time = wait_time_429  # 429退避时间上限（秒）
         self._max_429_retries = max_429_retries  # 最大429重试次数
+        # 多个客户端可共享同一个限速器；未提供时使用独立的自适应限速器
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(
+            max_backoff=wait_time_429
+        )
+        # True 时 429 不在客户端内等待重试，而是抛出 RateLimitedError
+        self.defer_429 = defer_429
+        # 录制模式下记录每个成功响应，回放模式下不访问网络
+        self.cassette = cassette
+
+    def _record(self, endpoint: str, params: Optional[Dict], data: Dict):
+        """录制模式下把成功响应写入磁带"""
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.record(endpoint, params, data)
 
     def _check_stop_signal(self):
         """检查全局停止信号"""
-        try:
-            # 导入main模块的全局变量
-            import main
-
-            return getattr(main, "should_stop", False)
-        except (ImportError, AttributeError):
-            return False
+        return shutdown.is_stopping()
 
     def _generate_fresh_headers(self) -> Dict[str, str]:
         """生成新的请求头（每次请求都重新生成时间戳和哈希）"""
@@ -74,48 +110,121 @@ class NetworkClient:
         logger.warning("Token refresh needed, but AuthAPI should handle this")
         raise RuntimeError("Token refresh failed - AuthAPI should handle this")
 
+    def _on_429(
+        self, endpoint: str, response: httpx.Response, retry_count: int
+    ) -> float:
+        """通知限速器发生限流，返回本请求重试前应等待的秒数
+
+        defer_429 模式下直接抛出 RateLimitedError，由调用方决定何时重试。
+        """
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if self.defer_429:
+            raise RateLimitedError(endpoint, self.rate_limiter.on_throttle(retry_after))
+
+        if retry_count >= self._max_429_retries:
+            logger.error(f"429错误重试次数已达上限 ({self._max_429_retries})，停止请求")
+            raise httpx.HTTPStatusError(
+                "Too Many Requests: exceeded max retry limit",
+                request=response.request,
+                response=response,
+            )
+
+        delay = self.rate_limiter.on_throttle(retry_after)
+        logger.info(
+            f"429 后 {delay:.1f} 秒重试 (第 {retry_count + 1}/{self._max_429_retries} 次)"
+        )
+        return delay
+
+    def _build_headers(self, headers: Dict = None) -> Dict[str, str]:
+        """合并请求头：每次都生成新的基础头 + 认证头 + 自定义头"""
+        merged_headers = self._add_auth_headers(self._generate_fresh_headers())
+        if headers:
+            merged_headers.update(headers)  # 自定义头覆盖默认头
+        return merged_headers
+
+    def _check_backoff(self, url: str):
+        """defer_429 模式下，全局退避期间不排队等待，直接让调用方挂起请求"""
+        if self.defer_429:
+            remaining = self.rate_limiter.backoff_remaining()
+            if remaining > 0:
+                raise RateLimitedError(url, remaining, throttled=False)
+
+
+class NetworkClient(BaseNetworkClient):
+    """网络客户端，自动处理认证和错误重试"""
+
+    def __init__(
+        self,
+        wait_time_429: int = 300,
+        max_429_retries: int = 3,
+        rate_limiter: Optional[RateLimiter] = None,
+        defer_429: bool = False,
+        cassette: Optional[Cassette] = None,
+    ):
+        super().__init__(
+            wait_time_429=wait_time_429,
+            max_429_retries=max_429_retries,
+            rate_limiter=rate_limiter,
+            defer_429=defer_429,
+            cassette=cassette,
+        )
+        self.session = httpx.Client(timeout=30.0)
+
+    def _send(self, url: str, headers: Dict, params: Dict) -> httpx.Response:
+        """经过限速器发送 GET 请求"""
+        self._check_backoff(url)
+        self.rate_limiter.acquire()
+        return self.session.get(url, headers=headers, params=params)
+
     def get(
         self,
         endpoint: str,
         params: Dict = None,
         headers: Dict = None,
-        retry_count: int = 0,
     ) -> Dict:
-        """GET 请求，自动处理 400 错误和 token 刷新"""
-        url = f"https://app-api.pixiv.net{endpoint}"
+        """GET 请求，自动处理 429、OAuth 错误和 token 刷新"""
+        if self.cassette is not None and self.cassette.replaying:
+            time.sleep(self.cassette.latency)
+            return self.cassette.replay(endpoint, params)
 
-        # 合并请求头：每次都生成新的基础头 + 认证头 + 自定义头
-        merged_headers = self._add_auth_headers(self._generate_fresh_headers())
-        if headers:
-            merged_headers.update(headers)  # 自定义头覆盖默认头
+        url = f"{API_BASE_URL}{endpoint}"
+        retry_429 = 0
+        refreshed = False
 
         try:
-            logger.debug(f"GET {url} with params: {params}")
-            if headers:
-                logger.debug(f"Custom headers: {headers}")
-            response = self.session.get(url, headers=merged_headers, params=params)
-
-            # 自动处理 429 错误
-            if response.status_code == 429:
-                return self._handle_429_error(url, merged_headers, params, retry_count)
-
-            # 自动处理 400 错误
-            if response.status_code == 400 and self._is_oauth_error(response):
-                if retry_count < 1:
+            while True:
+                # 每次发送都重新生成请求头（时间戳更新）
+                merged_headers = self._build_headers(headers)
+                logger.debug(f"GET {url} with params: {params}")
+                if headers:
+                    logger.debug(f"Custom headers: {headers}")
+                response = self._send(url, merged_headers, params)
+
+                # 自动处理 429 错误：限速器降速并退避，之后重试本请求
+                if response.status_code == 429:
+                    self._sleep(self._on_429(endpoint, response, retry_429))
+                    retry_429 += 1
+                    continue
+
+                # 自动处理 400 错误
+                if (
+                    response.status_code == 400
+                    and not refreshed
+                    and self._is_oauth_error(response)
+                ):
                     logger.info("OAuth error detected, attempting token refresh")
+                    refreshed = True
                     self._refresh_token()
-                    merged_headers = self._add_auth_headers(
-                        self._generate_fresh_headers()
-                    )
-                    if headers:
-                        merged_headers.update(headers)
-                    response = self.session.get(
-                        url, headers=merged_headers, params=params
-                    )
+                    continue
 
-            response.raise_for_status()
-            return response.json()
+                response.raise_for_status()
+                self.rate_limiter.on_success()
+                data = response.json()
+                self._record(endpoint, params, data)
+                return data
 
+        except RateLimitedError:
+            raise
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
             raise
@@ -123,6 +232,12 @@ class NetworkClient:
             logger.error(f"Network error: {e}")
             raise
 
+    def _sleep(self, seconds: float):
+        """等待指定秒数，收到退出信号时立即中断"""
+        if shutdown.wait(seconds):
+            logger.info("检测到退出信号，正在退出429等待...")
+            raise KeyboardInterrupt("用户中断429等待")
+
     def post(self, endpoint: str, data: Dict = None, form_data: bool = False) -> Dict:
         """POST 请求"""
         url = endpoint
@@ -149,71 +264,115 @@ class NetworkClient:
             logger.error(f"Network error: {e}")
             raise
 
-    def _handle_429_error(
-        self, url: str, headers: Dict, params: Dict, retry_count: int
-    ) -> Dict:
-        """处理429错误（请求过多），等待指定时间后重试"""
-
-        if retry_count >= self._max_429_retries:
-            logger.error(f"429错误重试次数已达上限 ({self._max_429_retries})，停止请求")
-            raise httpx.HTTPStatusError(
-                f"Too Many Requests: exceeded max retry limit",
-                request=None,
-                response=None,
-            )
+    def close(self):
+        """关闭客户端"""
+        self.session.close()
 
-        wait_minutes = self._429_wait_time // 60
-        wait_seconds = self._429_wait_time % 60
 
-        logger.warning(
-            f"🚫 检测到429错误（请求过多），等待 {wait_minutes} 分 {wait_seconds} 秒后重试 (第 {retry_count + 1}/{self._max_429_retries} 次)"
-        )
-        logger.info("💡 这是Pixiv API的速率限制，请耐心等待...")
-
-        # 显示倒计时，同时检查全局停止信号
-        remaining_seconds = self._429_wait_time
-        while remaining_seconds > 0:
-            mins, secs = divmod(remaining_seconds, 60)
-            # 使用 carriage return 覆盖当前行，实现动态更新
-            print(
-                f"\r⏳ 等待中: {mins:02d}:{secs:02d} (剩余 {remaining_seconds} 秒)",
-                end="",
-                flush=True,
-            )
-            if self._check_stop_signal():
-                logger.info("检测到退出信号，正在退出429等待...")
-                raise KeyboardInterrupt("用户中断429等待")
-            time.sleep(0.1)
-            remaining_seconds -= 0.1
+class AsyncNetworkClient(BaseNetworkClient):
+    """异步网络客户端，可同时保持多个请求在途
 
-        print()  # 换行
+    认证由 AuthAPI 通过同步 NetworkClient 完成，access_token 与刷新逻辑由
+    AuthAPI.attach_client 同步到本客户端；发送速率由共享的 RateLimiter 控制。
+    """
 
-        # 如果收到停止信号，抛出 KeyboardInterrupt
-        if self._check_stop_signal():
-            logger.info("检测到退出信号，正在退出429等待...")
-            raise KeyboardInterrupt("用户中断429等待")
+    def __init__(
+        self,
+        wait_time_429: int = 300,
+        max_429_retries: int = 3,
+        rate_limiter: Optional[RateLimiter] = None,
+        defer_429: bool = False,
+        cassette: Optional[Cassette] = None,
+    ):
+        super().__init__(
+            wait_time_429=wait_time_429,
+            max_429_retries=max_429_retries,
+            rate_limiter=rate_limiter,
+            defer_429=defer_429,
+            cassette=cassette,
+        )
+        self.session = httpx.AsyncClient(timeout=30.0)
+        # 同一时刻只有一个协程刷新 token，其余等待后直接使用新 token
+        self._refresh_lock = asyncio.Lock()
 
-        logger.info("✅ 等待结束，重新发送请求...")
+    async def _send(self, url: str, headers: Dict, params: Dict) -> httpx.Response:
+        """经过限速器发送 GET 请求"""
+        self._check_backoff(url)
+        await self.rate_limiter.acquire_async()
+        return await self.session.get(url, headers=headers, params=params)
 
-        # 重新生成请求头（时间戳更新）
-        new_headers = self._add_auth_headers(self._generate_fresh_headers())
-        new_headers.update(headers)
+    async def get(
+        self,
+        endpoint: str,
+        params: Dict = None,
+        headers: Dict = None,
+    ) -> Dict:
+        """GET 请求，自动处理 429、OAuth 错误和 token 刷新"""
+        if self.cassette is not None and self.cassette.replaying:
+            await asyncio.sleep(self.cassette.latency)
+            return self.cassette.replay(endpoint, params)
+
+        url = f"{API_BASE_URL}{endpoint}"
+        retry_429 = 0
+        refreshed = False
+
+        while True:
+            token_used = self.access_token
+            merged_headers = self._build_headers(headers)
+            logger.debug(f"GET {url} with params: {params}")
 
-        try:
-            response = self.session.get(url, headers=new_headers, params=params)
+            try:
+                response = await self._send(url, merged_headers, params)
+            except RateLimitedError:
+                raise
+            except Exception as e:
+                logger.error(f"Network error: {e}")
+                raise
 
-            # 如果还是429错误，递归处理
             if response.status_code == 429:
-                return self._handle_429_error(url, headers, params, retry_count + 1)
-
-            response.raise_for_status()
-            logger.info("✅ 请求成功！")
-            return response.json()
-
-        except Exception as e:
-            logger.error(f"429等待后重试失败: {e}")
-            raise
+                await self._sleep(self._on_429(endpoint, response, retry_429))
+                retry_429 += 1
+                continue
+
+            if (
+                response.status_code == 400
+                and not refreshed
+                and self._is_oauth_error(response)
+            ):
+                refreshed = True
+                await self._refresh_token_async(token_used)
+                continue
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                logger.error(
+                    f"HTTP error: {e.response.status_code} - {e.response.text}"
+                )
+                raise
+            self.rate_limiter.on_success()
+            data = response.json()
+            self._record(endpoint, params, data)
+            return data
+
+    async def _refresh_token_async(self, token_used: Optional[str]):
+        """在线程中执行同步的 token 刷新，不阻塞事件循环
+
+        并发请求可能同时遇到过期 token，只有第一个负责刷新，其余在锁上等待
+        刷新完成后直接重试。
+        """
+        async with self._refresh_lock:
+            if self.access_token != token_used:
+                return
+            logger.info("OAuth error detected, attempting token refresh")
+            await asyncio.to_thread(self._refresh_token)
+
+    async def _sleep(self, seconds: float):
+        """异步等待指定秒数，收到退出信号时立即中断"""
+        if await shutdown.wait_async(seconds):
+            logger.info("检测到退出信号，正在退出429等待...")
+            raise KeyboardInterrupt("用户中断429等待")
 
-    def close(self):
+    async def aclose(self):
         """关闭客户端"""
-        self.session.close()
+        await self.session.aclose()
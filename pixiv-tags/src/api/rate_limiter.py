@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """请求速率限制器，同步与异步客户端共用同一份每秒请求预算
+
+    每次 acquire 预订下一个发送时刻，调用方等待到该时刻后再发请求，
+    因此无论有多少个并发请求在途，整体发送速率都不会超过 requests_per_second。
+    """
+
+    def __init__(self, requests_per_second: float = 1.0):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.requests_per_second = requests_per_second
+        self._next_slot = 0.0
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        """相邻两次请求之间的最小间隔（秒）"""
+        return 1.0 / self.requests_per_second
+
+    def _reserve(self) -> float:
+        """预订下一个发送时刻，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def backoff_remaining(self) -> float:
+        """距离当前退避窗口结束的秒数，不在退避中时为 0"""
+        return max(0.0, self._backoff_until - time.monotonic())
+
+    def acquire(self):
+        """阻塞直到允许发送下一个请求"""
+        # 等待期间若进入退避窗口，之前预订的时刻作废，重新预订
+        while True:
+            delay = self._reserve()
+            if delay > 0:
+                time.sleep(delay)
+            if time.monotonic() >= self._backoff_until:
+                return
+
+    async def acquire_async(self):
+        """异步等待直到允许发送下一个请求"""
+        while True:
+            delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if time.monotonic() >= self._backoff_until:
+                return
+
+    def on_success(self):
+        """请求成功的反馈（固定速率时无需处理）"""
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """收到 429 的反馈，返回该请求重试前应等待的秒数"""
+        delay = retry_after if retry_after is not None else self.interval
+        with self._lock:
+            now = time.monotonic()
+            self._backoff_until = max(self._backoff_until, now + delay)
+            self._next_slot = max(self._next_slot, self._backoff_until)
+            return self._backoff_until - now
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """AIMD 自适应限速器：成功时加性提速，429 时乘性降速并退避
+
+    - 每次成功响应把速率提高 increase_step 次/秒，不超过 max_rate
+    - 收到 429 时速率乘以 decrease_factor，不低于 min_rate；并发请求在同一
+      退避窗口内收到的多个 429 只降速一次
+    - 退避时长按连续 429 次数指数增长（base_backoff * 2^(n-1)），加入随机抖动，
+      不超过 max_backoff；响应带 Retry-After 时至少等待该时长
+    - 退避期间所有请求（同步和异步）都暂停发送，而不仅是被限流的那一个
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 1.0,
+        min_rate: float = 0.2,
+        max_rate: float = 5.0,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        base_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+    ):
+        super().__init__(requests_per_second)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.requests_per_second = min(
+            max(requests_per_second, self.min_rate), self.max_rate
+        )
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._consecutive_throttles = 0
+
+    def on_success(self):
+        """加性提速"""
+        with self._lock:
+            self._consecutive_throttles = 0
+            self.requests_per_second = min(
+                self.max_rate, self.requests_per_second + self.increase_step
+            )
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """乘性降速并安排带抖动的退避，返回该请求重试前应等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+
+            if now >= self._backoff_until:
+                # 新的拥塞事件：降速并延长退避
+                self._consecutive_throttles += 1
+                self.requests_per_second = max(
+                    self.min_rate, self.requests_per_second * self.decrease_factor
+                )
+                backoff = min(
+                    self.max_backoff,
+                    self.base_backoff * 2 ** (self._consecutive_throttles - 1),
+                )
+                # 抖动：在 [backoff/2, backoff] 内随机，避免多个客户端同时恢复
+                delay = random.uniform(backoff / 2, backoff)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, self.max_backoff))
+                self._backoff_until = now + delay
+                logger.warning(
+                    f"🚫 429 限流: 速率降至 {self.requests_per_second:.2f} 次/秒，"
+                    f"退避 {delay:.1f} 秒 (连续第 {self._consecutive_throttles} 次)"
+                )
+            elif retry_after is not None:
+                # 同一退避窗口内的其他请求：仅在 Retry-After 更长时延长窗口
+                self._backoff_until = max(
+                    self._backoff_until, now + min(retry_after, self.max_backoff)
+                )
+
+            self._next_slot = max(self._next_slot, self._backoff_until)
+            return self._backoff_until - now
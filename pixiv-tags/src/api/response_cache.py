@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ..sqlite_connection import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """响应缓存命中统计"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """SearchAPI 响应缓存：内存 LRU + SQLite 磁盘两级，按 TTL 过期
+
+    缓存键由账号、endpoint 和规范化后的参数组成，不同账号的推荐流互不混用。
+    每个 endpoint 可以单独设置 TTL（例如推荐流变化快，TTL 应短于标签搜索），
+    TTL 为 0 的 endpoint 不缓存。db_path 为 None 时只使用内存层。
+
+    通过环境变量配置（见 from_env）：
+
+        RESPONSE_CACHE_TTL              标签搜索结果的有效期，秒 (默认: 86400，0 表示关闭缓存)
+        RESPONSE_CACHE_RECOMMENDED_TTL  推荐流的有效期，秒 (默认: 600)
+        RESPONSE_CACHE_MEMORY_SIZE      内存层最多保留的响应数 (默认: 1024)
+        RESPONSE_CACHE_PATH             磁盘层数据库路径，留空则只用内存 (默认: data/response_cache.db)
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl: float = 86400,
+        memory_size: int = 1024,
+        account: str = "",
+        endpoint_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.ttl = ttl
+        self.endpoint_ttls = endpoint_ttls or {}
+        self.memory_size = max(0, memory_size)
+        self.account = account
+        self.stats = CacheStats()
+
+        # key -> (过期时间戳, 响应)
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db: Optional[SQLiteConnectionManager] = None
+        if db_path:
+            self._db = SQLiteConnectionManager.shared(db_path)
+            self._init_schema()
+            self.purge_expired()
+
+    @classmethod
+    def from_env(cls, account: str = "") -> Optional["ResponseCache"]:
+        """根据环境变量创建缓存，RESPONSE_CACHE_TTL 为 0 时返回 None"""
+        ttl = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+        if ttl <= 0:
+            return None
+        return cls(
+            db_path=os.getenv("RESPONSE_CACHE_PATH", "data/response_cache.db") or None,
+            ttl=ttl,
+            memory_size=int(os.getenv("RESPONSE_CACHE_MEMORY_SIZE", "1024")),
+            account=account,
+            endpoint_ttls={
+                "/v1/illust/recommended": float(
+                    os.getenv("RESPONSE_CACHE_RECOMMENDED_TTL", "600")
+                ),
+            },
+        )
+
+    @staticmethod
+    def account_id(refresh_token: Optional[str]) -> str:
+        """由 refresh_token 派生账号标识，不把令牌本身写入缓存"""
+        if not refresh_token:
+            return ""
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()[:16]
+
+    def _init_schema(self):
+        with self._db.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    body BLOB NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires_at)"
+            )
+            conn.commit()
+
+    def ttl_for(self, endpoint: str) -> float:
+        """endpoint 的缓存有效期（秒）"""
+        return self.endpoint_ttls.get(endpoint, self.ttl)
+
+    def make_key(self, endpoint: str, params: Optional[Dict]) -> str:
+        """缓存键：账号 + endpoint + 按键名排序、值统一为字符串的参数"""
+        normalized = {str(k): str(v) for k, v in (params or {}).items()}
+        raw = json.dumps(
+            [self.account, endpoint, normalized], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, expires_at: float, data: Dict):
+        """写入内存层，超出容量时淘汰最久未使用的响应"""
+        if not self.memory_size:
+            return
+        with self._lock:
+            self._memory[key] = (expires_at, data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get(self, endpoint: str, params: Optional[Dict]) -> Optional[Dict]:
+        """查找未过期的缓存响应，未命中返回 None"""
+        if self.ttl_for(endpoint) <= 0:
+            return None
+
+        key = self.make_key(endpoint, params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self._db is not None:
+            with self._db.connection() as conn:
+                row = conn.execute(
+                    "SELECT expires_at, body FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+            if row is not None:
+                data = json.loads(zlib.decompress(row["body"]).decode("utf-8"))
+                self._remember(key, row["expires_at"], data)
+                self.stats.disk_hits += 1
+                return data
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, endpoint: str, params: Optional[Dict], data: Dict):
+        """缓存一个成功的响应"""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+
+        key = self.make_key(endpoint, params)
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, data)
+        self.stats.stores += 1
+
+        if self._db is not None:
+            body = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            with self._db.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, expires_at, body) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, endpoint, expires_at, body),
+                )
+                conn.commit()
+
+    def purge_expired(self) -> int:
+        """删除磁盘层中已过期的响应，返回删除数量"""
+        if self._db is None:
+            return 0
+        with self._db.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            )
+            conn.commit()
+        if cursor.rowcount:
+            logger.debug(f"Purged {cursor.rowcount} expired cached responses")
+        return cursor.rowcount
+
+    def log_stats(self):
+        """输出命中统计"""
+        logger.info(
+            f"响应缓存: 命中 {self.stats.hits} 次 (内存 {self.stats.memory_hits}, "
+            f"磁盘 {self.stats.disk_hits})，未命中 {self.stats.misses} 次，"
+            f"命中率 {self.stats.hit_rate:.1%}"
+        )
+
+    def close(self):
+        """关闭磁盘层连接"""
+        if self._db is not None:
+            self._db.close()
@@ -1,16 +1,75 @@
 import logging
-from typing import List, Dict, Optional
-from .client import NetworkClient
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs as _parse_query, urlparse
+
+from .client import AsyncNetworkClient, NetworkClient, RateLimitedError
+from .response_cache import ResponseCache
 
 
 logger = logging.getLogger(__name__)
 
 
+def _recommended_params(offset: int, limit: int) -> Dict[str, str]:
+    """推荐插画流请求参数"""
+    return {
+        "filter": "for_ios",
+        "include_ranking_label": "true",
+        "offset": str(offset),
+        "limit": str(limit),
+    }
+
+
+def _search_params(word: str, offset: int, limit: int) -> Dict[str, str]:
+    """按标签搜索请求参数"""
+    return {
+        "filter": "for_ios",
+        "merge_plain_keyword_results": "true",
+        "word": word,
+        "sort": "date_desc",
+        "search_target": "partial_match_for_tags",
+        "offset": str(offset),
+        "limit": str(limit),
+    }
+
+
+SEARCH_ENDPOINT = "/v1/search/illust"
+
+
+def parse_qs(next_url: Optional[str]) -> Optional[Dict]:
+    """把 next_url 的查询字符串解析为请求参数（同 AppPixivAPI.parse_qs）
+
+    形如 seed_illust_ids[] 的数组参数合并为列表，其余参数取最后一个值。
+    """
+    if not next_url:
+        return None
+    result_qs: Dict = {}
+    query = urlparse(next_url).query
+    for key, value in _parse_query(query).items():
+        if "[" in key and key.endswith("]"):
+            # 保持原顺序，忽略数组下标
+            result_qs[key.split("[")[0]] = value
+        else:
+            result_qs[key] = value[-1]
+    return result_qs
+
+
 class SearchAPI:
-    """Pixiv 搜索 API"""
+    """Pixiv 搜索 API，提供 cache 时相同查询在有效期内不再请求"""
 
-    def __init__(self, client: NetworkClient):
+    def __init__(self, client: NetworkClient, cache: Optional[ResponseCache] = None):
         self.client = client
+        self.cache = cache
+
+    def _get(self, endpoint: str, params: Dict) -> Dict:
+        """先查响应缓存，未命中再请求并缓存结果"""
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, params)
+            if cached is not None:
+                return cached
+        result = self.client.get(endpoint, params=params)
+        if self.cache is not None:
+            self.cache.put(endpoint, params, result)
+        return result
 
     def get_recommended_illusts(self, offset: int = 0, limit: int = 30) -> List[Dict]:
         """
@@ -23,19 +82,17 @@ class SearchAPI:
         Returns:
             插画列表，每个插画包含 tags 信息
         """
-        params = {
-            "filter": "for_ios",
-            "include_ranking_label": "true",
-            "offset": str(offset),
-            "limit": str(limit),
-        }
+        params = _recommended_params(offset, limit)
 
         try:
-            result = self.client.get("/v1/illust/recommended", params=params)
+            result = self._get("/v1/illust/recommended", params)
             illusts = result.get("illusts", [])
             logger.debug(f"Got {len(illusts)} recommended illusts (offset={offset})")
             return illusts
 
+        except RateLimitedError:
+            # 限流由调用方挂起重试，不当作空结果
+            raise
         except Exception as e:
             logger.error(f"Failed to get recommended illusts: {e}")
             return []
@@ -54,24 +111,130 @@ class SearchAPI:
         Returns:
             插画列表，每个插画包含 tags 信息
         """
-        params = {
-            "filter": "for_ios",
-            "merge_plain_keyword_results": "true",
-            "word": word,
-            "sort": "date_desc",
-            "search_target": "partial_match_for_tags",
-            "offset": str(offset),
-            "limit": str(limit),
-        }
+        params = _search_params(word, offset, limit)
+
+        try:
+            result = self._get(SEARCH_ENDPOINT, params)
+            illusts = result.get("illusts", [])
+            logger.debug(
+                f"Found {len(illusts)} illusts for tag '{word}' (offset={offset})"
+            )
+            return illusts
+
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search illusts for tag '{word}': {e}")
+            return []
+
+    def search_illust_page(
+        self, word: str, next_params: Optional[Dict] = None, limit: int = 30
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        按标签搜索插画的一页
+
+        Args:
+            word: 搜索关键词（标签名）
+            next_params: 上一页 next_url 解析出的参数，为 None 时取第一页
+            limit: 第一页的返回数量限制
+
+        Returns:
+            (插画列表, 下一页参数)，没有下一页时下一页参数为 None
+        """
+        params = next_params or _search_params(word, 0, limit)
+
+        try:
+            result = self._get(SEARCH_ENDPOINT, params)
+            illusts = result.get("illusts", [])
+            logger.debug(
+                f"Found {len(illusts)} illusts for tag '{word}' "
+                f"(offset={params.get('offset', 0)})"
+            )
+            return illusts, parse_qs(result.get("next_url"))
+
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search illusts for tag '{word}': {e}")
+            return [], None
+
+
+class AsyncSearchAPI:
+    """Pixiv 搜索 API（异步版本，接口与 SearchAPI 一致）"""
+
+    def __init__(
+        self, client: AsyncNetworkClient, cache: Optional[ResponseCache] = None
+    ):
+        self.client = client
+        self.cache = cache
+
+    async def _get(self, endpoint: str, params: Dict) -> Dict:
+        """先查响应缓存，未命中再请求并缓存结果"""
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, params)
+            if cached is not None:
+                return cached
+        result = await self.client.get(endpoint, params=params)
+        if self.cache is not None:
+            self.cache.put(endpoint, params, result)
+        return result
+
+    async def get_recommended_illusts(
+        self, offset: int = 0, limit: int = 30
+    ) -> List[Dict]:
+        """获取推荐插画流，参数与返回值同 SearchAPI.get_recommended_illusts"""
+        params = _recommended_params(offset, limit)
 
         try:
-            result = self.client.get("/v1/search/illust", params=params)
+            result = await self._get("/v1/illust/recommended", params)
+            illusts = result.get("illusts", [])
+            logger.debug(f"Got {len(illusts)} recommended illusts (offset={offset})")
+            return illusts
+
+        except RateLimitedError:
+            # 限流由调用方挂起重试，不当作空结果
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get recommended illusts: {e}")
+            return []
+
+    async def search_illust_by_tag(
+        self, word: str, offset: int = 0, limit: int = 30
+    ) -> List[Dict]:
+        """按标签搜索插画，参数与返回值同 SearchAPI.search_illust_by_tag"""
+        params = _search_params(word, offset, limit)
+
+        try:
+            result = await self._get(SEARCH_ENDPOINT, params)
             illusts = result.get("illusts", [])
             logger.debug(
                 f"Found {len(illusts)} illusts for tag '{word}' (offset={offset})"
             )
             return illusts
 
+        except RateLimitedError:
+            raise
         except Exception as e:
             logger.error(f"Failed to search illusts for tag '{word}': {e}")
             return []
+
+    async def search_illust_page(
+        self, word: str, next_params: Optional[Dict] = None, limit: int = 30
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """按标签搜索插画的一页，参数与返回值同 SearchAPI.search_illust_page"""
+        params = next_params or _search_params(word, 0, limit)
+
+        try:
+            result = await self._get(SEARCH_ENDPOINT, params)
+            illusts = result.get("illusts", [])
+            logger.debug(
+                f"Found {len(illusts)} illusts for tag '{word}' "
+                f"(offset={params.get('offset', 0)})"
+            )
+            return illusts, parse_qs(result.get("next_url"))
+
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search illusts for tag '{word}': {e}")
+            return [], None
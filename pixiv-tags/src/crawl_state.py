@@ -0,0 +1,345 @@
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Set, Tuple
+
+from .sqlite_connection import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# 依赖标签库中已有频率的收集进度表
+_STATE_TABLES = ("seen_illusts", "crawl_frontier", "crawl_searched_tags")
+
+
+def bind_tag_store(
+    connection_manager: SQLiteConnectionManager, tag_store: str, tag_count: int
+) -> bool:
+    """确认收集进度属于 tag_store 标识的标签库，不属于时清空，返回是否清空
+
+    已处理插画和检查点只有和对应的标签频率一起才有意义：标签库被删除、重置或
+    换成另一个（如切换 PERSISTENT_MODE）后继续使用旧进度，所有插画都会被当作
+    已处理而跳过。记录的标签库与当前不同，或标签库为空而进度非空时清空进度。
+    """
+    with connection_manager.connection() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS crawl_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        row = conn.execute("SELECT value FROM crawl_meta WHERE key = 'tag_store'").fetchone()
+        existing = {
+            row["name"]
+            for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        tables = [table for table in _STATE_TABLES if table in existing]
+        has_state = any(
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in tables
+        )
+
+        reason = None
+        if has_state:
+            if row is not None and row["value"] != tag_store:
+                reason = f"收集进度属于另一个标签库 {row['value']}，当前为 {tag_store}"
+            elif tag_count == 0:
+                reason = f"标签库 {tag_store} 为空，但保存有收集进度"
+        if reason is not None:
+            logger.warning(f"{reason}：已清空已处理插画和检查点，本次从头收集")
+            for table in tables:
+                conn.execute(f"DELETE FROM {table}")
+            if "crawl_runs" in existing:
+                conn.execute(
+                    "UPDATE crawl_runs SET finished_at = ? WHERE finished_at IS NULL",
+                    (time.time(),),
+                )
+        conn.execute(
+            "INSERT OR REPLACE INTO crawl_meta (key, value) VALUES ('tag_store', ?)",
+            (tag_store,),
+        )
+        conn.commit()
+    return reason is not None
+
+
+@dataclass
+class CheckpointDelta:
+    """take_checkpoint() 取出的一次检查点：增量和当时的统计"""
+
+    upserts: Dict[Tuple[str, int], Dict]
+    deletes: Set[Tuple[str, int]]
+    searched: Dict[str, Tuple[float, int, int]]
+    stats: str
+    finished: bool
+    taken_at: float
+
+
+class CrawlState:
+    """收集进度检查点：待搜索前沿、已搜索标签和运行统计保存在 SQLite 中
+
+    收集器在内存中记录自上次检查点以来的变化（新入队/已完成的前沿节点、
+    新搜索的标签），checkpoint() 在一个事务中只写入这些增量，因此可以和
+    标签同步一样频繁调用。进程崩溃或因 429 中止后，下次启动从保存的前沿
+    继续，而不是重新从推荐流开始。
+
+    前沿节点在搜索完成（或被放弃）后才从表中删除，在途或因限流挂起的搜索
+    在恢复时会重新搜索。
+
+    需要把检查点排在其他写入之后时，用 take_checkpoint() 在收集线程中取出增量，
+    再在写入线程中 write_checkpoint()；写入失败时 restore() 把增量放回，
+    下次检查点一起重试。
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/pixiv_tags.db",
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+    ):
+        self.db_path = db_path
+        self.connection_manager = (
+            connection_manager or SQLiteConnectionManager.shared(db_path)
+        )
+        self.run_id: Optional[int] = None
+
+        # 已搜索过的标签名（首页），恢复后用于跳过重复的起始标签
+        self.searched: Set[str] = set()
+
+        # 自上次检查点以来的增量
+        self._frontier_upserts: Dict[Tuple[str, int], Dict] = {}
+        self._frontier_deletes: Set[Tuple[str, int]] = set()
+        # 标签名 -> (最近搜索时间, 新搜索次数, 最近一次搜索各页累计的新标签数)
+        self._searched_updates: Dict[str, Tuple[float, int, int]] = {}
+
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.connection_manager.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_frontier (
+                    tag_name TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    node TEXT NOT NULL,
+                    PRIMARY KEY (tag_name, page)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_searched_tags (
+                    name TEXT PRIMARY KEY,
+                    searched_at REAL NOT NULL,
+                    search_count INTEGER NOT NULL DEFAULT 1,
+                    last_new_tags INTEGER NOT NULL DEFAULT 0,
+                    empty_streak INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # 早期版本的表没有 empty_streak 列
+            columns = {
+                row["name"]
+                for row in conn.execute("PRAGMA table_info(crawl_searched_tags)")
+            }
+            if "empty_streak" not in columns:
+                conn.execute(
+                    "ALTER TABLE crawl_searched_tags "
+                    "ADD COLUMN empty_streak INTEGER NOT NULL DEFAULT 0"
+                )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL,
+                    stats TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            conn.commit()
+
+    def load_searched(self) -> int:
+        """加载已搜索标签集合，返回数量"""
+        with self.connection_manager.connection() as conn:
+            rows = conn.execute("SELECT name FROM crawl_searched_tags").fetchall()
+        self.searched = {row["name"] for row in rows}
+        return len(self.searched)
+
+    def load_schedule(self) -> Dict[str, Tuple[float, int]]:
+        """读取每个已搜索标签的 (最近搜索时间, 连续无新标签的搜索次数)"""
+        with self.connection_manager.connection() as conn:
+            rows = conn.execute(
+                "SELECT name, searched_at, empty_streak FROM crawl_searched_tags"
+            ).fetchall()
+        return {row["name"]: (row["searched_at"], row["empty_streak"]) for row in rows}
+
+    def load_frontier(self) -> List[Dict]:
+        """读取上次保存的前沿节点（字段字典）"""
+        with self.connection_manager.connection() as conn:
+            rows = conn.execute("SELECT node FROM crawl_frontier").fetchall()
+        return [json.loads(row["node"]) for row in rows]
+
+    def resume_run(self, stats) -> bool:
+        """继续最近一次未完成的运行并恢复其统计；没有时开始新运行
+
+        返回是否恢复了未完成的运行。stats 为 CollectionStats，原地更新。
+        """
+        now = time.time()
+        with self.connection_manager.connection() as conn:
+            row = conn.execute(
+                "SELECT id, stats FROM crawl_runs WHERE finished_at IS NULL "
+                "ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            has_frontier = (
+                conn.execute("SELECT 1 FROM crawl_frontier LIMIT 1").fetchone()
+                is not None
+            )
+            if row is not None and has_frontier:
+                self.run_id = row["id"]
+                saved = json.loads(row["stats"])
+                for f in fields(stats):
+                    if f.name in saved:
+                        setattr(stats, f.name, saved[f.name])
+                conn.execute(
+                    "UPDATE crawl_runs SET updated_at = ? WHERE id = ?", (now, self.run_id)
+                )
+                conn.commit()
+                return True
+
+            # 没有可恢复的前沿：结束遗留的运行记录，开始新运行
+            conn.execute(
+                "UPDATE crawl_runs SET finished_at = ? WHERE finished_at IS NULL", (now,)
+            )
+            cursor = conn.execute(
+                "INSERT INTO crawl_runs (started_at, updated_at, stats) VALUES (?, ?, ?)",
+                (now, now, json.dumps(asdict(stats))),
+            )
+            self.run_id = cursor.lastrowid
+            conn.commit()
+        return False
+
+    def on_push(self, node):
+        """记录新入队的前沿节点"""
+        key = (node.tag_name, node.page)
+        self._frontier_deletes.discard(key)
+        self._frontier_upserts[key] = asdict(node)
+
+    def on_done(self, node):
+        """记录搜索完成或被放弃的前沿节点"""
+        key = (node.tag_name, node.page)
+        self._frontier_upserts.pop(key, None)
+        self._frontier_deletes.add(key)
+
+    def on_searched(self, tag_name: str, page: int, new_tags: int):
+        """记录标签的一页搜索；第 1 页开始一次新的搜索，后续页的新标签数累加到该次搜索"""
+        self.searched.add(tag_name)
+        _, searches, total_new = self._searched_updates.get(tag_name, (0.0, 0, 0))
+        if page == 1:
+            searches += 1
+            total_new = 0
+        self._searched_updates[tag_name] = (
+            time.time(),
+            searches,
+            total_new + new_tags,
+        )
+
+    def is_searched(self, tag_name: str) -> bool:
+        return tag_name in self.searched
+
+    def checkpoint(self, stats, finished: bool = False):
+        """在一个事务中写入自上次检查点以来的增量和当前统计；失败时增量保留"""
+        delta = self.take_checkpoint(stats, finished)
+        try:
+            self.write_checkpoint(delta)
+        except Exception:
+            self.restore(delta)
+            raise
+
+    def take_checkpoint(self, stats, finished: bool = False) -> CheckpointDelta:
+        """取出自上次检查点以来的增量和当前统计的快照，之后的变化记入新的增量"""
+        delta = CheckpointDelta(
+            upserts=self._frontier_upserts,
+            deletes=self._frontier_deletes,
+            searched=self._searched_updates,
+            stats=json.dumps(asdict(stats)),
+            finished=finished,
+            taken_at=time.time(),
+        )
+        self._frontier_upserts = {}
+        self._frontier_deletes = set()
+        self._searched_updates = {}
+        return delta
+
+    def restore(self, delta: CheckpointDelta):
+        """把写入失败的检查点增量合并回当前增量（当前增量中较新的变化优先）"""
+        for key, node in delta.upserts.items():
+            if key not in self._frontier_upserts and key not in self._frontier_deletes:
+                self._frontier_upserts[key] = node
+        for key in delta.deletes:
+            if key not in self._frontier_upserts:
+                self._frontier_deletes.add(key)
+        for name, (at, searches, total_new) in delta.searched.items():
+            current = self._searched_updates.get(name)
+            if current is None:
+                self._searched_updates[name] = (at, searches, total_new)
+                continue
+            current_at, current_searches, current_new = current
+            # 之后又开始了新的搜索时只保留新搜索的新标签数，否则是同一次搜索的后续页
+            self._searched_updates[name] = (
+                current_at,
+                searches + current_searches,
+                current_new if current_searches else total_new + current_new,
+            )
+
+    def write_checkpoint(self, delta: CheckpointDelta):
+        """在一个事务中写入 take_checkpoint() 取出的增量（可在其他线程调用）"""
+        upserts, deletes, searched = delta.upserts, delta.deletes, delta.searched
+        now = delta.taken_at
+        with self.connection_manager.connection() as conn:
+            if deletes:
+                conn.executemany(
+                    "DELETE FROM crawl_frontier WHERE tag_name = ? AND page = ?",
+                    list(deletes),
+                )
+            if upserts:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO crawl_frontier (tag_name, page, node) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (name, page, json.dumps(node, ensure_ascii=False))
+                        for (name, page), node in upserts.items()
+                    ],
+                )
+            if searched:
+                conn.executemany(
+                    """
+                    INSERT INTO crawl_searched_tags
+                    (name, searched_at, search_count, last_new_tags, empty_streak)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        searched_at = excluded.searched_at,
+                        search_count = search_count + excluded.search_count,
+                        last_new_tags = CASE
+                            WHEN excluded.search_count > 0 THEN excluded.last_new_tags
+                            ELSE last_new_tags + excluded.last_new_tags
+                        END,
+                        empty_streak = CASE
+                            WHEN excluded.last_new_tags > 0 THEN 0
+                            WHEN excluded.search_count > 0 THEN empty_streak + 1
+                            ELSE empty_streak
+                        END
+                    """,
+                    [
+                        (name, at, searches, new, 0 if new else 1)
+                        for name, (at, searches, new) in searched.items()
+                    ],
+                )
+            if delta.finished:
+                # 前沿已耗尽：清空残留节点，下次从推荐流重新开始
+                conn.execute("DELETE FROM crawl_frontier")
+            if self.run_id is not None:
+                conn.execute(
+                    "UPDATE crawl_runs SET updated_at = ?, stats = ?, finished_at = ? "
+                    "WHERE id = ?",
+                    (
+                        now,
+                        delta.stats,
+                        now if delta.finished else None,
+                        self.run_id,
+                    ),
+                )
+            conn.commit()
+
+        logger.debug(
+            f"检查点: 前沿 +{len(upserts)}/-{len(deletes)}，已搜索标签 +{len(searched)}"
+        )
@@ -0,0 +1,126 @@
+"""标签搜索前沿：决定收集器下一个搜索哪个标签"""
+
+import heapq
+import math
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+def _node_key(node) -> Tuple[str, int]:
+    """同一标签的同一页只排队一次；翻页节点与首页节点互不冲突"""
+    return node.tag_name, node.page
+
+
+class LifoFrontier:
+    """后进先出的搜索前沿，即原来的深度优先栈；已在队列中的节点不重复加入"""
+
+    name = "dfs"
+
+    def __init__(self):
+        self._stack: List = []
+        self._queued: Set[Hashable] = set()
+
+    def push(self, node) -> bool:
+        """加入节点，已在队列中时返回 False"""
+        key = _node_key(node)
+        if key in self._queued:
+            return False
+        self._queued.add(key)
+        self._stack.append(node)
+        return True
+
+    def pop(self):
+        node = self._stack.pop()
+        self._queued.discard(_node_key(node))
+        return node
+
+    def __len__(self) -> int:
+        return len(self._stack)
+
+
+@dataclass
+class NoveltyScorer:
+    """按预期新颖度给搜索节点打分，分数越高越先搜索
+
+    score = parent_yield * yield_weight                父节点那一页每个插画带来的新标签数；
+                                                      翻页节点的 parent_yield 是本标签上一页
+                                                      的产出，是更直接的证据，改用 page_yield_weight
+          - log(1 + frequency) * frequency_weight      出现越频繁的标签，周边越可能已被探索过
+          - depth * depth_weight                       越深越靠后
+          + translated * translation_weight            有官方翻译的标签通常有更多作品
+
+    权重可按数据调整，用 benchmark_frontier.py 在同一份磁带上比较效果。
+    """
+
+    yield_weight: float = 1.0
+    page_yield_weight: float = 2.0
+    frequency_weight: float = 0.25
+    depth_weight: float = 0.1
+    translation_weight: float = 0.1
+
+    def __call__(self, node) -> float:
+        return (
+            node.parent_yield
+            * (self.yield_weight if node.page == 1 else self.page_yield_weight)
+            - math.log1p(node.frequency) * self.frequency_weight
+            - node.depth * self.depth_weight
+            + (self.translation_weight if node.translated else 0.0)
+        )
+
+
+class BestFirstFrontier:
+    """按分数出队的搜索前沿，分数相同时先加入的先出队
+
+    scorer 在节点入队时调用一次；同一节点已在队列中时，只有新分数更高才会
+    重新入队，旧条目出队时按过期处理跳过。
+    """
+
+    name = "best_first"
+
+    def __init__(self, scorer: Optional[Callable[..., float]] = None):
+        self.scorer = scorer or NoveltyScorer()
+        self._heap: List = []
+        self._scores: Dict[Hashable, float] = {}
+        self._seq = 0
+
+    def push(self, node) -> bool:
+        """加入节点，已在队列中且分数没有提高时返回 False"""
+        key = _node_key(node)
+        score = self.scorer(node)
+        queued = self._scores.get(key)
+        if queued is not None and queued >= score:
+            return False
+        self._scores[key] = score
+        self._seq += 1
+        heapq.heappush(self._heap, (-score, self._seq, node))
+        return True
+
+    def pop(self):
+        while self._heap:
+            neg_score, _, node = heapq.heappop(self._heap)
+            key = _node_key(node)
+            if self._scores.get(key) == -neg_score:
+                del self._scores[key]
+                return node
+        raise IndexError("pop from empty frontier")
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+FRONTIERS = {
+    LifoFrontier.name: LifoFrontier,
+    BestFirstFrontier.name: BestFirstFrontier,
+}
+
+
+def make_frontier(strategy: Optional[str] = None):
+    """按策略名创建搜索前沿，未指定时读取 COLLECT_FRONTIER (默认: best_first)"""
+    strategy = (strategy or os.getenv("COLLECT_FRONTIER", "best_first")).lower()
+    frontier_cls = FRONTIERS.get(strategy)
+    if frontier_cls is None:
+        raise ValueError(
+            f"Unknown frontier strategy: {strategy} (available: {', '.join(FRONTIERS)})"
+        )
+    return frontier_cls()
@@ -0,0 +1,134 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from .models import PixivTag
+from .sqlite_storage import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+
+class LazyTagIndex:
+    """SQLite 模式的按需标签索引：启动时不读取标签，标签对象按需查询
+
+    - 成员判断以数据库主键为准：prefetch() 把一页插画的全部标签名合并为一次
+      按主键的批量查询，查到的标签放入容量为 cache_size 的 LRU 缓存，
+      查不到的名称记为不存在，同一页内再次判断时不再查询
+    - 本次运行新增的标签单独保存直到运行结束，不会被淘汰，
+      因此在后台写入完成前也能找到
+
+    被淘汰后重新读取的标签会加上 pending_delta 返回的未同步增量；
+    已提交到后台写入队列但尚未写入的增量不计入，仅影响日志和前沿打分中的频率。
+
+    通过环境变量配置（见 from_env）：
+
+        LAZY_TAG_CACHE_SIZE   热标签缓存容量 (默认: 100000)
+    """
+
+    def __init__(
+        self,
+        sqlite: SQLiteStorage,
+        cache_size: int = 100000,
+        pending_delta: Optional[Callable[[str], int]] = None,
+    ):
+        self.sqlite = sqlite
+        self.cache_size = max(1, cache_size)
+        self.pending_delta = pending_delta or (lambda name: 0)
+
+        self._cache: "OrderedDict[str, PixivTag]" = OrderedDict()
+        # 最近一次批量查询中确认不存在的名称
+        self._absent: Set[str] = set()
+        self.added: Dict[str, PixivTag] = {}
+        self._stored_count = 0
+
+        self.lookups = 0
+        self.cache_hits = 0
+        self.db_queries = 0
+
+    @classmethod
+    def from_env(
+        cls, sqlite: SQLiteStorage, pending_delta: Optional[Callable[[str], int]] = None
+    ) -> "LazyTagIndex":
+        return cls(
+            sqlite,
+            cache_size=int(os.getenv("LAZY_TAG_CACHE_SIZE", "100000")),
+            pending_delta=pending_delta,
+        )
+
+    def load(self) -> int:
+        """只统计库中标签数量，返回数量"""
+        start = time.perf_counter()
+        self._stored_count = self.sqlite.count()
+        self._cache.clear()
+        self._absent.clear()
+        self.added.clear()
+        logger.info(
+            f"按需加载模式: 库中有 {self._stored_count} 个标签 "
+            f"(用时 {time.perf_counter() - start:.2f} 秒)"
+        )
+        return self._stored_count
+
+    def __len__(self) -> int:
+        return self._stored_count + len(self.added)
+
+    def _cached(self, name: str) -> Optional[PixivTag]:
+        tag = self.added.get(name)
+        if tag is not None:
+            return tag
+        tag = self._cache.get(name)
+        if tag is not None:
+            self._cache.move_to_end(name)
+        return tag
+
+    def _cache_put(self, tag: PixivTag):
+        tag.frequency += self.pending_delta(tag.name)
+        self._cache[tag.name] = tag
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, name: str) -> Optional[PixivTag]:
+        """查找标签；未缓存且未确认不存在时查询数据库"""
+        self.lookups += 1
+        tag = self._cached(name)
+        if tag is not None:
+            self.cache_hits += 1
+            return tag
+        if name in self._absent:
+            self.cache_hits += 1
+            return None
+        self.db_queries += 1
+        tag = self.sqlite.get_tag(name)
+        if tag is not None:
+            self._cache_put(tag)
+        return tag
+
+    def prefetch(self, names: Iterable[str]) -> int:
+        """把尚未缓存的标签合并为批量查询放入缓存，返回读取的数量"""
+        missing = {
+            name for name in names if name not in self.added and name not in self._cache
+        }
+        self._absent = set()
+        if not missing:
+            return 0
+        self.db_queries += 1
+        tags = self.sqlite.get_tags_by_names(missing)
+        for tag in tags:
+            self._cache_put(tag)
+            missing.discard(tag.name)
+        self._absent = missing
+        return len(tags)
+
+    def add(self, tag: PixivTag):
+        """记录本次运行新增的标签"""
+        self.added[tag.name] = tag
+        self._absent.discard(tag.name)
+
+    def log_stats(self):
+        hit_rate = self.cache_hits / self.lookups if self.lookups else 0.0
+        logger.info(
+            f"按需加载: 查找 {self.lookups} 次，命中率 {hit_rate:.1%}，"
+            f"数据库查询 {self.db_queries} 次，缓存 {len(self._cache)} 个，"
+            f"本次新增 {len(self.added)} 个"
+        )
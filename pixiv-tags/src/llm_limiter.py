@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+import httpx
+
+from .api.rate_limiter import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterClosed(Exception):
+    """限流器已关闭（如收到停止信号），不再发放新的请求许可"""
+
+
+@dataclass
+class LimiterStats:
+    """LLM 请求并发控制统计"""
+
+    successes: int = 0
+    throttled: int = 0
+    server_errors: int = 0
+    timeouts: int = 0
+    # 其他错误（如 4xx、响应解析失败），不作为拥塞信号
+    other_errors: int = 0
+    decreases: int = 0
+    min_limit_seen: int = 0
+    max_limit_seen: int = 0
+    # 因并发、RPM、TPM 或退避而等待的总时长
+    wait_seconds: float = 0.0
+
+
+class _MinuteBudget:
+    """每分钟用量上限（请求数或 tokens），按令牌桶匀速补充
+
+    桶容量为 BURST_SECONDS 秒的用量，不会在一分钟开头集中用完全部额度；
+    实际用量超过预留量时余额可以为负，之后的请求相应推迟
+    """
+
+    BURST_SECONDS = 5.0
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.rate = limit / 60.0
+        self.capacity = max(1.0, self.rate * self.BURST_SECONDS)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """预留 amount 之前需要等待的秒数；单次用量超过桶容量时只等桶满"""
+        if self.limit <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.rate
+
+    def reserve(self, amount: float):
+        if self.limit > 0:
+            self._level -= amount
+
+    def adjust(self, reserved: float, amount: float):
+        """用实际用量替换预留量"""
+        if self.limit > 0:
+            self._level -= amount - reserved
+
+
+class Permit:
+    """一次 LLM 请求的并发许可，record_usage() 记录响应中的实际 token 用量"""
+
+    def __init__(self, epoch: int, started: float, tokens: float):
+        self.epoch = epoch
+        self.started = started
+        self.estimated_tokens = tokens
+        self.tokens: Optional[int] = None
+
+    def record_usage(self, total_tokens: int):
+        self.tokens = total_tokens
+
+
+class AdaptiveConcurrencyLimiter:
+    """LLM 请求的 AIMD 自适应并发控制，可叠加每分钟请求数和 tokens 上限
+
+    - 每完成 limit 个（至少 10 个）成功请求为一轮：一轮内并发确实用满、且本轮
+      p90 延迟不超过基线 p50 的 latency_tolerance 倍时，并发上限加 1
+    - 延迟超过该阈值时上限乘以 0.9；收到 429、5xx 或超时时上限乘以
+      decrease_factor，不低于 min_limit。只有在最近一次降低之后发出的请求
+      才会再次触发降低，同一批在途请求的多个失败只降一次
+    - 429 时所有新请求暂停，退避时长按连续 429 次数指数增长并加入抖动，
+      响应带 Retry-After 时至少等待该时长
+    - max_rpm / max_tpm 按令牌桶限制每分钟请求数和 tokens（0 表示不限）；
+      tokens 在发出请求时按最近请求的平均用量预留，收到响应后按 Usage 修正
+
+    通过环境变量配置（见 from_env）：
+
+        LLM_CONCURRENCY          初始并发上限 (默认: 8)
+        LLM_MIN_CONCURRENCY      并发下限 (默认: 1)
+        LLM_MAX_CONCURRENCY      并发上限的最大值 (默认: 64)
+        LLM_LATENCY_TOLERANCE    p90 延迟超过基线 p50 的多少倍时降低并发 (默认: 3)
+        LLM_MAX_RPM              每分钟请求数上限，0 表示不限 (默认: 0)
+        LLM_MAX_TPM              每分钟 tokens 上限，0 表示不限 (默认: 0)
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 3.0,
+        latency_window: int = 200,
+        max_rpm: int = 0,
+        max_tpm: int = 0,
+        base_backoff: float = 5.0,
+        max_backoff: float = 120.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._requests = _MinuteBudget(max_rpm)
+        self._tokens = _MinuteBudget(max_tpm)
+        self._avg_tokens: Optional[float] = None
+
+        # 最近的成功请求延迟（用于统计输出）和本轮的延迟（用于调整）
+        self._latencies: Deque[float] = deque(maxlen=max(10, latency_window))
+        self._round_latencies: List[float] = []
+        self._baseline: Optional[float] = None
+
+        self._in_flight = 0
+        # 每次降低并发时加 1，用于判断失败的请求是否在降低之后发出
+        self._epoch = 0
+        self._round_saturated = False
+        self._backoff_until = 0.0
+        self._consecutive_throttles = 0
+        self._closed = False
+        self._changed = asyncio.Condition()
+
+        self.stats = LimiterStats(
+            min_limit_seen=self.limit, max_limit_seen=self.limit
+        )
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveConcurrencyLimiter":
+        return cls(
+            initial_limit=int(os.getenv("LLM_CONCURRENCY", "8")),
+            min_limit=int(os.getenv("LLM_MIN_CONCURRENCY", "1")),
+            max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+            latency_tolerance=float(os.getenv("LLM_LATENCY_TOLERANCE", "3")),
+            max_rpm=int(os.getenv("LLM_MAX_RPM", "0")),
+            max_tpm=int(os.getenv("LLM_MAX_TPM", "0")),
+        )
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        return max(
+            self._backoff_until - now,
+            self._requests.wait_time(1, now),
+            self._tokens.wait_time(tokens, now),
+        )
+
+    async def acquire(self) -> Permit:
+        """等待直到并发、退避和每分钟预算都允许发出下一个请求
+
+        限流器关闭后抛出 LimiterClosed
+        """
+        start = time.monotonic()
+        async with self._changed:
+            while True:
+                if self._closed:
+                    raise LimiterClosed()
+                now = time.monotonic()
+                tokens = self._avg_tokens or 0.0
+                wait = self._wait_time(tokens, now)
+                # 设置了 tokens 上限但还没有用量数据时，先只发一个请求取得估计值
+                calibrating = (
+                    self._tokens.limit > 0
+                    and self._avg_tokens is None
+                    and self._in_flight > 0
+                )
+                if wait <= 0 and self._in_flight < self.limit and not calibrating:
+                    break
+                try:
+                    async with asyncio.timeout(wait if wait > 0 else None):
+                        await self._changed.wait()
+                except TimeoutError:
+                    pass
+
+            self._in_flight += 1
+            if self._in_flight >= self.limit:
+                self._round_saturated = True
+            self._requests.reserve(1)
+            self._tokens.reserve(tokens)
+            permit = Permit(self._epoch, now, tokens)
+
+        self.stats.wait_seconds += time.monotonic() - start
+        return permit
+
+    async def close(self):
+        """关闭限流器：正在等待和之后的 acquire() 都抛出 LimiterClosed，在途请求不受影响"""
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    async def release(
+        self,
+        permit: Permit,
+        outcome: str,
+        retry_after: Optional[float] = None,
+    ):
+        """归还许可并根据结果调整并发上限
+
+        outcome 为 success、throttled (429)、server_error (5xx)、timeout 或 error
+        """
+        latency = time.monotonic() - permit.started
+        async with self._changed:
+            self._in_flight -= 1
+            if permit.tokens is not None:
+                self._tokens.adjust(permit.estimated_tokens, permit.tokens)
+                self._avg_tokens = (
+                    permit.tokens
+                    if self._avg_tokens is None
+                    else self._avg_tokens * 0.9 + permit.tokens * 0.1
+                )
+
+            if outcome == "success":
+                self.stats.successes += 1
+                self._consecutive_throttles = 0
+                self._latencies.append(latency)
+                self._round_latencies.append(latency)
+                self._complete_round()
+            elif outcome == "throttled":
+                self.stats.throttled += 1
+                self._throttle(retry_after)
+                self._decrease(permit, self.decrease_factor, "429 限流")
+            elif outcome == "server_error":
+                self.stats.server_errors += 1
+                self._decrease(permit, self.decrease_factor, "服务端错误")
+            elif outcome == "timeout":
+                self.stats.timeouts += 1
+                self._decrease(permit, self.decrease_factor, "请求超时")
+            else:
+                self.stats.other_errors += 1
+
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def request(self):
+        """在并发许可内执行一次请求，根据异常类型自动反馈结果
+
+        用法:
+            async with limiter.request() as permit:
+                response = await client.simple_chat_async(...)
+                permit.record_usage(response.total_tokens)
+        """
+        permit = await self.acquire()
+        try:
+            yield permit
+        except (httpx.TimeoutException, TimeoutError):
+            await self.release(permit, "timeout")
+            raise
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status == 429:
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                await self.release(permit, "throttled", retry_after)
+            elif status >= 500:
+                await self.release(permit, "server_error")
+            else:
+                await self.release(permit, "error")
+            raise
+        except asyncio.CancelledError:
+            await asyncio.shield(self.release(permit, "error"))
+            raise
+        except Exception:
+            await self.release(permit, "error")
+            raise
+        else:
+            await self.release(permit, "success")
+
+    def _complete_round(self):
+        """每完成一轮成功请求，按本轮延迟决定加性提高或温和降低"""
+        if len(self._round_latencies) < max(self.limit, 10):
+            return
+
+        p50, p90 = self._percentiles(self._round_latencies)
+        # 基线取观测到的最低 p50，并缓慢上浮，以适应端点整体变慢的情况
+        self._baseline = p50 if self._baseline is None else min(p50, self._baseline * 1.02)
+
+        if p90 > self._baseline * self.latency_tolerance:
+            self._set_limit(int(self.limit * 0.9))
+            logger.info(
+                f"LLM 延迟升高 (p90 {p90:.2f}s > 基线 {self._baseline:.2f}s × "
+                f"{self.latency_tolerance:g})，并发降至 {self.limit}"
+            )
+            self._epoch += 1
+            self.stats.decreases += 1
+        elif self._round_saturated:
+            self._set_limit(self.limit + 1)
+
+        self._round_latencies = []
+        self._round_saturated = self._in_flight >= self.limit
+
+    @staticmethod
+    def _percentiles(latencies):
+        quantiles = statistics.quantiles(latencies, n=10)
+        return quantiles[4], quantiles[8]
+
+    def _decrease(self, permit: Permit, factor: float, reason: str):
+        # 降低之前发出的请求已经反映在这次降低中
+        if permit.epoch != self._epoch:
+            return
+        self._epoch += 1
+        self.stats.decreases += 1
+        self._set_limit(int(self.limit * factor))
+        self._round_latencies = []
+        self._round_saturated = False
+        logger.warning(f"LLM {reason}: 并发降至 {self.limit}")
+
+    def _throttle(self, retry_after: Optional[float]):
+        now = time.monotonic()
+        if now < self._backoff_until:
+            if retry_after is not None:
+                self._backoff_until = max(
+                    self._backoff_until, now + min(retry_after, self.max_backoff)
+                )
+            return
+        self._consecutive_throttles += 1
+        backoff = min(
+            self.max_backoff, self.base_backoff * 2 ** (self._consecutive_throttles - 1)
+        )
+        delay = random.uniform(backoff / 2, backoff)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        self._backoff_until = now + delay
+        logger.warning(
+            f"LLM 429 限流: 暂停 {delay:.1f} 秒 (连续第 {self._consecutive_throttles} 次)"
+        )
+
+    def _set_limit(self, limit: int):
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        self.stats.min_limit_seen = min(self.stats.min_limit_seen, self.limit)
+        self.stats.max_limit_seen = max(self.stats.max_limit_seen, self.limit)
+
+    def summary(self) -> str:
+        stats = self.stats
+        latency = ""
+        if len(self._latencies) >= 10:
+            p50, p90 = self._percentiles(self._latencies)
+            latency = f" | 延迟 p50 {p50:.2f}s p90 {p90:.2f}s"
+        return (
+            f"并发: 当前 {self.limit} (范围 {stats.min_limit_seen}-{stats.max_limit_seen}) | "
+            f"429: {stats.throttled} | 5xx: {stats.server_errors} | 超时: {stats.timeouts} | "
+            f"累计等待 {stats.wait_seconds:.0f}s{latency}"
+        )
@@ -1,10 +1,15 @@
+import sys
 from dataclasses import dataclass
 from typing import Optional, List
 
 
-@dataclass
+@dataclass(slots=True)
 class PixivTag:
-    """Pixiv 标签数据模型"""
+    """Pixiv 标签数据模型
+
+    使用 __slots__ 而非实例 __dict__；标签名和官方翻译在创建时驻留（sys.intern），
+    同一标签在不同插画、不同 API 响应中出现时共享同一个字符串对象。
+    """
 
     name: str
     official_translation: Optional[str] = None
@@ -14,6 +19,11 @@ class PixivTag:
     chinese_reviewed: bool = False  # 中文翻译是否已审核
     english_reviewed: bool = False  # 英文翻译是否已审核
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+        if self.official_translation:
+            self.official_translation = sys.intern(self.official_translation)
+
     @classmethod
     def from_api_response(cls, tag_data: dict) -> "PixivTag":
         """从 API 响应创建标签对象"""
@@ -36,7 +46,7 @@ class PixivTag:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class PixivIllust:
     """Pixiv 插画数据模型"""
 
@@ -1,10 +1,18 @@
+import asyncio
+import heapq
 import logging
 import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Dict, List, Optional
 
-from .api.search import SearchAPI
+from . import shutdown
+from .api.client import RateLimitedError
+from .api.search import AsyncSearchAPI, SearchAPI
+from .crawl_state import CrawlState
+from .frontier import make_frontier
+from .recrawl import RecrawlScheduler
+from .seen_filter import SeenIllustFilter
 from .models import PixivTag
 
 logger = logging.getLogger(__name__)
@@ -17,6 +25,22 @@ class DFSNode:
     tag_name: str
     depth: int
     parent: Optional[str] = None
+    attempts: int = 0  # 因限流被挂起的次数
+    page: int = 1  # 本次搜索的页码
+    next_params: Optional[Dict] = None  # 上一页 next_url 解析出的参数
+    # 以下为 best-first 前沿的打分依据，在入队时填入
+    parent_yield: float = 0.0  # 父节点那一页每个插画带来的新标签数
+    frequency: int = 0  # 入队时已观测到的出现次数
+    translated: bool = False  # 是否有官方翻译
+
+
+@dataclass(order=True)
+class DeferredNode:
+    """因 429 挂起的搜索，按重试时刻排序"""
+
+    wake_at: float
+    seq: int
+    node: DFSNode = field(compare=False)
 
 
 @dataclass
@@ -25,8 +49,18 @@ class CollectionStats:
 
     tags_found: int = 0
     illusts_processed: int = 0
+    illusts_skipped: int = 0  # 之前已处理过而跳过的插画数
     tags_searched: int = 0
+    pages_fetched: int = 0  # 搜索请求的页数（含翻页）
     depth_reached: int = 0
+    searches_deferred: int = 0  # 因 429 挂起重试的次数
+    tags_dropped: int = 0  # 超过重试次数而放弃的标签数
+
+    @property
+    def skip_rate(self) -> float:
+        """收到的插画中已处理过的比例"""
+        total = self.illusts_processed + self.illusts_skipped
+        return self.illusts_skipped / total if total else 0.0
 
 
 class RecommendationBasedCollector:
@@ -37,20 +71,43 @@ class RecommendationBasedCollector:
         search_api: SearchAPI,
         storage,
         max_depth: int = 3,
+        async_search_api: Optional[AsyncSearchAPI] = None,
+        concurrency: int = 1,
+        frontier: Optional[str] = None,
+        crawl_state: Optional[CrawlState] = None,
+        seen_filter: Optional[SeenIllustFilter] = None,
     ):
         self.search_api = search_api
+        self.async_search_api = async_search_api
+        # 异步模式下同时在途的搜索数；为 1 或未提供异步 API 时使用同步模式
+        self.concurrency = max(1, concurrency)
         self.storage = storage
         self.max_depth = max_depth
+        # 搜索前沿策略：dfs（后进先出）或 best_first（按预期新颖度），默认读取 COLLECT_FRONTIER
+        self.frontier_strategy = frontier
+        # 提供时把前沿、已搜索标签和统计写入检查点，重启后从中断处继续
+        self.crawl_state = crawl_state
+        # 提供时每个插画的标签只计数一次，频率即“包含该标签的不同插画数”
+        self.seen_filter = seen_filter
         self.save_interval = int(
             os.getenv("SAVE_INTERVAL", "20")
         )  # 从环境变量读取保存间隔
         self.new_tags_count = 0
+        # 每个标签最多翻页数；一页新标签少于 page_min_new_tags 时不再翻页
+        self.max_pages = max(1, int(os.getenv("SEARCH_MAX_PAGES", "5")))
+        self.page_min_new_tags = max(1, int(os.getenv("SEARCH_PAGE_MIN_NEW_TAGS", "1")))
+        # 同一标签被限流挂起的最大次数
+        self.max_429_retries = int(os.getenv("PIXIV_429_MAX_RETRIES", "3"))
+        self._defer_seq = 0
+        self._searches_at_last_flush = 0
 
         # 统计信息
         self.stats = CollectionStats()
 
         # 停止标志
         self.should_stop_func = None
+        # 本次运行的请求上限（None 表示不限），达到后像收到停止信号一样保存进度退出
+        self._request_limit: Optional[int] = None
 
     def set_stop_flag(self, should_stop_func):
         """设置停止标志检查函数"""
@@ -58,15 +115,14 @@ class RecommendationBasedCollector:
 
     def check_stop(self):
         """检查是否应该停止"""
-        if hasattr(self, "should_stop_func") and self.should_stop_func():
+        if self.should_stop_func and self.should_stop_func():
             return True
-        # 尝试从main模块获取全局停止标志
-        try:
-            import main
-
-            return getattr(main, "should_stop", False)
-        except (ImportError, AttributeError):
-            return False
+        if (
+            self._request_limit is not None
+            and self.stats.pages_fetched >= self._request_limit
+        ):
+            return True
+        return shutdown.is_stopping()
 
     def _should_save_now(self) -> bool:
         """检查是否应该现在保存（SQLite 模式下由 _dfs_collect_tags 处理）"""
@@ -94,7 +150,7 @@ class RecommendationBasedCollector:
             # JSON 模式：基于搜索次数触发保存
             if self.stats.tags_searched % self.save_interval == 0:
                 try:
-                    self.storage.save_from_memory()
+                    self.storage.save_in_background()
                     logger.info(
                         f"Auto-saved {self.storage.get_memory_count()} tags to file"
                     )
@@ -122,6 +178,13 @@ class RecommendationBasedCollector:
     def _process_illusts(self, illusts: List[Dict], current_depth: int) -> List[str]:
         """处理插画列表，返回新发现的标签"""
         new_tag_names = []
+        # 按需加载模式下一页的标签合并为一次批量查询
+        self.storage.prefetch(
+            tag_data.get("name")
+            for illust in illusts
+            for tag_data in illust.get("tags", [])
+            if tag_data.get("name")
+        )
 
         for illust in illusts:
             # 检查停止标志
@@ -131,6 +194,11 @@ class RecommendationBasedCollector:
             illust_id = illust.get("id")
             if not illust_id:
                 continue
+            if self.seen_filter is not None and self.seen_filter.check_and_add(
+                illust_id
+            ):
+                self.stats.illusts_skipped += 1
+                continue
             self.stats.illusts_processed += 1
 
             # 获取插画的所有标签
@@ -211,135 +279,499 @@ class RecommendationBasedCollector:
 
         return new_tag_names
 
-    def _dfs_collect_tags(self, start_tags: List[str]) -> CollectionStats:
-        """深度优先收集标签"""
-        # 使用栈实现深度优先搜索
-        stack: List[DFSNode] = []
-
-        # 初始化栈，将起始标签作为深度0
+    def _make_node(
+        self, tag_name: str, depth: int, parent: Optional[str] = None, **kwargs
+    ) -> DFSNode:
+        """创建搜索节点，并填入前沿打分所需的标签信息"""
+        tag = self.storage.get_tag(tag_name)
+        return DFSNode(
+            tag_name=tag_name,
+            depth=depth,
+            parent=parent,
+            frequency=tag.frequency if tag else 0,
+            translated=bool(tag and tag.official_translation),
+            **kwargs,
+        )
+
+    def _new_frontier(
+        self, start_tags: List[str], seed_nodes: Optional[List[DFSNode]] = None
+    ):
+        """创建搜索前沿，加入种子节点和深度 0 的起始标签
+
+        种子节点（检查点恢复的节点或重新搜索的已知标签）直接入队，
+        不做已搜索检查，也由调用方负责记入检查点。
+        """
+        frontier = make_frontier(self.frontier_strategy)
+        for node in seed_nodes or []:
+            frontier.push(node)
         for tag_name in start_tags:
-            stack.append(DFSNode(tag_name=tag_name, depth=0))
+            self._push(frontier, self._make_node(tag_name, 0))
+        logger.info(f"搜索前沿策略: {frontier.name}")
+        return frontier
+
+    def _push(self, frontier, node: DFSNode):
+        """加入前沿；已搜索过的标签首页跳过，新入队的节点记入检查点"""
+        if (
+            node.page == 1
+            and self.crawl_state is not None
+            and self.crawl_state.is_searched(node.tag_name)
+        ):
+            return
+        if frontier.push(node) and self.crawl_state is not None:
+            self.crawl_state.on_push(node)
+
+    def _expand_node(
+        self,
+        node: DFSNode,
+        illusts: List[Dict],
+        frontier,
+        next_params: Optional[Dict] = None,
+    ) -> int:
+        """处理一个标签的一页搜索结果：提取新标签并以深度+1加入前沿，返回新标签数
+
+        这一页仍有足够的新标签且存在下一页时，把下一页也加入前沿，
+        让请求预算优先花在仍在产出新标签的标签上。
+        """
+        if not illusts:
+            logger.debug(f"标签 '{node.tag_name}' 没有找到相关插画")
+            return 0
+
+        # 处理插画，提取新标签
+        new_tag_names = self._process_illusts(illusts, node.depth)
+        page_yield = len(new_tag_names) / len(illusts)
+
+        # 将新标签加入前沿（深度+1）
+        if node.depth < self.max_depth:
+            for tag_name in new_tag_names:
+                self._push(
+                    frontier,
+                    self._make_node(
+                        tag_name,
+                        node.depth + 1,
+                        node.tag_name,
+                        parent_yield=page_yield,
+                    )
+                )
 
-        while stack and not self.check_stop():
-            node = stack.pop()
-            current_tag = node.tag_name
-            current_depth = node.depth
+        if (
+            next_params
+            and node.page < self.max_pages
+            and len(new_tag_names) >= self.page_min_new_tags
+        ):
+            self._push(
+                frontier,
+                self._make_node(
+                    node.tag_name,
+                    node.depth,
+                    node.parent,
+                    page=node.page + 1,
+                    next_params=next_params,
+                    parent_yield=page_yield,
+                )
+            )
+        elif node.page > 1:
+            logger.debug(
+                f"标签 '{node.tag_name}' 第 {node.page} 页新增 {len(new_tag_names)} 个标签，停止翻页"
+            )
+        return len(new_tag_names)
 
-            # 更新统计
+    def _on_search_finished(self, node: DFSNode, new_tags: int):
+        """每次搜索完成后：记入检查点，按请求页数定期同步并输出进度"""
+        self.stats.pages_fetched += 1
+        if node.page == 1:
             self.stats.tags_searched += 1
-            self.stats.depth_reached = max(self.stats.depth_reached, current_depth)
+        if self.crawl_state is not None:
+            self.crawl_state.on_searched(node.tag_name, node.page, new_tags)
+            self.crawl_state.on_done(node)
+
+        # 每 N 次请求同步一次（基于请求次数，而非插画计数）
+        if self.stats.pages_fetched % self.save_interval == 0:
+            if self.storage.mode == "sqlite":
+                self.storage.sync_to_database()
+                logger.debug(
+                    f"自动同步: 已搜索 {self.stats.tags_searched} 个标签，"
+                    f"待同步新标签 {len(self.storage.pending_new_tags)}，"
+                    f"待同步频率操作 {len(self.storage.pending_freq_ops)}"
+                )
+            else:
+                self.storage.save_in_background()
+                logger.info(
+                    f"Auto-saved {self.storage.get_memory_count()} tags to file"
+                )
+            self._checkpoint()
 
-            logger.info(f"搜索标签 '{current_tag}' (深度: {current_depth})")
+        # 每10次请求输出一次进度
+        if self.stats.pages_fetched % 10 == 0:
+            logger.info(
+                f"📈 进度: 已搜索 {self.stats.tags_searched} 个标签 "
+                f"({self.stats.pages_fetched} 页)，"
+                f"发现 {self.stats.tags_found} 个新标签，"
+                f"处理 {self.stats.illusts_processed} 个插画 "
+                f"(跳过率 {self.stats.skip_rate:.0%})，"
+                f"最大深度 {self.stats.depth_reached}"
+            )
+
+    @staticmethod
+    def _log_search(node: DFSNode):
+        if node.page > 1:
+            logger.info(
+                f"搜索标签 '{node.tag_name}' 第 {node.page} 页 (深度: {node.depth})"
+            )
+        else:
+            logger.info(f"搜索标签 '{node.tag_name}' (深度: {node.depth})")
+
+    def _defer(self, deferred: List[DeferredNode], node: DFSNode, error: RateLimitedError):
+        """把被限流的搜索挂起到重试时刻；真正收到 429 超过重试次数则放弃该标签"""
+        if error.throttled:
+            node.attempts += 1
+        if node.attempts > self.max_429_retries:
+            self.stats.tags_dropped += 1
+            # 节点仍保留在检查点中，运行中断后重启时会重试
+            logger.warning(
+                f"标签 '{node.tag_name}' 连续 {node.attempts} 次被限流，放弃搜索"
+            )
+            return
+        self._defer_seq += 1
+        heapq.heappush(
+            deferred,
+            DeferredNode(time.monotonic() + error.retry_after, self._defer_seq, node),
+        )
+        self.stats.searches_deferred += 1
+        logger.info(
+            f"标签 '{node.tag_name}' 被限流，{error.retry_after:.1f} 秒后重试 "
+            f"(第 {node.attempts}/{self.max_429_retries} 次，挂起 {len(deferred)} 个)"
+        )
+
+    @staticmethod
+    def _pop_ready(deferred: List[DeferredNode]) -> Optional[DFSNode]:
+        """取出已到重试时刻的挂起搜索"""
+        if deferred and deferred[0].wake_at <= time.monotonic():
+            return heapq.heappop(deferred).node
+        return None
+
+    def _flush_while_idle(self):
+        """等待限流结束期间先把已收集的数据落盘"""
+        if self._searches_at_last_flush == self.stats.pages_fetched:
+            return
+        self._searches_at_last_flush = self.stats.pages_fetched
+        self.storage.save_in_background()
+        self._checkpoint()
+        logger.debug(f"限流等待期间已保存 {self.storage.get_memory_count()} 个标签")
+
+    def _checkpoint(self, finished: bool = False, wait: bool = False):
+        """在已提交的标签数据写出之后写入已处理插画和收集进度检查点
+
+        先提交待写的标签更新，再把取出的插画 ID 和检查点增量排在它们之后写入
+        （启用后台写入时由写入线程写），保证“标签频率已落盘”先于“插画已标记为
+        处理过”。标签同步保存失败时不写检查点，增量留到下次。wait=True 时等待写完。
+        """
+        if self.seen_filter is None and self.crawl_state is None:
+            return
+        if not self.storage.save_in_background():
+            logger.error("标签保存失败，推迟写入收集进度")
+            return
+
+        seen_ids = self.seen_filter.take_pending() if self.seen_filter else []
+        delta = (
+            self.crawl_state.take_checkpoint(self.stats, finished=finished)
+            if self.crawl_state is not None
+            else None
+        )
+
+        def write():
+            if seen_ids:
+                self.seen_filter.write(seen_ids)
+            if delta is not None:
+                self.crawl_state.write_checkpoint(delta)
+
+        try:
+            if not self.storage.after_write(write, wait=wait):
+                logger.error("收集进度尚未写入，将在下次写入成功后重试")
+        except Exception as e:
+            # 未启用后台写入时写入在当前线程失败：放回增量，下次检查点重试
+            if seen_ids:
+                self.seen_filter.restore(seen_ids)
+            if delta is not None:
+                self.crawl_state.restore(delta)
+            logger.error(f"保存收集进度失败: {e}")
+
+    def _resume(self) -> List[DFSNode]:
+        """从检查点恢复未完成的运行，返回待搜索的前沿节点"""
+        if self.crawl_state is None:
+            return []
+        if not self.crawl_state.resume_run(self.stats):
+            return []
+        known = {f.name for f in fields(DFSNode)}
+        nodes = [
+            DFSNode(**{k: v for k, v in data.items() if k in known and k != "attempts"})
+            for data in self.crawl_state.load_frontier()
+        ]
+        logger.info(
+            f"♻️  从检查点恢复: {len(nodes)} 个待搜索节点，"
+            f"已搜索 {self.stats.tags_searched} 个标签"
+        )
+        return nodes
+
+    def _dfs_collect_tags(
+        self, start_tags: List[str], seed_nodes: Optional[List[DFSNode]] = None
+    ) -> CollectionStats:
+        """按前沿策略收集标签（请求间隔由客户端的限速器控制）
+
+        被限流的搜索挂起到 deferred 堆中，其余标签继续搜索；
+        只剩挂起搜索或处于全局退避时先保存数据，再等待到重试时刻。
+        """
+        frontier = self._new_frontier(start_tags, seed_nodes)
+        deferred: List[DeferredNode] = []
+
+        rate_limiter = self.search_api.client.rate_limiter
+
+        while (frontier or deferred) and not self.check_stop():
+            # 全局退避期间或只剩未到期的挂起搜索时，不发请求
+            idle_for = rate_limiter.backoff_remaining()
+            if not frontier and deferred[0].wake_at > time.monotonic():
+                idle_for = max(idle_for, deferred[0].wake_at - time.monotonic())
+            if idle_for > 0:
+                self._flush_while_idle()
+                shutdown.wait(idle_for)
+                continue
 
-            # 按标签搜索插画
-            time.sleep(1)  # 请求间隔
+            node = self._pop_ready(deferred) or frontier.pop()
+            self.stats.depth_reached = max(self.stats.depth_reached, node.depth)
+
+            self._log_search(node)
+
+            # 按标签搜索插画（一页）
             try:
-                illusts = self.search_api.search_illust_by_tag(current_tag, limit=20)
+                illusts, next_params = self.search_api.search_illust_page(
+                    node.tag_name, node.next_params, limit=20
+                )
+            except RateLimitedError as e:
+                self._defer(deferred, node, e)
+                continue
             except Exception as e:
-                if "429" in str(e) or "Too Many Requests" in str(e):
-                    logger.error(f"429错误处理失败: {e}")
-                    logger.info("程序将尝试从其他标签继续...")
-                    continue
-                else:
-                    logger.error(f"搜索标签 '{current_tag}' 时出错: {e}")
-                    continue
-
-            if not illusts:
-                logger.debug(f"标签 '{current_tag}' 没有找到相关插画")
+                logger.error(f"搜索标签 '{node.tag_name}' 时出错: {e}")
                 continue
 
-            # 处理插画，提取新标签
-            new_tag_names = self._process_illusts(illusts, current_depth)
-
-            # 将新标签加入栈（深度+1）
-            if current_depth < self.max_depth:
-                for tag_name in new_tag_names:
-                    stack.append(
-                        DFSNode(
-                            tag_name=tag_name,
-                            depth=current_depth + 1,
-                            parent=current_tag,
-                        )
-                    )
+            new_tags = self._expand_node(node, illusts, frontier, next_params)
+            self._on_search_finished(node, new_tags)
 
-            # 每 N 次搜索同步一次（基于搜索次数，而非插画计数）
-            self.stats.tags_searched += 1
-            if self.stats.tags_searched % self.save_interval == 0:
-                if self.storage.mode == "sqlite":
-                    self.storage.sync_to_database()
-                    logger.debug(
-                        f"自动同步: 已搜索 {self.stats.tags_searched} 个标签，"
-                        f"待同步新标签 {len(self.storage.pending_new_tags)}，"
-                        f"待同步频率操作 {len(self.storage.pending_freq_ops)}"
+        return self.stats
+
+    async def _dfs_collect_tags_async(
+        self,
+        start_tags: List[str],
+        concurrency: int,
+        seed_nodes: Optional[List[DFSNode]] = None,
+    ) -> CollectionStats:
+        """并发收集标签：concurrency 个 worker 共享同一个前沿，同时保持多个搜索在途
+
+        被限流的搜索挂起到 deferred 堆中，不占用 worker；空闲 worker 等待
+        在途搜索加入新标签或最早的挂起搜索到期，期间保存已收集的数据。
+        前沿和挂起堆都为空且没有在途搜索时全部结束。
+        """
+        frontier = self._new_frontier(start_tags, seed_nodes)
+        deferred: List[DeferredNode] = []
+        in_flight = 0
+        condition = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+
+        async def notify_all():
+            async with condition:
+                condition.notify_all()
+
+        def on_stop():
+            # 可能在信号处理器中调用，切回事件循环唤醒所有等待的 worker
+            loop.call_soon_threadsafe(lambda: loop.create_task(notify_all()))
+
+        async def next_node() -> Optional[DFSNode]:
+            nonlocal in_flight
+            async with condition:
+                while not self.check_stop():
+                    node = self._pop_ready(deferred)
+                    if node is None and frontier:
+                        node = frontier.pop()
+                    if node is not None:
+                        in_flight += 1
+                        return node
+                    if not deferred and in_flight == 0:
+                        break
+
+                    # 等待在途搜索的结果或最早的挂起搜索到期
+                    timeout = None
+                    if deferred:
+                        timeout = max(0.0, deferred[0].wake_at - time.monotonic())
+                    if in_flight == 0:
+                        self._flush_while_idle()
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                condition.notify_all()
+                return None
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                node = await next_node()
+                if node is None:
+                    return
+
+                try:
+                    self.stats.depth_reached = max(
+                        self.stats.depth_reached, node.depth
                     )
-                else:
-                    self.storage.save_from_memory()
-                    logger.info(
-                        f"Auto-saved {self.storage.get_memory_count()} tags to file"
+                    self._log_search(node)
+                    try:
+                        (
+                            illusts,
+                            next_params,
+                        ) = await self.async_search_api.search_illust_page(
+                            node.tag_name, node.next_params, limit=20
+                        )
+                    except RateLimitedError as e:
+                        self._defer(deferred, node, e)
+                        continue
+                    except Exception as e:
+                        logger.error(f"搜索标签 '{node.tag_name}' 时出错: {e}")
+                        continue
+
+                    # 结果处理在事件循环中串行执行，存储无需额外加锁
+                    new_tags = self._expand_node(
+                        node, illusts, frontier, next_params
                     )
+                    self._on_search_finished(node, new_tags)
+                finally:
+                    async with condition:
+                        in_flight -= 1
+                        condition.notify_all()
 
-            # 每10个搜索输出一次进度
-            if self.stats.tags_searched % 10 == 0:
-                logger.info(
-                    f"📈 进度: 已搜索 {self.stats.tags_searched} 个标签，"
-                    f"发现 {self.stats.tags_found} 个新标签，"
-                    f"处理 {self.stats.illusts_processed} 个插画，"
-                    f"最大深度 {self.stats.depth_reached}"
-                )
-
+        shutdown.add_callback(on_stop)
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            shutdown.remove_callback(on_stop)
         return self.stats
 
+    async def _run_async(
+        self, start_tags: List[str], seed_nodes: Optional[List[DFSNode]] = None
+    ) -> CollectionStats:
+        """在同一个事件循环中完成并发收集并关闭异步客户端的连接池"""
+        try:
+            return await self._dfs_collect_tags_async(
+                start_tags, self.concurrency, seed_nodes
+            )
+        finally:
+            await self.async_search_api.client.aclose()
+
+    def _fetch_recommended_illusts(self) -> List[Dict]:
+        """获取推荐插画；此时还没有其他工作可做，被限流时等待到重试时刻"""
+        attempts = 0
+        while True:
+            try:
+                return self.search_api.get_recommended_illusts(limit=30)
+            except RateLimitedError as e:
+                if e.throttled:
+                    attempts += 1
+                if attempts > self.max_429_retries:
+                    raise
+                logger.info(f"获取推荐插画被限流，{e.retry_after:.1f} 秒后重试")
+                if shutdown.wait(e.retry_after):
+                    return []
+
+    def _seed_from_recommendations(self) -> Optional[List[str]]:
+        """获取推荐插画并提取新标签作为起点，失败时返回 None"""
+        logger.info("获取推荐插画...")
+        try:
+            recommended_illusts = self._fetch_recommended_illusts()
+        except RateLimitedError as e:
+            logger.error(f"获取推荐插画时遇到429错误: {e}")
+            logger.error("请稍后再试，或减少请求频率")
+            return None
+        except Exception as e:
+            logger.error(f"获取推荐插画失败: {e}")
+            return None
+
+        if not recommended_illusts:
+            logger.error("无法获取推荐插画，尝试备用方案...")
+            return None
+
+        logger.info(f"获取到 {len(recommended_illusts)} 个推荐插画")
+
+        initial_tags = self._process_illusts(recommended_illusts, 0)
+        logger.info(f"从推荐插画中提取到 {len(initial_tags)} 个初始标签")
+
+        if not initial_tags:
+            logger.warning("推荐插画中没有发现新标签")
+            return None
+        return initial_tags
+
     def collect_from_recommendations(self) -> int:
         """从推荐流开始深度优先收集标签"""
         logger.info(f"开始基于推荐流的深度优先标签收集 (最大深度: {self.max_depth})")
-
+        return self._collect(lambda: (self._seed_from_recommendations(), []))
+
+    def recrawl_known_tags(self, scheduler: RecrawlScheduler) -> int:
+        """按调度器挑选的到期已知标签重新搜索，最多发出 scheduler.budget 个请求"""
+        if self.crawl_state is None:
+            raise ValueError("重新搜索模式需要收集进度检查点 (CRAWL_CHECKPOINT=true)")
+        logger.info(
+            f"开始重新搜索已知标签 (请求预算: {scheduler.budget}, 最大深度: {self.max_depth})"
+        )
+
+        def seed():
+            nodes = [
+                self._make_node(tag_name, 0)
+                for tag_name in scheduler.select(self.storage, self.crawl_state)
+            ]
+            for node in nodes:
+                self.crawl_state.on_push(node)
+            return ([], nodes) if nodes else (None, [])
+
+        return self._collect(seed, request_budget=scheduler.budget)
+
+    def _collect(self, seed, request_budget: Optional[int] = None) -> int:
+        """运行一次收集：有未完成的检查点时从中断处继续，否则调用 seed 获取起点
+
+        seed 返回 (起始标签, 种子节点)，起始标签为 None 表示无法开始。
+        """
         start_time = time.time()
         initial_tag_count = self.storage.get_memory_count()
 
         try:
-            # 1. 获取推荐插画作为起点
-            logger.info("获取推荐插画...")
-            try:
-                recommended_illusts = self.search_api.get_recommended_illusts(limit=30)
-            except Exception as e:
-                if "429" in str(e) or "Too Many Requests" in str(e):
-                    logger.error(f"获取推荐插画时遇到429错误: {e}")
-                    logger.error("请稍后再试，或减少请求频率")
-                    return 0
-                else:
-                    logger.error(f"获取推荐插画失败: {e}")
+            # 0. 有未完成的检查点时从中断处继续，不再重新选择起点
+            seed_nodes = self._resume()
+            initial_tags: List[str] = []
+            if request_budget is not None:
+                self._request_limit = self.stats.pages_fetched + request_budget
+
+            if not seed_nodes:
+                # 1. 选择起点（推荐流中的新标签或到期的已知标签）
+                initial_tags, seed_nodes = seed()
+                if initial_tags is None:
                     return 0
 
-            if not recommended_illusts:
-                logger.error("无法获取推荐插画，尝试备用方案...")
-                return 0
-
-            logger.info(f"获取到 {len(recommended_illusts)} 个推荐插画")
-
-            # 2. 从推荐插画中提取初始标签
-            initial_tags = self._process_illusts(recommended_illusts, 0)
-            logger.info(f"从推荐插画中提取到 {len(initial_tags)} 个初始标签")
-
-            if not initial_tags:
-                logger.warning("推荐插画中没有发现新标签")
-                return 0
-
-            # 3. 深度优先搜索
-            logger.info(f"开始深度优先搜索，初始标签数量: {len(initial_tags)}")
-            stats = self._dfs_collect_tags(initial_tags)
+            # 2. 按前沿策略搜索
+            logger.info(
+                f"开始深度优先搜索，初始标签数量: {len(initial_tags) + len(seed_nodes)}"
+            )
+            if self.async_search_api and self.concurrency > 1:
+                logger.info(f"异步模式: {self.concurrency} 个并发搜索")
+                stats = asyncio.run(self._run_async(initial_tags, seed_nodes))
+            else:
+                stats = self._dfs_collect_tags(initial_tags, seed_nodes)
 
-            # 4. 强制保存最终结果
+            # 3. 强制保存最终结果；没有被中断说明前沿已耗尽，本次运行结束
             self._try_save(force=True)
+            self._checkpoint(finished=not self.check_stop(), wait=True)
 
-            # 5. 输出统计信息
+            # 4. 输出统计信息
             final_tag_count = self.storage.get_memory_count()
             total_new_count = final_tag_count - initial_tag_count
             total_time = time.time() - start_time
 
             # 频率统计
-            all_tags = self.storage.get_memory_tags()
-            total_frequency = sum(tag.frequency for tag in all_tags)
-            avg_frequency = total_frequency / len(all_tags) if all_tags else 0
+            tag_count, total_frequency, _ = self.storage.frequency_summary()
+            avg_frequency = total_frequency / tag_count if tag_count else 0
 
             logger.info("🎉 深度优先收集完成！")
             logger.info(f"⏱️  总用时: {total_time / 60:.1f} 分钟")
@@ -348,8 +780,13 @@ class RecommendationBasedCollector:
             logger.info(
                 f"📈 频率统计: 总出现次数 {total_frequency}，平均频率 {avg_frequency:.1f}"
             )
-            logger.info(f"🔍 搜索标签数: {stats.tags_searched} 个")
-            logger.info(f"🎨 处理插画数: {stats.illusts_processed} 个")
+            logger.info(
+                f"🔍 搜索标签数: {stats.tags_searched} 个 (共请求 {stats.pages_fetched} 页)"
+            )
+            logger.info(
+                f"🎨 处理插画数: {stats.illusts_processed} 个，"
+                f"跳过已处理 {stats.illusts_skipped} 个 (跳过率 {stats.skip_rate:.1%})"
+            )
             logger.info(f"📏 最大深度: {stats.depth_reached}")
 
             if total_time > 0:
@@ -362,10 +799,19 @@ class RecommendationBasedCollector:
             logger.error(f"深度优先收集过程中出错: {e}")
             # 尝试保存已收集的数据
             self._try_save(force=True)
+            self._checkpoint(wait=True)
+            raise
+        except KeyboardInterrupt:
+            # 数据由 main 保存；这里把收集进度排在已收集的标签之后写入
+            self._checkpoint(wait=True)
             raise
 
     def load_existing_data(self):
-        """加载现有数据（推荐模式为无状态，不需要加载进度）"""
-        existing_tags = self.storage.get_memory_tags()
-        logger.info(f"当前存储中有 {len(existing_tags)} 个标签")
-        # 推荐模式是无状态的，不需要维护去重集合
+        """加载现有数据和已搜索标签集合"""
+        logger.info(f"当前存储中有 {self.storage.get_memory_count()} 个标签")
+        if self.crawl_state is not None:
+            searched = self.crawl_state.load_searched()
+            logger.info(f"已搜索过 {searched} 个标签")
+        if self.seen_filter is not None:
+            seen = self.seen_filter.load()
+            logger.info(f"已处理过 {seen} 个插画")
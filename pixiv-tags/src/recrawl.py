@@ -0,0 +1,76 @@
+import heapq
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .crawl_state import CrawlState
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+
+@dataclass
+class RecrawlScheduler:
+    """按过期程度挑选需要重新搜索的已知标签
+
+    标签上次搜索后经过 base_interval * 2^empty_streak（不超过 max_interval）
+    即到期，empty_streak 为连续没有发现新标签的搜索次数，因此没有产出的标签
+    重新搜索的间隔按指数退避。到期标签按 过期倍数 * (1 + log(1 + frequency))
+    排序，从未搜索过的已知标签排在最前（按频率）。每次运行最多发出 budget 个请求，
+    重新搜索中发现的新标签照常加入前沿，在预算内继续展开。
+
+    通过环境变量配置（见 from_env）：
+
+        RECRAWL_BUDGET        每次运行的请求预算 (默认: 500)
+        RECRAWL_BASE_DAYS     基础重新搜索间隔，天 (默认: 7)
+        RECRAWL_MAX_DAYS      退避后的最大间隔，天 (默认: 180)
+    """
+
+    budget: int = 500
+    base_interval: float = 7 * DAY
+    max_interval: float = 180 * DAY
+
+    @classmethod
+    def from_env(cls) -> "RecrawlScheduler":
+        return cls(
+            budget=int(os.getenv("RECRAWL_BUDGET", "500")),
+            base_interval=float(os.getenv("RECRAWL_BASE_DAYS", "7")) * DAY,
+            max_interval=float(os.getenv("RECRAWL_MAX_DAYS", "180")) * DAY,
+        )
+
+    def interval(self, empty_streak: int) -> float:
+        """连续 empty_streak 次没有新标签后的重新搜索间隔（秒）"""
+        # 指数上限避免溢出；超过 max_interval 的部分本来也会被截断
+        return min(self.base_interval * 2 ** min(empty_streak, 32), self.max_interval)
+
+    def select(
+        self, storage, crawl_state: CrawlState, now: Optional[float] = None
+    ) -> List[str]:
+        """挑选本次运行要重新搜索的标签，数量不超过预算"""
+        now = now if now is not None else time.time()
+        schedule = crawl_state.load_schedule()
+
+        candidates = []
+        never_searched = 0
+        for name, frequency in storage.iter_tag_frequencies():
+            weight = 1.0 + math.log1p(frequency)
+            entry = schedule.get(name)
+            if entry is None:
+                never_searched += 1
+                candidates.append(((1, weight), name))
+                continue
+            searched_at, empty_streak = entry
+            overdue = (now - searched_at) / self.interval(empty_streak)
+            if overdue >= 1.0:
+                candidates.append(((0, overdue * weight), name))
+
+        selected = heapq.nlargest(self.budget, candidates)
+        logger.info(
+            f"重新搜索调度: {len(candidates)} 个标签到期 (其中从未搜索 {never_searched} 个)，"
+            f"本次选取 {len(selected)} 个"
+        )
+        return [name for _, name in selected]
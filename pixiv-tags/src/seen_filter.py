@@ -0,0 +1,114 @@
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from typing import List, Optional, Set
+
+from .sqlite_connection import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class SeenIllustFilter:
+    """已处理插画 ID 集合，保证每个插画的标签只计数一次
+
+    已持久化的 ID 以有序 array('Q') 常驻内存（每个 8 字节），用二分查找判断；
+    本次运行新见到的 ID 先放在小集合中，超过 merge_threshold 后归并进有序数组。
+    新 ID 在 flush() 时追加写入数据库的 seen_illusts 表，收集器在同步标签时一起调用，
+    保证“标签频率已落盘”与“插画已标记为处理过”同步推进。
+
+    需要把写入排在其他写入之后时，用 take_pending() 取出新 ID，再 write()；
+    写入失败时 restore() 放回，下次一起重试。
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/pixiv_tags.db",
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+        merge_threshold: int = 65536,
+    ):
+        self.db_path = db_path
+        self.connection_manager = (
+            connection_manager or SQLiteConnectionManager.shared(db_path)
+        )
+        self.merge_threshold = merge_threshold
+
+        self._sorted = array("Q")
+        self._recent: Set[int] = set()
+        self._pending: List[int] = []
+
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.connection_manager.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_illusts (id INTEGER PRIMARY KEY)"
+            )
+            conn.commit()
+
+    def load(self) -> int:
+        """从数据库加载已处理的插画 ID，返回数量"""
+        with self.connection_manager.connection() as conn:
+            cursor = conn.execute("SELECT id FROM seen_illusts ORDER BY id")
+            self._sorted = array("Q", (row[0] for row in cursor))
+        self._recent.clear()
+        return len(self._sorted)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, illust_id: int) -> bool:
+        if illust_id in self._recent:
+            return True
+        index = bisect_left(self._sorted, illust_id)
+        return index < len(self._sorted) and self._sorted[index] == illust_id
+
+    def check_and_add(self, illust_id: int) -> bool:
+        """已处理过返回 True；否则记录该 ID 并返回 False"""
+        illust_id = int(illust_id)
+        if illust_id in self:
+            return True
+        self._recent.add(illust_id)
+        self._pending.append(illust_id)
+        if len(self._recent) >= self.merge_threshold:
+            self._merge()
+        return False
+
+    def _merge(self):
+        """把新 ID 线性归并进新的有序数组，只对小集合排序，不把数组转成列表"""
+        merged = array("Q")
+        merged.extend(heapq.merge(self._sorted, sorted(self._recent)))
+        self._sorted = merged
+        self._recent.clear()
+
+    def take_pending(self) -> List[int]:
+        """取出尚未写入数据库的新 ID"""
+        pending = self._pending
+        self._pending = []
+        return pending
+
+    def restore(self, illust_ids: List[int]):
+        """放回写入失败的 ID，下次 flush() 重试"""
+        self._pending = illust_ids + self._pending
+
+    def write(self, illust_ids: List[int]) -> int:
+        """把 ID 写入数据库（可在其他线程调用），返回写入数量"""
+        if not illust_ids:
+            return 0
+        with self.connection_manager.connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_illusts (id) VALUES (?)",
+                [(illust_id,) for illust_id in illust_ids],
+            )
+            conn.commit()
+        logger.debug(f"已记录 {len(illust_ids)} 个新处理的插画")
+        return len(illust_ids)
+
+    def flush(self) -> int:
+        """把新记录的 ID 写入数据库，返回写入数量；失败时 ID 保留到下次"""
+        pending = self.take_pending()
+        try:
+            return self.write(pending)
+        except Exception:
+            self.restore(pending)
+            raise
@@ -0,0 +1,80 @@
+"""进程级退出信号
+
+信号处理器调用 request_stop()；同步代码用 wait() 代替轮询 sleep，
+异步代码用 wait_async()，收到退出信号时立即返回而不必等到超时。
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_stop_event = threading.Event()
+# 写时复制：注册和移除时整体替换元组，信号处理器中只读取引用、不加锁，
+# 主线程持有 _callbacks_lock 时被信号打断也不会死锁
+_callbacks: Tuple[Callable[[], None], ...] = ()
+_callbacks_lock = threading.Lock()
+
+
+def request_stop():
+    """设置退出信号并唤醒所有等待者"""
+    _stop_event.set()
+    for callback in _callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.debug(f"退出回调执行失败: {e}")
+
+
+def is_stopping() -> bool:
+    """是否已收到退出信号"""
+    return _stop_event.is_set()
+
+
+def wait(timeout: Optional[float] = None) -> bool:
+    """阻塞等待最多 timeout 秒，收到退出信号时提前返回 True"""
+    return _stop_event.wait(timeout)
+
+
+def add_callback(callback: Callable[[], None]):
+    """注册收到退出信号时调用的回调（可能在信号处理器中执行，应尽量轻量）"""
+    global _callbacks
+    with _callbacks_lock:
+        _callbacks = _callbacks + (callback,)
+
+
+def remove_callback(callback: Callable[[], None]):
+    """移除已注册的回调"""
+    global _callbacks
+    with _callbacks_lock:
+        if callback in _callbacks:
+            callbacks = list(_callbacks)
+            callbacks.remove(callback)
+            _callbacks = tuple(callbacks)
+
+
+async def wait_async(timeout: Optional[float] = None) -> bool:
+    """异步等待最多 timeout 秒，收到退出信号时提前返回 True"""
+    if _stop_event.is_set():
+        return True
+
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+
+    def wake():
+        loop.call_soon_threadsafe(
+            lambda: stopped.done() or stopped.set_result(True)
+        )
+
+    add_callback(wake)
+    try:
+        if _stop_event.is_set():
+            return True
+        await asyncio.wait_for(stopped, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return _stop_event.is_set()
+    finally:
+        remove_callback(wake)
@@ -0,0 +1,129 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnectionManager:
+    """SQLite 长连接管理：每个线程复用一个连接，首次连接时应用 PRAGMA
+
+    同一数据库文件通过 shared() 获取同一个管理器，收集器、翻译脚本和 WebUI
+    因此共享连接与 schema 初始化状态。PRAGMA 可通过参数或环境变量配置：
+
+        SQLITE_JOURNAL_MODE   日志模式 (默认: WAL)
+        SQLITE_SYNCHRONOUS    同步级别 (默认: NORMAL)
+        SQLITE_CACHE_SIZE     页缓存大小，负数表示 KiB (默认: -65536，即 64MB)
+        SQLITE_MMAP_SIZE      内存映射大小，字节 (默认: 268435456，即 256MB)
+        SQLITE_BUSY_TIMEOUT   锁等待超时，毫秒 (默认: 5000)
+    """
+
+    _shared: Dict[str, "SQLiteConnectionManager"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        db_path: str,
+        journal_mode: Optional[str] = None,
+        synchronous: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        mmap_size: Optional[int] = None,
+        busy_timeout: Optional[int] = None,
+    ):
+        self.db_path = db_path
+        self.journal_mode = journal_mode or os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.synchronous = synchronous or os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.cache_size = (
+            cache_size
+            if cache_size is not None
+            else int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+        )
+        self.mmap_size = (
+            mmap_size
+            if mmap_size is not None
+            else int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+        )
+        self.busy_timeout = (
+            busy_timeout
+            if busy_timeout is not None
+            else int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+        )
+
+        # schema 初始化状态由所有共享此管理器的 SQLiteStorage 共用
+        self.schema_initialized = False
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, db_path: str) -> "SQLiteConnectionManager":
+        """获取指定数据库文件的共享管理器（按绝对路径区分）"""
+        key = os.path.abspath(db_path)
+        with cls._shared_lock:
+            manager = cls._shared.get(key)
+            if manager is None:
+                manager = cls(db_path)
+                cls._shared[key] = manager
+            return manager
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并应用 PRAGMA"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 连接只在创建它的线程中使用；关闭允许在其他线程统一进行
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+
+        with self._lock:
+            self._connections.append(conn)
+
+        logger.debug(
+            f"打开 SQLite 连接: {self.db_path} (线程: {threading.current_thread().name})"
+        )
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接（不存在时创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """获取当前线程的连接；出错时回滚未提交的事务，连接保持打开"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def close(self):
+        """关闭本管理器打开的所有连接"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"关闭 SQLite 连接失败: {e}")
+
+        # 重置线程本地存储，各线程下次访问时重新建立连接
+        self._local = threading.local()
+        logger.debug(f"已关闭 {len(connections)} 个 SQLite 连接: {self.db_path}")
@@ -1,9 +1,9 @@
 import sqlite3
-import os
 import logging
 from contextlib import contextmanager
-from typing import List, Optional, Tuple
+from typing import Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 from .models import PixivTag
+from .sqlite_connection import SQLiteConnectionManager
 
 logger = logging.getLogger(__name__)
 
@@ -11,27 +11,32 @@ logger = logging.getLogger(__name__)
 class SQLiteStorage:
     """SQLite 标签存储管理（同步实现）"""
 
-    def __init__(self, db_path: str = "data/pixiv_tags.db"):
+    def __init__(
+        self,
+        db_path: str = "data/pixiv_tags.db",
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+    ):
         self.db_path = db_path
-        self._init_done = False
+        # 默认与同一数据库文件的其他使用方共享连接管理器
+        self.connection_manager = (
+            connection_manager or SQLiteConnectionManager.shared(db_path)
+        )
 
     @contextmanager
     def _get_connection(self):
-        """获取数据库连接（自动关闭）"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
+        """获取当前线程的长连接（出错时回滚，不关闭连接）"""
+        with self.connection_manager.connection() as conn:
             yield conn
-        finally:
-            conn.close()
+
+    def close(self):
+        """关闭所有长连接"""
+        self.connection_manager.close()
 
     def init(self):
-        """初始化数据库（只执行一次）"""
-        if self._init_done:
+        """初始化数据库（每个连接管理器只执行一次）"""
+        if self.connection_manager.schema_initialized:
             return
 
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-
         with self._get_connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS pixiv_tags (
@@ -46,17 +51,300 @@ class SQLiteStorage:
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_frequency ON pixiv_tags(frequency DESC)"
-            )
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_translation ON pixiv_tags(official_translation)"
             )
+            self._init_navigation(conn)
+            self._init_review_counts(conn)
+            self._init_fts(conn)
             conn.commit()
 
-        self._init_done = True
+        self.connection_manager.schema_initialized = True
         logger.info(f"SQLite 数据库初始化完成: {self.db_path}")
 
+    def _init_navigation(self, conn: sqlite3.Connection):
+        """创建审核导航所需的索引和频率直方图
+
+        导航顺序为 (frequency DESC, name ASC)：复合索引支持键集游标翻页，
+        各语言未审核标签的部分索引支持跳转到上/下一个未审核标签，
+        频率直方图（每个频率值的标签数）由触发器维护，用于快速计算位置
+        """
+        # 复合索引覆盖了原先的单列频率索引
+        conn.execute("DROP INDEX IF EXISTS idx_frequency")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_frequency_name ON pixiv_tags(frequency DESC, name ASC)"
+        )
+        for language in ("chinese", "english"):
+            conn.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS idx_unreviewed_{language}
+                ON pixiv_tags(frequency DESC, name ASC)
+                WHERE {language}_reviewed = 0
+                """
+            )
+
+        histogram_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pixiv_tag_frequency_counts'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pixiv_tag_frequency_counts (
+                frequency INTEGER PRIMARY KEY,
+                tag_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_frequency_insert
+            AFTER INSERT ON pixiv_tags
+            BEGIN
+                INSERT INTO pixiv_tag_frequency_counts (frequency, tag_count)
+                VALUES (new.frequency, 1)
+                ON CONFLICT(frequency) DO UPDATE SET tag_count = tag_count + 1;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_frequency_delete
+            AFTER DELETE ON pixiv_tags
+            BEGIN
+                UPDATE pixiv_tag_frequency_counts
+                SET tag_count = tag_count - 1
+                WHERE frequency = old.frequency;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_frequency_update
+            AFTER UPDATE OF frequency ON pixiv_tags
+            WHEN old.frequency IS NOT new.frequency
+            BEGIN
+                UPDATE pixiv_tag_frequency_counts
+                SET tag_count = tag_count - 1
+                WHERE frequency = old.frequency;
+                INSERT INTO pixiv_tag_frequency_counts (frequency, tag_count)
+                VALUES (new.frequency, 1)
+                ON CONFLICT(frequency) DO UPDATE SET tag_count = tag_count + 1;
+            END
+        """)
+
+        if not histogram_exists:
+            conn.execute("""
+                INSERT INTO pixiv_tag_frequency_counts (frequency, tag_count)
+                SELECT frequency, COUNT(*) FROM pixiv_tags GROUP BY frequency
+            """)
+
+    REVIEW_LANGUAGES = ("chinese", "english")
+
+    def _init_review_counts(self, conn: sqlite3.Connection):
+        """创建审核统计计数表，由插入、删除和审核状态变化的触发器维护"""
+        counts_exist = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pixiv_tag_review_counts'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pixiv_tag_review_counts (
+                language TEXT PRIMARY KEY,
+                total INTEGER NOT NULL DEFAULT 0,
+                reviewed INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        insert_updates = []
+        delete_updates = []
+        review_updates = []
+        for language in self.REVIEW_LANGUAGES:
+            column = f"{language}_reviewed"
+            insert_updates.append(f"""
+                UPDATE pixiv_tag_review_counts
+                SET total = total + 1, reviewed = reviewed + (new.{column} IS 1)
+                WHERE language = '{language}';""")
+            delete_updates.append(f"""
+                UPDATE pixiv_tag_review_counts
+                SET total = total - 1, reviewed = reviewed - (old.{column} IS 1)
+                WHERE language = '{language}';""")
+            review_updates.append(f"""
+                UPDATE pixiv_tag_review_counts
+                SET reviewed = reviewed + (new.{column} IS 1) - (old.{column} IS 1)
+                WHERE language = '{language}' AND (new.{column} IS 1) != (old.{column} IS 1);""")
+
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_review_counts_insert
+            AFTER INSERT ON pixiv_tags
+            BEGIN {"".join(insert_updates)}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_review_counts_delete
+            AFTER DELETE ON pixiv_tags
+            BEGIN {"".join(delete_updates)}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_review_counts_update
+            AFTER UPDATE OF chinese_reviewed, english_reviewed ON pixiv_tags
+            BEGIN {"".join(review_updates)}
+            END
+        """)
+
+        if not counts_exist:
+            self._recompute_review_counts(conn)
+
+    def _count_reviews(self, conn: sqlite3.Connection) -> dict:
+        """全表扫描统计各语言的实际审核数量"""
+        select_columns = ", ".join(
+            f"COALESCE(SUM({language}_reviewed IS 1), 0)"
+            for language in self.REVIEW_LANGUAGES
+        )
+        row = conn.execute(
+            f"SELECT COUNT(*), {select_columns} FROM pixiv_tags"
+        ).fetchone()
+        return {
+            language: {"total": row[0], "reviewed": row[i + 1]}
+            for i, language in enumerate(self.REVIEW_LANGUAGES)
+        }
+
+    def _recompute_review_counts(self, conn: sqlite3.Connection):
+        for language, counts in self._count_reviews(conn).items():
+            conn.execute(
+                """
+                INSERT INTO pixiv_tag_review_counts (language, total, reviewed)
+                VALUES (?, ?, ?)
+                ON CONFLICT(language) DO UPDATE SET
+                    total = excluded.total,
+                    reviewed = excluded.reviewed
+                """,
+                (language, counts["total"], counts["reviewed"]),
+            )
+
+    def check_review_counts(self, fix: bool = False) -> dict:
+        """重新统计审核数量并与计数表对比
+
+        返回 {language: {"stored": {...}, "actual": {...}, "drift": {...}}}，
+        fix 为 True 时用实际值覆盖计数表
+        """
+        self.init()
+        with self._get_connection() as conn:
+            actual = self._count_reviews(conn)
+            stored = {
+                row["language"]: {"total": row["total"], "reviewed": row["reviewed"]}
+                for row in conn.execute(
+                    "SELECT language, total, reviewed FROM pixiv_tag_review_counts"
+                )
+            }
+
+            report = {}
+            for language in self.REVIEW_LANGUAGES:
+                stored_counts = stored.get(language, {"total": 0, "reviewed": 0})
+                actual_counts = actual[language]
+                report[language] = {
+                    "stored": stored_counts,
+                    "actual": actual_counts,
+                    "drift": {
+                        key: stored_counts[key] - actual_counts[key]
+                        for key in ("total", "reviewed")
+                    },
+                }
+
+            if fix:
+                self._recompute_review_counts(conn)
+                conn.commit()
+
+        return report
+
+    def _init_fts(self, conn: sqlite3.Connection):
+        """创建 FTS5 trigram 索引及同步触发器（外部内容表，内容来自 pixiv_tags）"""
+        fts_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pixiv_tags_fts'"
+        ).fetchone()
+
+        # trigram 分词按字符三元组建索引，对日文、中文等无空格文本同样可用
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS pixiv_tags_fts USING fts5(
+                name,
+                official_translation,
+                chinese_translation,
+                english_translation,
+                content = 'pixiv_tags',
+                content_rowid = 'rowid',
+                tokenize = 'trigram'
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_fts_insert
+            AFTER INSERT ON pixiv_tags
+            BEGIN
+                INSERT INTO pixiv_tags_fts (
+                    rowid, name, official_translation, chinese_translation, english_translation
+                )
+                VALUES (
+                    new.rowid, new.name, new.official_translation,
+                    new.chinese_translation, new.english_translation
+                );
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_fts_delete
+            AFTER DELETE ON pixiv_tags
+            BEGIN
+                INSERT INTO pixiv_tags_fts (
+                    pixiv_tags_fts, rowid, name, official_translation,
+                    chinese_translation, english_translation
+                )
+                VALUES (
+                    'delete', old.rowid, old.name, old.official_translation,
+                    old.chinese_translation, old.english_translation
+                );
+            END
+        """)
+        # 只有被索引的列真正变化时才更新索引（频率、审核状态变化不触发）
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS pixiv_tags_fts_update
+            AFTER UPDATE OF name, official_translation, chinese_translation, english_translation
+            ON pixiv_tags
+            WHEN old.name IS NOT new.name
+              OR old.official_translation IS NOT new.official_translation
+              OR old.chinese_translation IS NOT new.chinese_translation
+              OR old.english_translation IS NOT new.english_translation
+            BEGIN
+                INSERT INTO pixiv_tags_fts (
+                    pixiv_tags_fts, rowid, name, official_translation,
+                    chinese_translation, english_translation
+                )
+                VALUES (
+                    'delete', old.rowid, old.name, old.official_translation,
+                    old.chinese_translation, old.english_translation
+                );
+                INSERT INTO pixiv_tags_fts (
+                    rowid, name, official_translation, chinese_translation, english_translation
+                )
+                VALUES (
+                    new.rowid, new.name, new.official_translation,
+                    new.chinese_translation, new.english_translation
+                );
+            END
+        """)
+
+        # 已有数据的旧数据库首次创建索引时，需要从内容表重建
+        if not fts_exists:
+            has_rows = conn.execute("SELECT 1 FROM pixiv_tags LIMIT 1").fetchone()
+            if has_rows:
+                logger.info("为现有标签构建 FTS5 索引...")
+                conn.execute(
+                    "INSERT INTO pixiv_tags_fts (pixiv_tags_fts) VALUES ('rebuild')"
+                )
+
+    def rebuild_fts_index(self) -> int:
+        """从 pixiv_tags 重建 FTS5 索引并合并索引段，返回索引的标签数量
+
+        外部内容表依赖 pixiv_tags 的 rowid；执行 VACUUM 等可能改变 rowid 的操作，
+        或索引与内容不一致时，应调用此方法
+        """
+        self.init()
+        with self._get_connection() as conn:
+            conn.execute("INSERT INTO pixiv_tags_fts (pixiv_tags_fts) VALUES ('rebuild')")
+            conn.execute(
+                "INSERT INTO pixiv_tags_fts (pixiv_tags_fts) VALUES ('optimize')"
+            )
+            conn.commit()
+            cursor = conn.execute("SELECT COUNT(*) FROM pixiv_tags")
+            return cursor.fetchone()[0]
+
     def upsert_tag(self, tag: PixivTag) -> bool:
         """插入或更新标签（频率累加）"""
         self.init()
@@ -106,6 +394,49 @@ class SQLiteStorage:
             conn.commit()
         return len(tags)
 
+    @staticmethod
+    def _coalesce_frequency_ops(
+        ops: Union[Mapping[str, int], Iterable[Tuple[str, int]]],
+    ) -> List[Tuple[int, str]]:
+        """合并同名标签的频率增量，返回 executemany 所需的 (delta, name) 参数"""
+        if isinstance(ops, Mapping):
+            items = ops.items()
+        else:
+            merged: dict = {}
+            for name, delta in ops:
+                merged[name] = merged.get(name, 0) + delta
+            items = merged.items()
+        return [(delta, name) for name, delta in items if delta]
+
+    def _insert_new_tags(self, conn: sqlite3.Connection, tags: List[PixivTag]) -> int:
+        cursor = conn.executemany(
+            """
+            INSERT OR IGNORE INTO pixiv_tags
+            (name, official_translation, chinese_translation, english_translation, frequency)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    tag.name,
+                    tag.official_translation,
+                    tag.chinese_translation,
+                    tag.english_translation,
+                    tag.frequency,
+                )
+                for tag in tags
+            ],
+        )
+        return max(cursor.rowcount, 0)
+
+    def _apply_frequency_deltas(
+        self, conn: sqlite3.Connection, params: List[Tuple[int, str]]
+    ) -> int:
+        cursor = conn.executemany(
+            "UPDATE pixiv_tags SET frequency = frequency + ?, updated_at = CURRENT_TIMESTAMP WHERE name = ?",
+            params,
+        )
+        return max(cursor.rowcount, 0)
+
     def insert_new_tags_only(self, tags: List[PixivTag]) -> int:
         """只插入不存在的标签（IGNORE），返回实际插入的数量"""
         if not tags:
@@ -113,45 +444,60 @@ class SQLiteStorage:
 
         self.init()
         with self._get_connection() as conn:
-            inserted_count = 0
-            for tag in tags:
-                cursor = conn.execute(
-                    """
-                    INSERT OR IGNORE INTO pixiv_tags 
-                    (name, official_translation, chinese_translation, english_translation, frequency)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        tag.name,
-                        tag.official_translation,
-                        tag.chinese_translation,
-                        tag.english_translation,
-                        tag.frequency,
-                    ),
-                )
-                if cursor.rowcount > 0:
-                    inserted_count += 1
+            inserted_count = self._insert_new_tags(conn, tags)
             conn.commit()
         return inserted_count
 
-    def apply_frequency_ops(self, ops: List[Tuple[str, int]]) -> int:
-        """批量应用频率更新，返回实际更新的行数"""
-        if not ops:
+    def apply_frequency_ops(
+        self, ops: Union[Mapping[str, int], Iterable[Tuple[str, int]]]
+    ) -> int:
+        """批量应用频率更新（同名增量先合并），返回实际更新的行数"""
+        params = self._coalesce_frequency_ops(ops)
+        if not params:
             return 0
 
         self.init()
         with self._get_connection() as conn:
-            updated_count = 0
-            for name, delta in ops:
-                cursor = conn.execute(
-                    "UPDATE pixiv_tags SET frequency = frequency + ?, updated_at = CURRENT_TIMESTAMP WHERE name = ?",
-                    (delta, name),
-                )
-                if cursor.rowcount > 0:
-                    updated_count += 1
+            updated_count = self._apply_frequency_deltas(conn, params)
             conn.commit()
         return updated_count
 
+    def apply_pending_updates(
+        self,
+        new_tags: List[PixivTag],
+        frequency_ops: Union[Mapping[str, int], Iterable[Tuple[str, int]]],
+    ) -> Tuple[int, int]:
+        """在同一个事务中插入新标签并应用频率增量，返回 (插入数, 更新数)"""
+        params = self._coalesce_frequency_ops(frequency_ops)
+        if not new_tags and not params:
+            return 0, 0
+
+        self.init()
+        with self._get_connection() as conn:
+            # 出错时由连接管理器回滚整个事务
+            inserted_count = self._insert_new_tags(conn, new_tags)
+            updated_count = self._apply_frequency_deltas(conn, params)
+            conn.commit()
+        return inserted_count, updated_count
+
+    @staticmethod
+    def _row_to_tag(row: sqlite3.Row) -> PixivTag:
+        """将查询结果行转换为标签对象（兼容缺少审核列的旧表）"""
+        keys = row.keys()
+        return PixivTag(
+            name=row["name"],
+            official_translation=row["official_translation"],
+            chinese_translation=row["chinese_translation"],
+            english_translation=row["english_translation"],
+            frequency=row["frequency"],
+            chinese_reviewed=bool(
+                row["chinese_reviewed"] if "chinese_reviewed" in keys else 0
+            ),
+            english_reviewed=bool(
+                row["english_reviewed"] if "english_reviewed" in keys else 0
+            ),
+        )
+
     def get_tag(self, name: str) -> Optional[PixivTag]:
         """查询单个标签"""
         self.init()
@@ -159,23 +505,7 @@ class SQLiteStorage:
             cursor = conn.execute("SELECT * FROM pixiv_tags WHERE name = ?", (name,))
             row = cursor.fetchone()
             if row:
-                return PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
+                return self._row_to_tag(row)
         return None
 
     def get_all_tags(self) -> List[PixivTag]:
@@ -183,26 +513,7 @@ class SQLiteStorage:
         self.init()
         with self._get_connection() as conn:
             cursor = conn.execute("SELECT * FROM pixiv_tags ORDER BY frequency DESC")
-            return [
-                PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-                for row in cursor.fetchall()
-            ]
+            return [self._row_to_tag(row) for row in cursor.fetchall()]
 
     def count(self) -> int:
         """统计标签数量"""
@@ -212,6 +523,49 @@ class SQLiteStorage:
             result = cursor.fetchone()
             return result[0] if result else 0
 
+    # SQLite 默认最多 999 个绑定参数
+    LOOKUP_BATCH_SIZE = 900
+
+    def get_tags_by_names(self, names: Iterable[str]) -> List[PixivTag]:
+        """按名称批量查询标签（主键查找，每批最多 LOOKUP_BATCH_SIZE 个），不存在的名称被忽略"""
+        names = list(names)
+        if not names:
+            return []
+
+        self.init()
+        tags = []
+        with self._get_connection() as conn:
+            for start in range(0, len(names), self.LOOKUP_BATCH_SIZE):
+                batch = names[start : start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"SELECT * FROM pixiv_tags WHERE name IN ({placeholders})", batch
+                )
+                tags.extend(self._row_to_tag(row) for row in cursor)
+        return tags
+
+    def iter_name_frequencies(self) -> Iterator[Tuple[str, int]]:
+        """逐个返回全部标签的 (名称, 频率)"""
+        self.init()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("SELECT name, frequency FROM pixiv_tags")
+            yield from cursor
+
+    def frequency_summary(self) -> Tuple[int, int, int]:
+        """返回 (标签数, 频率总和, 有官方翻译的标签数)"""
+        self.init()
+        with self._get_connection() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(frequency), 0),
+                       COUNT(NULLIF(official_translation, ''))
+                FROM pixiv_tags
+                """
+            ).fetchone()
+        return row[0], row[1], row[2]
+
     def increment_frequency(self, name: str, delta: int = 1) -> bool:
         """增加标签频率"""
         self.init()
@@ -224,58 +578,51 @@ class SQLiteStorage:
             return cursor.rowcount > 0
 
     def search_by_keyword(self, keyword: str, limit: int = 50) -> List[PixivTag]:
-        """使用 FTS5 全文搜索标签（前缀匹配，结合 frequency 排序）"""
-        if not keyword.strip():
+        """搜索原文和各译文中包含关键词的标签（子串匹配，按 frequency 排序）
+
+        关键词不少于 3 个字符时使用 FTS5 trigram 索引；更短的关键词无法
+        构成三元组，退化为按频率顺序扫描的 LIKE 匹配
+        """
+        keyword = keyword.strip()
+        if not keyword:
             return []
 
         self.init()
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT t.* FROM pixiv_tags t
-                JOIN pixiv_tags_fts fts ON t.rowid = fts.rowid
-                WHERE pixiv_tags_fts MATCH ?
-                ORDER BY t.frequency DESC, rank
-                LIMIT ?
-                """,
-                (f"{keyword}*", limit),
-            )
-            return [
-                PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
+            if len(keyword) >= 3:
+                # 作为短语查询，避免关键词中的 FTS5 语法字符被解释
+                phrase = '"' + keyword.replace('"', '""') + '"'
+                cursor = conn.execute(
+                    """
+                    SELECT t.* FROM pixiv_tags t
+                    JOIN pixiv_tags_fts fts ON t.rowid = fts.rowid
+                    WHERE pixiv_tags_fts MATCH ?
+                    ORDER BY t.frequency DESC, t.name ASC
+                    LIMIT ?
+                    """,
+                    (phrase, limit),
                 )
-                for row in cursor.fetchall()
-            ]
-
-    def get_tag_index(self, name: str, language: str = "chinese") -> Optional[int]:
-        """根据标签名获取其在排序列表中的索引位置（按频率降序，名称升序）"""
-        self.init()
-        with self._get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT COUNT(*) FROM pixiv_tags
-                WHERE (frequency > (SELECT frequency FROM pixiv_tags WHERE name = ?))
-                   OR (frequency = (SELECT frequency FROM pixiv_tags WHERE name = ?)
-                       AND name < ?)
-                """,
-                (name, name, name),
-            )
-            result = cursor.fetchone()
-            return result[0] if result else None
+            else:
+                pattern = (
+                    "%"
+                    + keyword.replace("\\", "\\\\")
+                    .replace("%", "\\%")
+                    .replace("_", "\\_")
+                    + "%"
+                )
+                cursor = conn.execute(
+                    """
+                    SELECT * FROM pixiv_tags
+                    WHERE name LIKE :pattern ESCAPE '\\'
+                       OR official_translation LIKE :pattern ESCAPE '\\'
+                       OR chinese_translation LIKE :pattern ESCAPE '\\'
+                       OR english_translation LIKE :pattern ESCAPE '\\'
+                    ORDER BY frequency DESC, name ASC
+                    LIMIT :limit
+                    """,
+                    {"pattern": pattern, "limit": limit},
+                )
+            return [self._row_to_tag(row) for row in cursor.fetchall()]
 
     def get_top_tags(self, limit: int = 100) -> List[PixivTag]:
         """按频率排序获取热门标签（新增功能）"""
@@ -284,26 +631,7 @@ class SQLiteStorage:
             cursor = conn.execute(
                 "SELECT * FROM pixiv_tags ORDER BY frequency DESC LIMIT ?", (limit,)
             )
-            return [
-                PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-                for row in cursor.fetchall()
-            ]
+            return [self._row_to_tag(row) for row in cursor.fetchall()]
 
     def get_tags_for_review(
         self, language: str = "chinese", limit: int = 100, offset: int = 0
@@ -316,226 +644,200 @@ class SQLiteStorage:
                 f"""
                 SELECT * FROM pixiv_tags
                 WHERE {reviewed_column} = 0
-                ORDER BY frequency DESC
+                ORDER BY frequency DESC, name ASC
                 LIMIT ? OFFSET ?
                 """,
                 (limit, offset),
             )
-            return [
-                PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-                for row in cursor.fetchall()
-            ]
+            return [self._row_to_tag(row) for row in cursor.fetchall()]
+
+    def _get_frequency(self, conn: sqlite3.Connection, name: str) -> Optional[int]:
+        row = conn.execute(
+            "SELECT frequency FROM pixiv_tags WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _count_before(self, conn: sqlite3.Connection, frequency: int, name: str) -> int:
+        """统计排序（频率降序，名称升序）在 (frequency, name) 之前的标签数量
+
+        频率更高的部分来自频率直方图（行数为不同频率值的个数），
+        同频率部分走 idx_frequency_name 的范围计数
+        """
+        higher = conn.execute(
+            "SELECT COALESCE(SUM(tag_count), 0) FROM pixiv_tag_frequency_counts WHERE frequency > ?",
+            (frequency,),
+        ).fetchone()[0]
+        same = conn.execute(
+            "SELECT COUNT(*) FROM pixiv_tags WHERE frequency = ? AND name < ?",
+            (frequency, name),
+        ).fetchone()[0]
+        return higher + same
+
+    def _get_neighbor(
+        self,
+        current_tag_name: str,
+        forward: bool,
+        unreviewed_language: Optional[str] = None,
+    ) -> Optional[PixivTag]:
+        """按 (frequency, name) 键集游标获取相邻标签，耗时与当前位置无关
+
+        unreviewed_language 不为空时只在该语言的未审核标签中查找（使用部分索引）
+        """
+        filter_sql = ""
+        if unreviewed_language is not None:
+            filter_sql = f"AND {unreviewed_language}_reviewed = 0"
+
+        if forward:
+            same_sql = f"""
+                SELECT * FROM pixiv_tags
+                WHERE frequency = ? AND name > ? {filter_sql}
+                ORDER BY frequency DESC, name ASC
+                LIMIT 1
+            """
+            other_sql = f"""
+                SELECT * FROM pixiv_tags
+                WHERE frequency < ? {filter_sql}
+                ORDER BY frequency DESC, name ASC
+                LIMIT 1
+            """
+        else:
+            same_sql = f"""
+                SELECT * FROM pixiv_tags
+                WHERE frequency = ? AND name < ? {filter_sql}
+                ORDER BY frequency ASC, name DESC
+                LIMIT 1
+            """
+            other_sql = f"""
+                SELECT * FROM pixiv_tags
+                WHERE frequency > ? {filter_sql}
+                ORDER BY frequency ASC, name DESC
+                LIMIT 1
+            """
+
+        self.init()
+        with self._get_connection() as conn:
+            frequency = self._get_frequency(conn, current_tag_name)
+            if frequency is None:
+                return None
+
+            # 先在同频率分组内按名称查找，再跨到相邻频率，两步都是索引定位
+            row = conn.execute(same_sql, (frequency, current_tag_name)).fetchone()
+            if row is None:
+                row = conn.execute(other_sql, (frequency,)).fetchone()
+            return self._row_to_tag(row) if row else None
+
+    def get_tag_index(self, name: str, language: str = "chinese") -> Optional[int]:
+        """根据标签名获取其在排序列表中的索引位置（按频率降序，名称升序）
+
+        耗时与标签在同频率分组内的位置成正比（频率为 1 的分组通常占大部分），
+        因此不用于翻页：WebUI 翻页只做键集定位，位置由前端按需单独获取
+        """
+        self.init()
+        with self._get_connection() as conn:
+            frequency = self._get_frequency(conn, name)
+            if frequency is None:
+                return None
+            return self._count_before(conn, frequency, name)
 
     def get_tag_by_index(
         self, index: int, language: str = "chinese"
     ) -> Optional[PixivTag]:
-        """按索引获取标签（按频率降序，名称升序）"""
+        """按索引获取标签（按频率降序，名称升序）
+
+        先用频率直方图定位索引所在的频率分组，只在组内做 OFFSET，
+        耗时与组内偏移成正比；只用于按 URL 中的索引打开页面，不用于翻页
+        """
+        if index < 0:
+            return None
+
         self.init()
         with self._get_connection() as conn:
             cursor = conn.execute(
+                """
+                SELECT frequency, tag_count FROM pixiv_tag_frequency_counts
+                WHERE tag_count > 0
+                ORDER BY frequency DESC
+                """
+            )
+            remaining = index
+            for frequency, tag_count in cursor:
+                if remaining < tag_count:
+                    break
+                remaining -= tag_count
+            else:
+                return None
+
+            row = conn.execute(
                 """
                 SELECT * FROM pixiv_tags
+                WHERE frequency = ?
                 ORDER BY frequency DESC, name ASC
                 LIMIT 1 OFFSET ?
                 """,
-                (index,),
-            )
-            row = cursor.fetchone()
-            if row:
-                return PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-        return None
+                (frequency, remaining),
+            ).fetchone()
+            return self._row_to_tag(row) if row else None
+
+    def get_next_tag(self, current_tag_name: str) -> Optional[PixivTag]:
+        """获取当前标签之后的下一个标签（按频率降序，名称升序）"""
+        return self._get_neighbor(current_tag_name, forward=True)
+
+    def get_prev_tag(self, current_tag_name: str) -> Optional[PixivTag]:
+        """获取当前标签之前的上一个标签（按频率降序，名称升序）"""
+        return self._get_neighbor(current_tag_name, forward=False)
 
     def get_next_unreviewed(
         self, current_tag_name: str, language: str = "chinese"
     ) -> Optional[PixivTag]:
         """获取当前标签之后的下一个未审核标签（按频率降序，名称升序）"""
-        self.init()
-        reviewed_column = f"{language}_reviewed"
-        with self._get_connection() as conn:
-            cursor = conn.execute(
-                f"""
-                SELECT * FROM pixiv_tags
-                WHERE (
-                    (frequency = (SELECT frequency FROM pixiv_tags WHERE name = ?)
-                     AND name > ?)
-                    OR frequency < (SELECT frequency FROM pixiv_tags WHERE name = ?)
-                )
-                AND {reviewed_column} = 0
-                ORDER BY frequency DESC, name ASC
-                LIMIT 1
-                """,
-                (current_tag_name, current_tag_name, current_tag_name),
-            )
-            row = cursor.fetchone()
-            if row:
-                return PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-        return None
+        return self._get_neighbor(
+            current_tag_name, forward=True, unreviewed_language=language
+        )
 
     def get_prev_unreviewed(
         self, current_tag_name: str, language: str = "chinese"
     ) -> Optional[PixivTag]:
         """获取当前标签之前的上一个未审核标签（按频率降序，名称升序）"""
-        self.init()
-        reviewed_column = f"{language}_reviewed"
-        with self._get_connection() as conn:
-            cursor = conn.execute(
-                f"""
-                SELECT * FROM pixiv_tags
-                WHERE (
-                    (frequency = (SELECT frequency FROM pixiv_tags WHERE name = ?)
-                     AND name < ?
-                     AND {reviewed_column} = 0)
-                )
-                ORDER BY name DESC
-                LIMIT 1
-                """,
-                (current_tag_name, current_tag_name),
-            )
-            row = cursor.fetchone()
-            if row:
-                return PixivTag(
-                    name=row["name"],
-                    official_translation=row["official_translation"],
-                    chinese_translation=row["chinese_translation"],
-                    english_translation=row["english_translation"],
-                    frequency=row["frequency"],
-                    chinese_reviewed=bool(
-                        row["chinese_reviewed"]
-                        if "chinese_reviewed" in row.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row["english_reviewed"]
-                        if "english_reviewed" in row.keys()
-                        else 0
-                    ),
-                )
-            cursor2 = conn.execute(
-                f"""
-                SELECT * FROM pixiv_tags
-                WHERE frequency > (SELECT frequency FROM pixiv_tags WHERE name = ?)
-                AND {reviewed_column} = 0
-                ORDER BY frequency ASC, name DESC
-                LIMIT 1
-                """,
-                (current_tag_name,),
-            )
-            row2 = cursor2.fetchone()
-            if row2:
-                return PixivTag(
-                    name=row2["name"],
-                    official_translation=row2["official_translation"],
-                    chinese_translation=row2["chinese_translation"],
-                    english_translation=row2["english_translation"],
-                    frequency=row2["frequency"],
-                    chinese_reviewed=bool(
-                        row2["chinese_reviewed"]
-                        if "chinese_reviewed" in row2.keys()
-                        else 0
-                    ),
-                    english_reviewed=bool(
-                        row2["english_reviewed"]
-                        if "english_reviewed" in row2.keys()
-                        else 0
-                    ),
-                )
-        return None
+        return self._get_neighbor(
+            current_tag_name, forward=False, unreviewed_language=language
+        )
 
-    def get_first_unreviewed_index(self, language: str = "chinese") -> Optional[int]:
-        """获取第一个未审核标签的索引位置"""
+    def get_first_unreviewed(self, language: str = "chinese") -> Optional[PixivTag]:
+        """获取排序最靠前的未审核标签"""
         self.init()
         reviewed_column = f"{language}_reviewed"
         with self._get_connection() as conn:
-            cursor = conn.execute(
+            row = conn.execute(
                 f"""
                 SELECT * FROM pixiv_tags
                 WHERE {reviewed_column} = 0
                 ORDER BY frequency DESC, name ASC
                 LIMIT 1
                 """
-            )
-            row = cursor.fetchone()
-            if row:
-                frequency = row["frequency"]
-                name = row["name"]
-                cursor2 = conn.execute(
-                    """
-                    SELECT COUNT(*) FROM pixiv_tags
-                    WHERE (frequency > ?) OR (frequency = ? AND name < ?)
-                    """,
-                    (frequency, frequency, name),
-                )
-                result = cursor2.fetchone()
-                return result[0] if result else None
-        return None
+            ).fetchone()
+            return self._row_to_tag(row) if row else None
+
+    def get_first_unreviewed_index(self, language: str = "chinese") -> Optional[int]:
+        """获取第一个未审核标签的索引位置"""
+        tag = self.get_first_unreviewed(language)
+        if tag is None:
+            return None
+        return self.get_tag_index(tag.name, language)
 
     def get_review_count(self, language: str = "chinese") -> dict:
-        """获取审核统计信息"""
+        """获取审核统计信息（读取触发器维护的计数表）"""
         self.init()
-        reviewed_column = f"{language}_reviewed"
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                f"""
-                SELECT
-                    COUNT(*) as total,
-                    SUM(CASE WHEN {reviewed_column} = 1 THEN 1 ELSE 0 END) as reviewed,
-                    SUM(CASE WHEN {reviewed_column} = 0 THEN 1 ELSE 0 END) as pending
-                FROM pixiv_tags
-                """
-            )
-            row = cursor.fetchone()
+            row = conn.execute(
+                "SELECT total, reviewed FROM pixiv_tag_review_counts WHERE language = ?",
+                (language,),
+            ).fetchone()
+            total = row["total"] if row else 0
+            reviewed = row["reviewed"] if row else 0
             return {
-                "total": row[0] or 0,
-                "reviewed": row[1] or 0,
-                "pending": row[2] or 0,
+                "total": total,
+                "reviewed": reviewed,
+                "pending": total - reviewed,
             }
 
     def update_translation_and_review(
@@ -1,96 +1,285 @@
 import json
 import os
 import logging
-from typing import List, Tuple
+from collections import Counter
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .lazy_tags import LazyTagIndex
 from .models import PixivTag
 from .sqlite_storage import SQLiteStorage
+from .write_behind import WriteBehindFlusher
 
 
 logger = logging.getLogger(__name__)
 
 
 class _JsonTagStorage:
-    """原有的 JSON 存储实现（内部使用）"""
+    """JSON 存储实现（内部使用）：快照文件 + 追加写入的变更日志
 
-    def __init__(self, file_path: str):
+    tags.json 为完整快照，tags.json.journal 为 JSON Lines 变更日志，每行一条
+    新标签 ({"seq", "op": "add", "tag"}) 或频率增量 ({"seq", "op": "freq",
+    "name", "delta"}) 记录。保存只追加自上次保存以来的变更，开销与变更量成正比；
+    加载时读取快照后重放日志中序号大于快照 journal_seq 的记录。
+
+    日志超过 compact_bytes 时由写入方（启用后台写入时为写入线程）从磁盘上的
+    快照和日志合并出新快照，写入临时文件后原子替换，再清空日志。
+    替换之后、清空之前中断也不会重复计数：快照记录了已包含的最大序号。
+    """
+
+    def __init__(self, file_path: str, compact_bytes: Optional[int] = None):
         self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.compact_bytes = (
+            compact_bytes
+            if compact_bytes is not None
+            else int(os.getenv("JSON_JOURNAL_COMPACT_BYTES", str(8 * 1024 * 1024)))
+        )
+        # tags 保留文件中的顺序，tag_index 提供按名称的 O(1) 查找
+        # 两者始终原地修改，TagStorage 直接引用同一对象
         self.tags: List[PixivTag] = []
-        self.tag_names: set = set()
+        self.tag_index: Dict[str, PixivTag] = {}
+
+        # 自上次保存以来的变更：新标签在取出时才序列化，之前的频率变化直接累加在标签上
+        self.pending_new_tags: Dict[str, PixivTag] = {}
+        self.pending_freq_ops: Counter[str] = Counter()
+        # 已写入日志的最大序号（只由写入方修改）
+        self._seq = 0
+
+    @staticmethod
+    def _tag_from_dict(tag_data: Dict) -> PixivTag:
+        return PixivTag(
+            name=tag_data["name"],
+            official_translation=tag_data.get("official_translation"),
+            chinese_translation=tag_data.get("chinese_translation", ""),
+            english_translation=tag_data.get("english_translation", ""),
+            frequency=tag_data.get("frequency", 0),
+        )
 
     def load_to_memory(self) -> int:
-        """将数据文件加载到内存"""
-        if not os.path.exists(self.file_path):
+        """加载快照并重放变更日志"""
+        self.tags.clear()
+        self.tag_index.clear()
+        self.pending_new_tags.clear()
+        self.pending_freq_ops.clear()
+        if not os.path.exists(self.file_path) and not os.path.exists(self.journal_path):
             logger.info(f"Tag file {self.file_path} does not exist, starting fresh")
             return 0
 
         try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.tags = []
-                self.tag_names = set()
-
+            snapshot_seq = 0
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                snapshot_seq = data.get("journal_seq", 0)
                 for tag_data in data.get("tags", []):
-                    tag = PixivTag(
-                        name=tag_data["name"],
-                        official_translation=tag_data.get("official_translation"),
-                        chinese_translation=tag_data.get("chinese_translation", ""),
-                        english_translation=tag_data.get("english_translation", ""),
-                        frequency=tag_data.get("frequency", 0),
-                    )
+                    tag = self._tag_from_dict(tag_data)
                     self.tags.append(tag)
-                    self.tag_names.add(tag.name)
+                    self.tag_index[tag.name] = tag
 
-                logger.info(f"Loaded {len(self.tags)} existing tags into memory")
-                return len(self.tags)
+            self._seq = snapshot_seq
+            replayed = 0
+            for record in self._read_journal(truncate_torn=True):
+                if record["seq"] <= snapshot_seq:
+                    continue
+                self._apply_record(self.tags, self.tag_index, record)
+                self._seq = max(self._seq, record["seq"])
+                replayed += 1
+
+            logger.info(
+                f"Loaded {len(self.tags)} existing tags into memory "
+                f"(replayed {replayed} journal records)"
+            )
+            return len(self.tags)
 
         except Exception as e:
             logger.error(f"Failed to load tags from {self.file_path}: {e}")
-            self.tags = []
-            self.tag_names = set()
+            self.tags.clear()
+            self.tag_index.clear()
             return 0
 
+    def _read_journal(self, truncate_torn: bool = False) -> List[Dict]:
+        """读取变更日志；末尾不完整的记录（写入中断）被忽略，truncate_torn 时截掉
+
+        只有最后一行无法解析时才视为写入中断；中间损坏的行跳过并报错，
+        其后的有效记录照常读取，不会被截掉。
+        """
+        if not os.path.exists(self.journal_path):
+            return []
+
+        records = []
+        offset = 0
+        # 最近一个无法解析的行的起始位置
+        bad_offset: Optional[int] = None
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                if bad_offset is not None:
+                    logger.error(
+                        f"Skipping corrupt record at byte {bad_offset} "
+                        f"in journal {self.journal_path}"
+                    )
+                    bad_offset = None
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        bad_offset = offset
+                offset += len(line)
+
+        if bad_offset is not None:
+            logger.warning(f"Journal {self.journal_path} ends with a truncated record")
+            if truncate_torn:
+                # 否则之后追加的记录会接在残缺的行后面
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(bad_offset)
+        return records
+
+    @staticmethod
+    def _apply_record(tags: List[PixivTag], tag_index: Dict[str, PixivTag], record: Dict):
+        if record["op"] == "add":
+            tag = _JsonTagStorage._tag_from_dict(record["tag"])
+            existing = tag_index.get(tag.name)
+            if existing is None:
+                tags.append(tag)
+                tag_index[tag.name] = tag
+            else:
+                existing.frequency += tag.frequency
+        elif record["op"] == "freq":
+            existing = tag_index.get(record["name"])
+            if existing is not None:
+                existing.frequency += record["delta"]
+
     def add_tags_to_memory(self, new_tags: List[PixivTag]) -> int:
         """将新标签添加到内存中，更新已存在标签的频率"""
         added_count = 0
 
         for tag in new_tags:
-            if tag.name not in self.tag_names:
+            existing_tag = self.tag_index.get(tag.name)
+            if existing_tag is None:
                 # 新标签，添加到内存
                 self.tags.append(tag)
-                self.tag_names.add(tag.name)
+                self.tag_index[tag.name] = tag
+                self.pending_new_tags[tag.name] = tag
                 added_count += 1
             else:
                 # 已存在的标签，更新频率
-                for existing_tag in self.tags:
-                    if existing_tag.name == tag.name:
-                        existing_tag.frequency += tag.frequency
-                        break
+                existing_tag.frequency += tag.frequency
+                if tag.name not in self.pending_new_tags:
+                    self.pending_freq_ops[tag.name] += tag.frequency
 
         logger.debug(
             f"Added {added_count} new tags and updated frequencies. Total: {len(self.tags)}"
         )
         return added_count
 
+    def record_frequency(self, tag_name: str, increment: int):
+        """记录已在内存中更新的频率增量"""
+        if tag_name not in self.pending_new_tags:
+            self.pending_freq_ops[tag_name] += increment
+
+    def take_changes(self) -> List[Dict]:
+        """取出自上次保存以来的变更记录（尚未分配序号）"""
+        records = [
+            {"op": "add", "tag": tag.to_dict()} for tag in self.pending_new_tags.values()
+        ]
+        records.extend(
+            {"op": "freq", "name": name, "delta": delta}
+            for name, delta in self.pending_freq_ops.items()
+            if delta
+        )
+        self.pending_new_tags = {}
+        self.pending_freq_ops = Counter()
+        return records
+
     def save_from_memory(self) -> bool:
-        """从内存保存标签到文件"""
+        """把自上次保存以来的变更追加到日志"""
         try:
-            data = {"tags": [tag.to_dict() for tag in self.tags]}
-
-            # 确保目录存在
-            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-
-            # 备份现有文件
-            if os.path.exists(self.file_path):
-                backup_path = f"{self.file_path}.backup"
-                os.rename(self.file_path, backup_path)
-                logger.debug(f"Created backup at {backup_path}")
+            self.append_records(self.take_changes())
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save tags to {self.file_path}: {e}")
+            return False
 
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def append_records(self, records: List[Dict]):
+        """为记录分配序号并追加到日志，日志过大时合并快照；失败时抛出异常"""
+        if records:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            start_seq = self._seq
+            lines = []
+            for offset, record in enumerate(records, start=1):
+                record["seq"] = start_seq + offset
+                lines.append(
+                    json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+                )
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                start_size = f.tell()
+                try:
+                    f.writelines(lines)
+                    f.flush()
+                except Exception:
+                    # 撤销写了一半的记录，重试时整批重新追加
+                    f.truncate(start_size)
+                    raise
+            self._seq = start_seq + len(records)
+            logger.debug(f"Appended {len(records)} records to {self.journal_path}")
+
+        if (
+            os.path.exists(self.journal_path)
+            and os.path.getsize(self.journal_path) > self.compact_bytes
+        ):
+            # 记录已写入日志，合并失败只影响日志大小，下次保存时再试
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Failed to compact {self.journal_path}: {e}")
+
+    def compact(self):
+        """从磁盘上的快照和日志合并出新快照，原子替换后清空日志"""
+        tags: List[PixivTag] = []
+        tag_index: Dict[str, PixivTag] = {}
+        seq = 0
+        if os.path.exists(self.file_path):
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            seq = data.get("journal_seq", 0)
+            for tag_data in data.get("tags", []):
+                tag = self._tag_from_dict(tag_data)
+                tags.append(tag)
+                tag_index[tag.name] = tag
+
+        records = 0
+        for record in self._read_journal():
+            if record["seq"] > seq:
+                self._apply_record(tags, tag_index, record)
+                seq = record["seq"]
+                records += 1
+
+        self.write_snapshot([tag.to_dict() for tag in tags], seq)
+        # 快照已包含这些记录，清空日志；即使在此之前中断，重放时也会按序号跳过
+        open(self.journal_path, "w").close()
+        logger.info(f"Compacted {records} journal records into {self.file_path}")
+
+    def write_snapshot(self, tags: List[Dict], journal_seq: int):
+        """写入临时文件后原子替换快照；失败时抛出异常"""
+        directory = os.path.dirname(self.file_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"journal_seq": journal_seq, "tags": tags}, f, ensure_ascii=False, indent=2
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        logger.info(f"Saved {len(tags)} tags to {self.file_path}")
 
-            logger.info(f"Saved {len(self.tags)} tags to {self.file_path}")
+    def rewrite(self) -> bool:
+        """用内存中的全部标签重写快照并清空日志（标签集合被整体替换时使用）"""
+        try:
+            self.pending_new_tags = {}
+            self.pending_freq_ops = Counter()
+            self.write_snapshot([tag.to_dict() for tag in self.tags], self._seq)
+            open(self.journal_path, "w").close()
             return True
-
         except Exception as e:
             logger.error(f"Failed to save tags to {self.file_path}: {e}")
             return False
@@ -106,40 +295,100 @@ class TagStorage:
 
         if self.mode == "sqlite":
             self.sqlite = SQLiteStorage(self.sqlite_path)
-            self.tags = []  # 内存缓存
-            self.tag_names = set()
+            self.tags: List[PixivTag] = []  # 内存缓存
+            self.tag_index: Dict[str, PixivTag] = {}  # 名称 -> 标签
             # 增量更新相关
-            self.pending_new_tags: List[PixivTag] = []  # 待同步的新标签
-            self.pending_freq_ops: List[
-                Tuple[str, int]
-            ] = []  # 待同步的频率操作 [(name, delta), ...]
+            # 待同步的新标签（名称 -> 标签），同步前的频率增量直接累加在标签对象上
+            self.pending_new_tags: Dict[str, PixivTag] = {}
+            # 待同步的频率增量（名称 -> 累计增量），同一标签只保留一条
+            self.pending_freq_ops: Counter[str] = Counter()
             self.sync_interval: int = int(
                 os.getenv("SAVE_INTERVAL", "20")
             )  # 每 N 个插画同步一次
             self.illusts_since_sync: int = 0  # 自上次同步后的插画数
+            # 按需加载：启动时只统计标签行数，读到的标签放入 LRU 缓存，是否存在按主键查询
+            self.lazy: Optional[LazyTagIndex] = None
+            if os.getenv("TAG_LOADING", "full").lower() == "lazy":
+                self.lazy = LazyTagIndex.from_env(
+                    self.sqlite, lambda name: self.pending_freq_ops.get(name, 0)
+                )
             logger.info(
                 f"使用 SQLite 模式，数据库路径: {self.sqlite_path}, 同步间隔: {self.sync_interval} 个插画"
+                + (" (按需加载标签)" if self.lazy else "")
             )
         else:
             self._json_storage = _JsonTagStorage(self.json_path)
-            self.tags = []
-            self.tag_names = set()
+            # 与 JSON 存储共享同一份列表和索引
+            self.tags = self._json_storage.tags
+            self.tag_index = self._json_storage.tag_index
             logger.info(f"使用 JSON 模式，文件路径: {self.json_path}")
 
+        # 后台写入：收集循环中的定期保存只提交增量，由后台线程写盘
+        self.flusher: Optional[WriteBehindFlusher] = None
+        if os.getenv("WRITE_BEHIND", "true").lower() == "true":
+            self.flusher = self._make_flusher()
+
+    def _make_flusher(self) -> WriteBehindFlusher:
+        if self.mode == "sqlite":
+            # 批次为 (新标签副本, 频率增量)；新标签先于频率增量在同一事务中插入
+            def merge(a, b):
+                a[0].update(b[0])
+                a[1].update(b[1])
+                return a
+
+            def write(batch):
+                inserted, updated = self.sqlite.apply_pending_updates(
+                    list(batch[0].values()), batch[1]
+                )
+                logger.debug(f"后台同步: 插入 {inserted} 个新标签，更新 {updated} 个标签频率")
+
+            return WriteBehindFlusher.from_env(
+                write,
+                merge,
+                lambda batch: len(batch[0]) + len(batch[1]),
+                name="sqlite-writer",
+            )
+
+        # 批次为变更日志记录列表，日志合并也在写入线程中进行
+        return WriteBehindFlusher.from_env(
+            self._json_storage.append_records,
+            lambda a, b: a + b,
+            len,
+            name="json-writer",
+        )
+
+    @property
+    def state_path(self) -> str:
+        """收集进度（已处理插画、检查点）所在的 SQLite 文件，与标签数据放在一起
+
+        SQLite 模式下就是标签库本身；JSON 模式下是标签文件旁的 <文件名>.state.db
+        """
+        if self.mode == "sqlite":
+            return self.sqlite_path
+        return os.path.splitext(self.json_path)[0] + ".state.db"
+
+    @property
+    def store_identity(self) -> str:
+        """标签库的标识（模式和文件路径），收集进度据此确认属于哪个标签库"""
+        path = self.sqlite_path if self.mode == "sqlite" else self.json_path
+        return f"{self.mode}:{os.path.abspath(path)}"
+
     def load_to_memory(self) -> int:
         """将数据加载到内存"""
         if self.mode == "sqlite":
+            if self.lazy is not None:
+                return self.lazy.load()
             try:
                 # 同步加载
                 self.tags = self.sqlite.get_all_tags()
-                self.tag_names = {tag.name for tag in self.tags}
+                self.tag_index = {tag.name: tag for tag in self.tags}
 
                 logger.info(f"从 SQLite 加载了 {len(self.tags)} 个标签到内存")
                 return len(self.tags)
             except Exception as e:
                 logger.error(f"从 SQLite 加载标签失败: {e}")
                 self.tags = []
-                self.tag_names = set()
+                self.tag_index = {}
                 return 0
         else:
             return self._json_storage.load_to_memory()
@@ -150,64 +399,139 @@ class TagStorage:
             added_count = 0
 
             for tag in new_tags:
-                if tag.name not in self.tag_names:
+                existing_tag = self.get_tag(tag.name)
+                if existing_tag is None:
                     # 新标签，添加到内存
-                    self.tags.append(tag)
-                    self.tag_names.add(tag.name)
+                    if self.lazy is not None:
+                        self.lazy.add(tag)
+                    else:
+                        self.tags.append(tag)
+                        self.tag_index[tag.name] = tag
                     added_count += 1
                     # 累积到待同步列表
-                    self.pending_new_tags.append(tag)
+                    self.pending_new_tags[tag.name] = tag
                 else:
                     # 已存在的标签，更新内存中的频率
-                    for existing_tag in self.tags:
-                        if existing_tag.name == tag.name:
-                            existing_tag.frequency += tag.frequency
-                            break
+                    existing_tag.frequency += tag.frequency
+                    if tag.name not in self.pending_new_tags:
+                        self.pending_freq_ops[tag.name] += tag.frequency
 
             logger.debug(
-                f"Added {added_count} new tags and updated frequencies. Total: {len(self.tags)}"
+                f"Added {added_count} new tags and updated frequencies. Total: {self.get_memory_count()}"
             )
             return added_count
         else:
             return self._json_storage.add_tags_to_memory(new_tags)
 
     def save_from_memory(self) -> bool:
-        """从内存保存标签（SQLite 模式下为强制同步）"""
+        """从内存保存标签并等待写入完成（SQLite 模式下为强制同步）"""
         if self.mode == "sqlite":
             try:
                 result = self.force_sync()
                 if result:
-                    logger.info(f"同步了 {len(self.tags)} 个标签到 SQLite")
+                    logger.info(f"同步了 {self.get_memory_count()} 个标签到 SQLite")
                 return result
             except Exception as e:
                 logger.error(f"保存到 SQLite 失败: {e}")
                 return False
         else:
+            return self.force_sync()
+
+    def save_in_background(self) -> bool:
+        """提交定期保存：启用后台写入时只提交待写数据，否则同步保存"""
+        if self.mode == "sqlite":
+            return self.sync_to_database()
+        if self.flusher is None:
             return self._json_storage.save_from_memory()
+        records = self._json_storage.take_changes()
+        if records:
+            self.flusher.submit(records)
+        return True
+
+    def after_write(self, func: Callable[[], None], wait: bool = False) -> bool:
+        """在此前提交的标签数据写出之后调用 func，用于写入依赖标签已落盘的记录
+
+        启用后台写入时 func 排在写入队列中、由写入线程调用，wait=True 时等待
+        调用完成并返回是否成功；否则（标签已同步写出）立即调用，异常直接抛出。
+        """
+        if self.flusher is None:
+            func()
+            return True
+        self.flusher.after_write(func)
+        return self.flusher.flush() if wait else True
+
+    def close(self):
+        """写出后台队列中的剩余数据并释放存储资源（SQLite 模式下关闭数据库长连接）"""
+        if self.flusher is not None:
+            self.flusher.close()
+        if self.mode == "sqlite":
+            if self.lazy is not None:
+                self.lazy.log_stats()
+            self.sqlite.close()
 
     def get_memory_count(self) -> int:
-        """获取内存中的标签数量"""
+        """获取内存中的标签数量（按需加载模式下为库中标签数加本次新增数）"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            return len(self.lazy)
         return len(self.tags)
 
     def get_memory_tags(self) -> List[PixivTag]:
-        """获取内存中的所有标签"""
+        """获取内存中的所有标签（按需加载模式下先同步再从数据库读取全部标签）"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            self.force_sync()
+            return self.sqlite.get_all_tags()
         return self.tags.copy()
 
+    def iter_tag_frequencies(self) -> Iterator[Tuple[str, int]]:
+        """逐个返回全部标签的 (名称, 频率)，按需加载模式下不构造标签对象"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            self.force_sync()
+            yield from self.sqlite.iter_name_frequencies()
+        else:
+            for tag in self.tags:
+                yield tag.name, tag.frequency
+
+    def frequency_summary(self) -> Tuple[int, int, int]:
+        """返回 (标签数, 频率总和, 有官方翻译的标签数)"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            self.force_sync()
+            return self.sqlite.frequency_summary()
+        return (
+            len(self.tags),
+            sum(tag.frequency for tag in self.tags),
+            sum(1 for tag in self.tags if tag.official_translation),
+        )
+
+    def get_tag(self, tag_name: str) -> Optional[PixivTag]:
+        """按名称查找标签（按需加载模式下缓存未命中时查询数据库）"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            return self.lazy.get(tag_name)
+        return self.tag_index.get(tag_name)
+
+    def prefetch(self, tag_names: Iterable[str]):
+        """按需加载模式下把即将查找的标签合并为一次批量查询，其他模式无操作"""
+        if self.mode == "sqlite" and self.lazy is not None:
+            self.lazy.prefetch(tag_names)
+
     def is_tag_in_memory(self, tag_name: str) -> bool:
         """检查标签是否已在内存中"""
-        return tag_name in self.tag_names
+        return self.get_tag(tag_name) is not None
 
     def increment_tag_frequency(self, tag_name: str, increment: int = 1) -> bool:
         """增加标签频率（仅内存操作）"""
+        tag = self.get_tag(tag_name)
+        if tag is None:
+            return False
+
         # 更新内存
-        for tag in self.tags:
-            if tag.name == tag_name:
-                tag.frequency += increment
-                # 累积到待同步列表（SQLite 模式）
-                if self.mode == "sqlite":
-                    self.pending_freq_ops.append((tag_name, increment))
-                return True
-        return False
+        tag.frequency += increment
+        # 累积到待同步计数器（SQLite 模式）；尚未入库的新标签会以最新频率插入
+        if self.mode == "sqlite":
+            if tag_name not in self.pending_new_tags:
+                self.pending_freq_ops[tag_name] += increment
+        else:
+            self._json_storage.record_frequency(tag_name, increment)
+        return True
 
     def on_illust_processed(self):
         """当处理完一个插画后调用，用于检查自动同步（基于插画计数）"""
@@ -225,8 +549,16 @@ class TagStorage:
         if self.illusts_since_sync >= self.sync_interval:
             self.sync_to_database()
 
+    def _take_pending(self) -> Tuple[Dict[str, PixivTag], Counter]:
+        """取出待同步的更新；新标签复制一份，之后的频率变化作为增量另行同步"""
+        new_tags = {name: replace(tag) for name, tag in self.pending_new_tags.items()}
+        freq_ops = self.pending_freq_ops
+        self.pending_new_tags = {}
+        self.pending_freq_ops = Counter()
+        return new_tags, freq_ops
+
     def sync_to_database(self) -> bool:
-        """将累积的更新同步到数据库（增量同步）"""
+        """将累积的更新同步到数据库（增量同步；启用后台写入时只提交到写入队列）"""
         if self.mode != "sqlite":
             return False
 
@@ -234,18 +566,19 @@ class TagStorage:
             self.illusts_since_sync = 0
             return True
 
+        if self.flusher is not None:
+            self.flusher.submit(self._take_pending())
+            self.illusts_since_sync = 0
+            return True
+
         try:
-            # 同步新标签
-            if self.pending_new_tags:
-                inserted = self.sqlite.insert_new_tags_only(self.pending_new_tags)
-                logger.debug(f"增量同步: 插入 {inserted} 个新标签")
-                self.pending_new_tags.clear()
-
-            # 同步频率更新
-            if self.pending_freq_ops:
-                updated = self.sqlite.apply_frequency_ops(self.pending_freq_ops)
-                logger.debug(f"增量同步: 更新 {updated} 个标签频率")
-                self.pending_freq_ops.clear()
+            # 新标签插入与频率增量在同一个事务中提交
+            inserted, updated = self.sqlite.apply_pending_updates(
+                list(self.pending_new_tags.values()), self.pending_freq_ops
+            )
+            logger.debug(f"增量同步: 插入 {inserted} 个新标签，更新 {updated} 个标签频率")
+            self.pending_new_tags.clear()
+            self.pending_freq_ops.clear()
 
             self.illusts_since_sync = 0
             return True
@@ -255,18 +588,19 @@ class TagStorage:
             return False
 
     def force_sync(self) -> bool:
-        """强制立即同步所有待处理的更新到数据库"""
-        if self.mode == "sqlite":
-            return self.sync_to_database()
-        else:
+        """强制立即同步所有待处理的更新，并等待后台写入完成"""
+        if self.flusher is None:
+            if self.mode == "sqlite":
+                return self.sync_to_database()
             return self._json_storage.save_from_memory()
 
+        self.save_in_background()
+        return self.flusher.flush()
+
     def get_tag_frequency(self, tag_name: str) -> int:
         """获取标签频率"""
-        for tag in self.tags:
-            if tag.name == tag_name:
-                return tag.frequency
-        return 0
+        tag = self.get_tag(tag_name)
+        return tag.frequency if tag is not None else 0
 
     # 保持向后兼容的方法
     def load_tags(self) -> List[PixivTag]:
@@ -275,9 +609,17 @@ class TagStorage:
 
     def save_tags(self, tags: List[PixivTag]):
         """保存标签到文件（向后兼容）"""
-        self.tags = tags
-        self.tag_names = {tag.name for tag in tags}
-        self.save_from_memory()
+        # 原地替换，保持与 JSON 存储共享的引用
+        self.tags[:] = tags
+        self.tag_index.clear()
+        self.tag_index.update((tag.name, tag) for tag in tags)
+        if self.mode == "sqlite":
+            self.save_from_memory()
+            return
+        # 标签集合被整体替换，无法表示为增量：等待已提交的日志写完后重写快照
+        if self.flusher is not None:
+            self.flusher.flush()
+        self._json_storage.rewrite()
 
     def append_tags(self, new_tags: List[PixivTag]):
         """追加新标签到内存（向后兼容）"""
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .sqlite_connection import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_hash(*templates: str) -> str:
+    """提示词模板的短哈希，模板改动后旧的缓存条目自然失效"""
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class TranslationCache:
+    """LLM 翻译结果缓存，按 (标签名, 官方翻译, 模型, 提示词模板哈希) 寻址
+
+    存放在独立的 SQLite 文件中，与标签库的生命周期无关：标签库重建、分叉或
+    写入失败时，已经付费得到的翻译仍可直接取回，不再调用 LLM。
+    """
+
+    # 单条 IN 查询的参数个数上限（低于 SQLite 默认的 999）
+    LOOKUP_BATCH_SIZE = 900
+
+    def __init__(
+        self,
+        db_path: str = "data/translation_cache.db",
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+    ):
+        self.db_path = db_path
+        self.connection_manager = (
+            connection_manager or SQLiteConnectionManager.shared(db_path)
+        )
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.connection_manager.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    official_translation TEXT,
+                    model TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def make_key(
+        name: str, official_translation: Optional[str], model: str, prompt: str
+    ) -> str:
+        payload = json.dumps(
+            [name, official_translation or "", model, prompt], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """批量查询，返回命中的 key -> 翻译"""
+        keys = list(keys)
+        results: Dict[str, str] = {}
+        with self.connection_manager.connection() as conn:
+            for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+                chunk = keys[start : start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(
+                    f"SELECT key, translation FROM translation_cache WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                results.update((row[0], row[1]) for row in cursor)
+        return results
+
+    def put_many(
+        self, entries: List[Tuple[str, str, Optional[str], str, str, str]]
+    ) -> int:
+        """写入 (key, 标签名, 官方翻译, 模型, 提示词哈希, 翻译)，已存在的 key 覆盖"""
+        if not entries:
+            return 0
+        with self.connection_manager.connection() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO translation_cache
+                    (key, name, official_translation, model, prompt_hash, translation)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                entries,
+            )
+            conn.commit()
+        return len(entries)
+
+    def count(self) -> int:
+        with self.connection_manager.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+
+    def close(self):
+        self.connection_manager.close()
@@ -0,0 +1,137 @@
+import logging
+import os
+import random
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from .sqlite_connection import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationFailureLog:
+    """翻译失败记录：每个标签的失败次数、最近一次错误类型和下次允许重试的时间
+
+    记录保存在标签库的 translation_failures 表中。翻译脚本只读取没有失败记录、
+    或已过退避时间且失败次数未达 max_attempts 的标签，因此中断或失败后重新运行
+    只处理剩余的工作；翻译成功后删除对应记录。达到 max_attempts 的标签不再自动
+    重试，可用 reset()（maintain_db.py reset-translation-failures）清除记录后重新翻译。
+
+    退避时长按失败次数指数增长（base_delay * 2^(n-1)），加入随机抖动，
+    不超过 max_delay。
+
+    通过环境变量配置（见 from_env）：
+
+        TRANSLATE_MAX_ATTEMPTS       每个标签最多尝试次数，达到后不再自动重试 (默认: 5)
+        TRANSLATE_RETRY_BASE_DELAY   首次失败后的重试等待，秒 (默认: 5)
+        TRANSLATE_RETRY_MAX_DELAY    重试等待上限，秒 (默认: 600)
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/pixiv_tags.db",
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+        max_attempts: int = 5,
+        base_delay: float = 5.0,
+        max_delay: float = 600.0,
+    ):
+        self.db_path = db_path
+        self.connection_manager = (
+            connection_manager or SQLiteConnectionManager.shared(db_path)
+        )
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._init_schema()
+
+    @classmethod
+    def from_env(
+        cls,
+        db_path: str,
+        connection_manager: Optional[SQLiteConnectionManager] = None,
+    ) -> "TranslationFailureLog":
+        return cls(
+            db_path,
+            connection_manager,
+            max_attempts=int(os.getenv("TRANSLATE_MAX_ATTEMPTS", "5")),
+            base_delay=float(os.getenv("TRANSLATE_RETRY_BASE_DELAY", "5")),
+            max_delay=float(os.getenv("TRANSLATE_RETRY_MAX_DELAY", "600")),
+        )
+
+    def _init_schema(self):
+        with self.connection_manager.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translation_failures (
+                    name TEXT PRIMARY KEY,
+                    attempts INTEGER NOT NULL,
+                    last_error TEXT,
+                    next_attempt_at REAL NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.commit()
+
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后应等待的秒数"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (max(1, attempts) - 1))
+        # 抖动：在 [delay/2, delay] 内随机，避免同一批失败的标签同时重试
+        return random.uniform(delay / 2, delay)
+
+    def can_retry(self, attempts: int) -> bool:
+        return attempts < self.max_attempts
+
+    def record(self, failures: List[Tuple[str, int, str, float]]):
+        """写入 (标签名, 累计失败次数, 错误类型, 下次允许重试的 Unix 时间)"""
+        if not failures:
+            return
+        with self.connection_manager.connection() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO translation_failures
+                    (name, attempts, last_error, next_attempt_at, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                failures,
+            )
+            conn.commit()
+
+    def clear(self, names: Iterable[str]):
+        """删除翻译成功的标签的失败记录"""
+        names = [(name,) for name in names]
+        if not names:
+            return
+        with self.connection_manager.connection() as conn:
+            conn.executemany("DELETE FROM translation_failures WHERE name = ?", names)
+            conn.commit()
+
+    def reset(self, include_waiting: bool = False) -> int:
+        """删除已达到最多尝试次数的失败记录，下次运行时这些标签重新翻译
+
+        include_waiting=True 时同时删除仍在退避中的记录。返回删除的记录数。
+        """
+        with self.connection_manager.connection() as conn:
+            if include_waiting:
+                cursor = conn.execute("DELETE FROM translation_failures")
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM translation_failures WHERE attempts >= ?",
+                    (self.max_attempts,),
+                )
+            conn.commit()
+            return cursor.rowcount
+
+    def summary(self) -> Tuple[int, int]:
+        """返回 (仍在退避中的标签数, 已达到最多尝试次数的标签数)"""
+        with self.connection_manager.connection() as conn:
+            row = conn.execute(
+                """
+                SELECT
+                    COALESCE(SUM(attempts < ? AND next_attempt_at > ?), 0),
+                    COALESCE(SUM(attempts >= ?), 0)
+                FROM translation_failures
+                """,
+                (self.max_attempts, time.time(), self.max_attempts),
+            ).fetchone()
+            return row[0], row[1]
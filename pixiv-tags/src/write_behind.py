@@ -0,0 +1,256 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Optional
+
+from . import shutdown
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FlusherStats:
+    """后台写入统计"""
+
+    batches_submitted: int = 0
+    writes: int = 0
+    write_failures: int = 0
+    write_seconds: float = 0.0
+    # 队列已满时提交方被阻塞的次数和总时长
+    backpressure_waits: int = 0
+    backpressure_seconds: float = 0.0
+    callback_failures: int = 0
+
+
+class _FlushRequest:
+    """排在数据之后的刷新请求，写入线程处理到它时写出之前的全部数据"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.success = False
+
+
+class _Callback:
+    """排在数据之后的回调，之前的数据写出成功后在写入线程中调用"""
+
+    def __init__(self, func: Callable[[], None]):
+        self.func = func
+
+
+_STOP = object()
+
+
+class WriteBehindFlusher:
+    """后台写入线程：收集循环只把待写数据放入有界队列，由后台线程合并后写盘
+
+    写入线程把队列中的批次用 merge 合并，累计大小（size 的返回值）达到
+    flush_size 或最早的未写数据已等待 flush_interval 秒时调用 write 写出。
+    队列满时 submit() 阻塞，写盘跟不上时收集循环随之放慢，内存占用有上界。
+    写入失败的数据保留到下一次写入重试。
+
+    flush() 等待此前提交的数据全部写出；收到退出信号后写入线程立即写出
+    已累计的数据，close() 做最后一次写入并结束线程。
+
+    after_write() 提交的回调在此前的数据写出成功之后才调用，用于写入依赖这些
+    数据已落盘的记录（如已处理插画和收集检查点）。回调不会触发提前写入，而是随
+    下一次按 flush_size / flush_interval 触发的写入（或 flush()、close()）一起执行。
+    回调失败时保留，下次写入成功后按提交顺序重试。
+
+    通过环境变量配置（见 from_env）：
+
+        WRITE_BEHIND_QUEUE_SIZE       队列容量，批次数 (默认: 16)
+        WRITE_BEHIND_FLUSH_SIZE       累计多少条更新后写入 (默认: 500)
+        WRITE_BEHIND_FLUSH_INTERVAL   未写数据最长等待时间，秒 (默认: 5)
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Any], None],
+        merge: Callable[[Any, Any], Any],
+        size: Callable[[Any], int],
+        queue_size: int = 16,
+        flush_size: int = 500,
+        flush_interval: float = 5.0,
+        name: str = "write-behind",
+    ):
+        self._write = write
+        self._merge = merge
+        self._size = size
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.name = name
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._pending: Any = None
+        self._pending_since: Optional[float] = None
+        self._callbacks: Deque[Callable[[], None]] = deque()
+        self._closed = False
+        self.stats = FlusherStats()
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(
+        cls,
+        write: Callable[[Any], None],
+        merge: Callable[[Any, Any], Any],
+        size: Callable[[Any], int],
+        name: str = "write-behind",
+    ) -> "WriteBehindFlusher":
+        return cls(
+            write,
+            merge,
+            size,
+            queue_size=int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "16")),
+            flush_size=int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "500")),
+            flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "5")),
+            name=name,
+        )
+
+    def submit(self, batch: Any):
+        """提交一批待写数据；队列已满时阻塞直到写入线程腾出空间"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} flusher is closed")
+        self.stats.batches_submitted += 1
+        try:
+            self._queue.put_nowait(batch)
+            return
+        except queue.Full:
+            pass
+
+        start = time.monotonic()
+        self._queue.put(batch)
+        waited = time.monotonic() - start
+        self.stats.backpressure_waits += 1
+        self.stats.backpressure_seconds += waited
+        logger.debug(f"{self.name}: 写入队列已满，等待 {waited:.2f} 秒")
+
+    def after_write(self, func: Callable[[], None]):
+        """在此前提交的数据写出之后，于写入线程中调用 func（不等待，也不提前触发写入）"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} flusher is closed")
+        self._queue.put(_Callback(func))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前提交的数据全部写出，返回是否成功"""
+        if self._closed:
+            return self._pending is None and not self._callbacks
+        request = _FlushRequest()
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            logger.warning(f"{self.name}: 等待写入超时")
+            return False
+        return request.success
+
+    def close(self, timeout: Optional[float] = None):
+        """写出剩余数据并结束写入线程（可重复调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"{self.name}: 写入线程未能在 {timeout} 秒内结束")
+        elif self._pending is not None:
+            logger.error(
+                f"{self.name}: 关闭时仍有 {self._size(self._pending)} 条更新未能写入"
+            )
+        elif self._callbacks:
+            logger.error(f"{self.name}: 关闭时仍有 {len(self._callbacks)} 个回调未能完成")
+        self.log_stats()
+
+    def log_stats(self):
+        stats = self.stats
+        logger.info(
+            f"{self.name}: 提交 {stats.batches_submitted} 批，写入 {stats.writes} 次 "
+            f"(失败 {stats.write_failures} 次，共 {stats.write_seconds:.2f} 秒)，"
+            f"回调失败 {stats.callback_failures} 次，"
+            f"队列满等待 {stats.backpressure_waits} 次 ({stats.backpressure_seconds:.2f} 秒)"
+        )
+
+    def _add(self, batch: Any):
+        if self._pending is None:
+            self._pending = batch
+            self._pending_since = time.monotonic()
+        else:
+            self._pending = self._merge(self._pending, batch)
+
+    def _write_pending(self) -> bool:
+        """写出已累计的数据；失败时保留，下次重试"""
+        if self._pending is None:
+            return True
+        start = time.monotonic()
+        try:
+            self._write(self._pending)
+        except Exception as e:
+            self.stats.write_failures += 1
+            # 推迟下一次重试，避免持续失败时空转
+            self._pending_since = time.monotonic()
+            logger.error(f"{self.name}: 写入失败，稍后重试: {e}")
+            return False
+        finally:
+            self.stats.write_seconds += time.monotonic() - start
+        self.stats.writes += 1
+        self._pending = None
+        self._pending_since = None
+        return True
+
+    def _write_and_run_callbacks(self) -> bool:
+        """写出已累计的数据，成功后按顺序调用等待中的回调；全部完成返回 True"""
+        if not self._write_pending():
+            return False
+        while self._callbacks:
+            try:
+                self._callbacks[0]()
+            except Exception as e:
+                self.stats.callback_failures += 1
+                logger.error(f"{self.name}: 回调失败，下次写入后重试: {e}")
+                return False
+            self._callbacks.popleft()
+        return True
+
+    def _due(self) -> bool:
+        if self._pending is None:
+            return False
+        if self._size(self._pending) >= self.flush_size or shutdown.is_stopping():
+            return True
+        return time.monotonic() - self._pending_since >= self.flush_interval
+
+    def _run(self):
+        while True:
+            if self._pending is None:
+                timeout = None
+            else:
+                elapsed = time.monotonic() - self._pending_since
+                timeout = max(0.0, self.flush_interval - elapsed)
+            # 定期醒来检查退出信号（信号处理器中不能安全地操作队列）
+            timeout = 1.0 if timeout is None else min(timeout, 1.0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write_and_run_callbacks()
+                return
+            if isinstance(item, _FlushRequest):
+                item.success = self._write_and_run_callbacks()
+                item.done.set()
+                continue
+            if isinstance(item, _Callback):
+                # 不为回调提前写入：排在下一次按大小或时间触发的写入之后；
+                # 没有未写数据时之前的数据都已落盘，可以直接调用
+                self._callbacks.append(item.func)
+                if self._pending is None:
+                    self._write_and_run_callbacks()
+                continue
+            if item is not None:
+                self._add(item)
+            if self._due():
+                self._write_and_run_callbacks()
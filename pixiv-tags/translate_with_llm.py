@@ -11,20 +11,45 @@ Pixiv 标签中文翻译脚本
     OPENAI_BASE_URL="https://api.openai.com/v1"
     OPENAI_API_KEY="your_api_key"
     OPENAI_MODEL_NAME="gpt-4o-mini"
+    TRANSLATE_BATCH_SIZE=20       每个请求翻译的标签数，1 表示逐个翻译
+    TRANSLATE_BATCH_RETRIES=2     批量结果中缺失或无效的标签重新请求的次数
+    LLM_TIMEOUT=30                单个请求的超时时间（秒）
+    TRANSLATE_PAGE_SIZE=500       每次从数据库读取的待翻译标签数
+    TRANSLATE_COMMIT_SIZE=100     每累计多少个翻译结果提交一次
+    LLM_CONCURRENCY=8             初始并发数，运行中按延迟和 429/5xx/超时自适应调整
+    LLM_MAX_CONCURRENCY=64        并发数上限
+    LLM_MAX_RPM=0                 每分钟请求数上限，0 表示不限
+    LLM_MAX_TPM=0                 每分钟 tokens 上限，0 表示不限
+    TRANSLATION_CACHE=true        是否启用翻译缓存
+    TRANSLATION_CACHE_PATH="data/translation_cache.db"
+    TRANSLATE_MAX_ATTEMPTS=5      每个标签最多尝试次数
+    TRANSLATE_RETRY_BASE_DELAY=5  失败后首次重试等待（秒），按失败次数指数增长
+    TRANSLATE_RETRY_MAX_DELAY=600 重试等待上限（秒）
 """
 
 import asyncio
+import heapq
+import itertools
+import json
 import logging
 import os
+import re
 import signal
 import sqlite3
 import sys
-from typing import List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from tqdm import tqdm
 
 from src.llm_api import LLMClient
+from src.llm_limiter import AdaptiveConcurrencyLimiter, LimiterClosed
+from src.sqlite_connection import SQLiteConnectionManager
+from src.translation_cache import TranslationCache, prompt_hash
+from src.translation_failures import TranslationFailureLog
 
 load_dotenv()
 
@@ -43,24 +68,94 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+TAG_PROMPT_WITH_OFFICIAL = """请将以下 Pixiv 标签翻译成中文。如果标签有官方翻译，请参考官方翻译的风格和用词。
+
+标签名称: {name}
+官方翻译: {official_translation}
+
+请直接输出中文翻译，不要包含任何解释或额外文字。"""
+
+TAG_PROMPT = """请将以下 Pixiv 标签翻译成中文。这是 Pixiv 插画网站上的标签，通常与动漫、游戏、艺术相关。
+
+标签名称: {name}
+
+请直接输出中文翻译，不要包含任何解释或额外文字。"""
+
+BATCH_SYSTEM_PROMPT = """你是 Pixiv 标签翻译助手。Pixiv 是插画网站，标签通常与动漫、游戏、艺术相关。
+
+用户会给出一个 JSON 数组，每一项包含编号 id、标签名称 name，有官方翻译时还包含 official_translation。
+请把每个标签翻译成中文；有官方翻译时参考官方翻译的风格和用词。
+
+只输出一个 JSON 对象，格式为 {"translations": {"<id>": "<中文翻译>"}}，必须包含每一个 id，
+翻译中不要包含任何解释或额外文字。"""
+
+# 单个标签翻译的最大长度，超过视为模型输出了解释等多余内容
+MAX_TRANSLATION_LENGTH = 100
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+@dataclass
+class TranslationUsage:
+    """LLM 调用统计"""
+
+    # 已发出的请求数（含失败），以及其中失败的请求数
+    requests: int = 0
+    failed_requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # 批量结果中缺失或无效、需要重新请求的标签数
+    invalid_entries: int = 0
+    # 从翻译缓存取得的标签数，以及等待相同在途请求结果的标签数
+    cache_hits: int = 0
+    collapsed: int = 0
+
 
 class TagTranslator:
-    def __init__(self, db_path: str, llm_client: LLMClient):
+    # 数据库被其他进程占用时，一批翻译结果最多尝试写入的次数
+    WRITE_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        db_path: str,
+        llm_client: LLMClient,
+        batch_size: int = 1,
+        batch_retries: int = 2,
+        page_size: int = 500,
+        commit_size: int = 100,
+        commit_interval: float = 2.0,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        cache: Optional[TranslationCache] = None,
+        failures: Optional[TranslationFailureLog] = None,
+    ):
         self.db_path = db_path
         self.llm_client = llm_client
+        # 每个请求翻译的标签数；大于 1 时多个标签共用一次请求和一份指令
+        self.batch_size = max(1, batch_size)
+        self.batch_retries = max(0, batch_retries)
+        # 异步流水线：每页读取的标签数、每次提交的结果数及最长提交间隔（秒）
+        self.page_size = max(1, page_size)
+        self.commit_size = max(1, commit_size)
+        self.commit_interval = commit_interval
+        # 异步请求的并发控制
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.cache = cache
+        # 在途请求：缓存 key -> 翻译结果，相同标签不重复请求
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.usage = TranslationUsage()
         self._init_db()
+        self.failures = failures or TranslationFailureLog(
+            db_path, self.connection_manager
+        )
 
     def _init_db(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.close()
+        # 与收集器、WebUI 共用同一个长连接管理器
+        self.connection_manager = SQLiteConnectionManager.shared(self.db_path)
+        self.connection_manager.get_connection()
         logger.info(f"数据库连接初始化完成: {self.db_path}")
 
     def get_tags_needing_translation(self, limit: Optional[int] = None) -> List[dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
+        with self.connection_manager.connection() as conn:
             query = """
                 SELECT name, official_translation, frequency
                 FROM pixiv_tags
@@ -72,12 +167,73 @@ class TagTranslator:
 
             cursor = conn.execute(query)
             return [dict(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
+
+    # 异步流水线读取的待翻译标签：跳过仍在退避中或已达到最多尝试次数的标签
+    _PENDING_FROM = """
+        FROM pixiv_tags t
+        LEFT JOIN translation_failures f ON f.name = t.name
+        WHERE (t.chinese_translation IS NULL OR t.chinese_translation = '')
+          AND (f.name IS NULL OR (f.attempts < ? AND f.next_attempt_at <= ?))
+    """
+
+    def _pending_params(self) -> Tuple[int, float]:
+        return self.failures.max_attempts, time.time()
+
+    def count_tags_needing_translation(self) -> int:
+        with self.connection_manager.connection() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) {self._PENDING_FROM}", self._pending_params()
+            ).fetchone()[0]
+
+    def get_tags_needing_translation_page(
+        self, after: Optional[Tuple[int, str]], limit: int
+    ) -> List[dict]:
+        """按 (frequency, name) 键集游标读取排在 after 之后的一页待翻译标签
+
+        先取同频率中名称更大的标签，不足一页时再取更低频率的标签，
+        两步都走 idx_frequency_name，耗时与游标位置无关。
+        每个标签带有此前累计的失败次数 attempts。
+        """
+        select = (
+            "SELECT t.name, t.official_translation, t.frequency, "
+            f"COALESCE(f.attempts, 0) AS attempts {self._PENDING_FROM}"
+        )
+        order = "ORDER BY t.frequency DESC, t.name ASC LIMIT ?"
+        params = self._pending_params()
+
+        with self.connection_manager.connection() as conn:
+            if after is None:
+                rows = conn.execute(f"{select} {order}", (*params, limit)).fetchall()
+                return [dict(row) for row in rows]
+
+            frequency, name = after
+            rows = conn.execute(
+                f"{select} AND t.frequency = ? AND t.name > ? {order}",
+                (*params, frequency, name, limit),
+            ).fetchall()
+            if len(rows) < limit:
+                rows += conn.execute(
+                    f"{select} AND t.frequency < ? {order}",
+                    (*params, frequency, limit - len(rows)),
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+    def update_chinese_translations(self, translations: List[Tuple[str, str]]) -> int:
+        """在一个事务中写入多个 (标签名, 翻译)，返回更新的行数"""
+        with self.connection_manager.connection() as conn:
+            cursor = conn.executemany(
+                """
+                UPDATE pixiv_tags
+                SET chinese_translation = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE name = ?
+                """,
+                [(translation, name) for name, translation in translations],
+            )
+            conn.commit()
+            return cursor.rowcount
 
     def update_chinese_translation(self, tag_name: str, translation: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        try:
+        with self.connection_manager.connection() as conn:
             cursor = conn.execute(
                 """
                 UPDATE pixiv_tags
@@ -88,25 +244,34 @@ class TagTranslator:
             )
             conn.commit()
             return cursor.rowcount > 0
-        finally:
-            conn.close()
+
+    @staticmethod
+    def _build_prompt(tag_name: str, official_translation: Optional[str]) -> str:
+        if official_translation:
+            return TAG_PROMPT_WITH_OFFICIAL.format(
+                name=tag_name, official_translation=official_translation
+            )
+        return TAG_PROMPT.format(name=tag_name)
+
+    @property
+    def prompt_version(self) -> str:
+        """当前翻译方式所用提示词模板的哈希，作为缓存 key 的一部分"""
+        if self.batch_size > 1:
+            return prompt_hash(BATCH_SYSTEM_PROMPT)
+        return prompt_hash(TAG_PROMPT_WITH_OFFICIAL, TAG_PROMPT)
+
+    def cache_key(self, tag: dict) -> str:
+        return TranslationCache.make_key(
+            tag["name"],
+            tag.get("official_translation"),
+            self.llm_client.model,
+            self.prompt_version,
+        )
 
     def translate_tag(
         self, tag_name: str, official_translation: Optional[str] = None
     ) -> Optional[str]:
-        if official_translation:
-            prompt = f"""请将以下 Pixiv 标签翻译成中文。如果标签有官方翻译，请参考官方翻译的风格和用词。
-
-标签名称: {tag_name}
-官方翻译: {official_translation}
-
-请直接输出中文翻译，不要包含任何解释或额外文字。"""
-        else:
-            prompt = f"""请将以下 Pixiv 标签翻译成中文。这是 Pixiv 插画网站上的标签，通常与动漫、游戏、艺术相关。
-
-标签名称: {tag_name}
-
-请直接输出中文翻译，不要包含任何解释或额外文字。"""
+        prompt = self._build_prompt(tag_name, official_translation)
 
         try:
             response = self.llm_client.simple_chat(
@@ -119,31 +284,221 @@ class TagTranslator:
             return None
 
     async def translate_tag_async(
-        self, tag_name: str, official_translation: Optional[str] = None
+        self,
+        tag_name: str,
+        official_translation: Optional[str] = None,
+        errors: Optional[Dict[str, str]] = None,
     ) -> Optional[str]:
-        if official_translation:
-            prompt = f"""请将以下 Pixiv 标签翻译成中文。如果标签有官方翻译，请参考官方翻译的风格和用词。
+        """翻译单个标签，失败时返回 None，并在 errors 中记录标签名 -> 错误类型"""
+        prompt = self._build_prompt(tag_name, official_translation)
 
-标签名称: {tag_name}
-官方翻译: {official_translation}
+        try:
+            response = await self._chat_async(text=prompt, temperature=0.3)
+        except LimiterClosed:
+            return None
+        except Exception as e:
+            logger.warning(f"翻译请求失败 ({tag_name}): {e!r}")
+            if errors is not None:
+                errors[tag_name] = type(e).__name__
+            return None
 
-请直接输出中文翻译，不要包含任何解释或额外文字。"""
-        else:
-            prompt = f"""请将以下 Pixiv 标签翻译成中文。这是 Pixiv 插画网站上的标签，通常与动漫、游戏、艺术相关。
+        translation = response.content.strip()
+        if not translation and errors is not None:
+            errors[tag_name] = "EmptyTranslation"
+        return translation or None
 
-标签名称: {tag_name}
+    async def _chat_async(self, **kwargs):
+        """在并发控制下发出一次请求，并记录用量
 
-请直接输出中文翻译，不要包含任何解释或额外文字。"""
+        取得许可后即计入 usage.requests，请求失败时同时计入 usage.failed_requests；
+        限流器已关闭（LimiterClosed）时没有发出请求，不计数
+        """
+        async with self.limiter.request() as permit:
+            self.usage.requests += 1
+            try:
+                response = await self.llm_client.simple_chat_async(**kwargs)
+            except Exception:
+                self.usage.failed_requests += 1
+                raise
+            permit.record_usage(
+                response.total_tokens or response.input_tokens + response.output_tokens
+            )
+        self._record_usage(response)
+        return response
+
+    def _record_usage(self, response):
+        self.usage.prompt_tokens += response.input_tokens
+        self.usage.completion_tokens += response.output_tokens
 
+    @staticmethod
+    def _parse_batch_response(content: str, ids: List[str]) -> Dict[str, str]:
+        """解析批量翻译结果，返回编号 -> 翻译，缺失或无效的编号不包含在内"""
         try:
-            response = await self.llm_client.simple_chat_async(
-                text=prompt,
-                temperature=0.3,
+            data = json.loads(_CODE_FENCE.sub("", content.strip()))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        translations = data.get("translations", data)
+        if not isinstance(translations, dict):
+            return {}
+
+        results = {}
+        for tag_id in ids:
+            value = translations.get(tag_id)
+            if not isinstance(value, str):
+                continue
+            value = value.strip()
+            if value and "\n" not in value and len(value) <= MAX_TRANSLATION_LENGTH:
+                results[tag_id] = value
+        return results
+
+    async def translate_batch_async(
+        self, tags: List[dict], errors: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """在一个请求中翻译多个标签，返回标签名 -> 翻译
+
+        要求模型输出 JSON 对象并逐个校验，缺失或无效的标签重新请求（只包含这些标签），
+        最多重试 batch_retries 次；仍然失败的标签不包含在结果中，
+        其最后一次的错误类型记录在 errors 中。
+        """
+        pending = {str(i): tag for i, tag in enumerate(tags)}
+        results: Dict[str, str] = {}
+        last_error = "InvalidTranslation"
+
+        for attempt in range(self.batch_retries + 1):
+            items = []
+            for tag_id, tag in pending.items():
+                item = {"id": tag_id, "name": tag["name"]}
+                if tag.get("official_translation"):
+                    item["official_translation"] = tag["official_translation"]
+                items.append(item)
+
+            try:
+                response = await self._chat_async(
+                    text=json.dumps(items, ensure_ascii=False),
+                    system_prompt=BATCH_SYSTEM_PROMPT,
+                    temperature=0.3,
+                    response_format={"type": "json_object"},
+                )
+            except LimiterClosed:
+                break
+            except Exception as e:
+                logger.warning(f"批量翻译请求失败 ({len(pending)} 个标签): {e!r}")
+                last_error = type(e).__name__
+                continue
+
+            last_error = "InvalidTranslation"
+            parsed = self._parse_batch_response(response.content, list(pending))
+            for tag_id, translation in parsed.items():
+                results[pending.pop(tag_id)["name"]] = translation
+            if not pending:
+                break
+            self.usage.invalid_entries += len(pending)
+            logger.debug(
+                f"批量翻译第 {attempt + 1} 次: {len(pending)} 个标签缺失或无效，"
+                f"{'重新请求' if attempt < self.batch_retries else '放弃'}"
             )
-            translation = response.content.strip()
-            return translation
-        except Exception:
-            return None
+
+        if errors is not None:
+            for tag in pending.values():
+                errors[tag["name"]] = last_error
+        return results
+
+    async def translate_tags_async(
+        self, tags: List[dict], errors: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """翻译一组标签（batch_size > 1 时合并为一个请求），返回标签名 -> 翻译
+
+        相同缓存 key 的请求正在进行时不再重复请求，而是等待其结果；
+        失败的标签不包含在结果中，其错误类型记录在 errors 中
+        """
+        if errors is None:
+            errors = {}
+        loop = asyncio.get_running_loop()
+        own = []
+        joined = []
+        for tag in tags:
+            key = self.cache_key(tag)
+            future = self._inflight.get(key)
+            if future is None:
+                future = loop.create_future()
+                self._inflight[key] = future
+                own.append((tag, key, future))
+            else:
+                joined.append((tag, future))
+
+        results: Dict[str, str] = {}
+        try:
+            if self.batch_size > 1 and own:
+                results = await self.translate_batch_async(
+                    [tag for tag, _, _ in own], errors
+                )
+            else:
+                for tag, _, _ in own:
+                    translation = await self.translate_tag_async(
+                        tag["name"], tag.get("official_translation"), errors
+                    )
+                    if translation:
+                        results[tag["name"]] = translation
+        finally:
+            for tag, key, future in own:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    name = tag["name"]
+                    future.set_result((results.get(name), errors.get(name, "Cancelled")))
+
+        self.usage.collapsed += len(joined)
+        for tag, future in joined:
+            translation, error = await future
+            if translation:
+                results[tag["name"]] = translation
+            else:
+                errors[tag["name"]] = error
+        return results
+
+    def lookup_cached(self, tags: List[dict]) -> Dict[str, str]:
+        """从翻译缓存中查找，返回命中的标签名 -> 翻译"""
+        keys = {self.cache_key(tag): tag["name"] for tag in tags}
+        return {keys[key]: value for key, value in self.cache.get_many(keys).items()}
+
+    def write_results(
+        self, results: List[Tuple[dict, str, bool]], failures: List[dict]
+    ) -> int:
+        """写入 (标签, 翻译, 是否来自缓存) 和失败的标签，返回标签库中更新的行数
+
+        新翻译先写入缓存，即使随后写入标签库失败，下次运行也不必重新请求；
+        成功的标签删除失败记录，失败的标签记录失败次数、错误类型和下次重试时间
+        """
+        if self.cache is not None:
+            model = self.llm_client.model
+            version = self.prompt_version
+            self.cache.put_many(
+                [
+                    (
+                        self.cache_key(tag),
+                        tag["name"],
+                        tag.get("official_translation"),
+                        model,
+                        version,
+                        translation,
+                    )
+                    for tag, translation, from_cache in results
+                    if not from_cache
+                ]
+            )
+        written = self.update_chinese_translations(
+            [(tag["name"], translation) for tag, translation, _ in results]
+        )
+        # 先记录失败再删除成功标签的记录：同一次写入中先失败后重试成功的标签不留记录
+        self.failures.record(
+            [
+                (tag["name"], tag["attempts"], tag["last_error"], tag["next_attempt_at"])
+                for tag in failures
+            ]
+        )
+        self.failures.clear(tag["name"] for tag, _, _ in results if tag["attempts"])
+        return written
 
     def translate_all(self):
         tags = self.get_tags_needing_translation()
@@ -188,80 +543,283 @@ class TagTranslator:
             f"\n翻译完成！总计: {total_tags} | 成功: {success_count} | 失败: {fail_count}"
         )
 
-    async def translate_all_async(self, concurrency: int = 20):
-        tags = self.get_tags_needing_translation()
-        total_tags = len(tags)
-
-        if total_tags == 0:
-            print("没有需要翻译的标签")
-            return
-
-        success_count = 0
-        fail_count = 0
-        semaphore = asyncio.Semaphore(concurrency)
-        lock = asyncio.Lock()
-        stop_event = asyncio.Event()
-
-        async def translate_single(tag: dict):
-            nonlocal success_count, fail_count
+    async def translate_all_async(self):
+        """以有界流水线翻译全部未翻译标签
+
+        读取 -> 有界任务队列 -> 翻译 worker -> 有界结果队列 -> 单一写入者：
+
+        - 读取按 (frequency, name) 键集游标分页，每次只取 page_size 个标签，
+          队列满时暂停读取，内存占用与待翻译标签总数无关
+        - 写入者每 commit_size 个结果（或 commit_interval 秒）在一个事务中批量提交，
+          worker 不再因逐条提交而互相等待；数据库被占用时重试，仍失败则停止整个
+          流水线并抛出异常
+        - 数据库读写都在一个专用线程中执行，不阻塞事件循环
+        - worker 数为并发上限的最大值，实际在途请求数由 limiter 自适应控制
+        - 启用翻译缓存时，读取的每页先查缓存，命中的标签直接交给写入者；
+          新翻译在写入标签库之前先写入缓存
+        - 失败的标签按指数退避在本次运行内重试，失败次数、错误类型和下次重试时间
+          同时写入 translation_failures，重新运行时只读取剩余且已到重试时间的标签
+        """
+        loop = asyncio.get_running_loop()
+        db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translate-db")
+
+        def run_db(func, *args):
+            return loop.run_in_executor(db_executor, func, *args)
 
-            if stop_event.is_set():
+        try:
+            total_tags = await run_db(self.count_tags_needing_translation)
+            if total_tags == 0:
+                print("没有需要翻译的标签")
                 return
 
-            async with semaphore:
-                if stop_event.is_set():
-                    return
-
-                tag_name = tag["name"]
-                official_translation = tag.get("official_translation")
-
+            success_count = 0
+            fail_count = 0
+            retry_count = 0
+            workers = self.limiter.max_limit
+            # 每项为一个批次（batch_size 个标签）
+            work_queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+            result_queue: asyncio.Queue = asyncio.Queue(
+                maxsize=max(self.commit_size, self.batch_size) * 2
+            )
+            stop_event = asyncio.Event()
+            # 等待重试的标签：(可重试的事件循环时间, 序号, 标签)
+            retry_heap: List[Tuple[float, int, dict]] = []
+            retry_seq = itertools.count()
+            # 等待重试的标签过多（如服务长时间不可用）时暂停读取新标签
+            max_waiting_retries = workers * self.batch_size * 4
+            reading_done = False
+            # 已放入任务队列、尚未处理完的批次数
+            outstanding = 0
+            changed = asyncio.Event()
+
+            async def submit(batch: List[dict]):
+                nonlocal outstanding
+                outstanding += 1
+                await work_queue.put(batch)
+
+            async def read_tags():
+                nonlocal reading_done
+                cursor = None
                 try:
-                    translation = await asyncio.wait_for(
-                        self.translate_tag_async(tag_name, official_translation),
-                        timeout=60.0,
-                    )
-                except asyncio.TimeoutError:
-                    translation = None
-                except asyncio.CancelledError:
-                    return
-
-                async with lock:
-                    if translation:
-                        if self.update_chinese_translation(tag_name, translation):
-                            success_count += 1
-                        else:
-                            fail_count += 1
+                    while not stop_event.is_set():
+                        while len(retry_heap) >= max_waiting_retries and not stop_event.is_set():
+                            changed.clear()
+                            await changed.wait()
+                        page = await run_db(
+                            self.get_tags_needing_translation_page, cursor, self.page_size
+                        )
+                        if not page:
+                            break
+                        cursor = (page[-1]["frequency"], page[-1]["name"])
+                        if self.cache is not None:
+                            cached = await run_db(self.lookup_cached, page)
+                            self.usage.cache_hits += len(cached)
+                            for tag in page:
+                                if tag["name"] in cached:
+                                    await result_queue.put((tag, cached[tag["name"]], True))
+                            page = [tag for tag in page if tag["name"] not in cached]
+                        for start in range(0, len(page), self.batch_size):
+                            await submit(page[start : start + self.batch_size])
+                            if stop_event.is_set():
+                                break
+                finally:
+                    reading_done = True
+                    changed.set()
+
+            async def schedule_retries():
+                """到期的失败标签重新放入任务队列；全部完成或停止后通知 worker 退出"""
+                while True:
+                    changed.clear()
+                    if stop_event.is_set():
+                        if reading_done:
+                            break
                     else:
-                        fail_count += 1
-                    progress_bar.update(1)
-                    progress_bar.set_postfix(
-                        {"成功": success_count, "失败": fail_count}
-                    )
-
-        def handle_stop(signum, frame):
-            stop_event.set()
-
-        original_sigint = signal.signal(signal.SIGINT, handle_stop)
-        original_sigterm = signal.signal(signal.SIGTERM, handle_stop)
+                        now = loop.time()
+                        due = []
+                        while retry_heap and retry_heap[0][0] <= now:
+                            due.append(heapq.heappop(retry_heap)[2])
+                        for start in range(0, len(due), self.batch_size):
+                            await submit(due[start : start + self.batch_size])
+                        if due:
+                            changed.set()
+                            continue
+                        if reading_done and not retry_heap and outstanding == 0:
+                            break
+
+                    timeout = None
+                    if retry_heap and not stop_event.is_set():
+                        timeout = max(0.0, retry_heap[0][0] - loop.time())
+                    try:
+                        async with asyncio.timeout(timeout):
+                            await changed.wait()
+                    except TimeoutError:
+                        pass
+
+                for _ in range(workers):
+                    await work_queue.put(None)
+
+            async def translate_worker():
+                nonlocal outstanding, retry_count
+                while True:
+                    batch = await work_queue.get()
+                    if batch is None:
+                        return
+                    try:
+                        # 收到停止信号后只消费队列，不再发起请求
+                        if stop_event.is_set():
+                            continue
+
+                        errors: Dict[str, str] = {}
+                        translations = await self.translate_tags_async(batch, errors)
+                        for tag in batch:
+                            translation = translations.get(tag["name"])
+                            if translation:
+                                await result_queue.put((tag, translation, False))
+                                continue
+                            # 因停止而未发出请求的标签不计失败次数，下次运行时照常读取
+                            if stop_event.is_set():
+                                continue
+
+                            tag["attempts"] += 1
+                            tag["last_error"] = errors.get(tag["name"], "Unknown")
+                            delay = self.failures.backoff(tag["attempts"])
+                            tag["next_attempt_at"] = time.time() + delay
+                            retry = self.failures.can_retry(tag["attempts"])
+                            if retry and not stop_event.is_set():
+                                retry_count += 1
+                                heapq.heappush(
+                                    retry_heap, (loop.time() + delay, next(retry_seq), tag)
+                                )
+                            # 失败记录立即持久化，中断后重新运行时按退避时间继续
+                            await result_queue.put((tag, None, retry))
+                    finally:
+                        outstanding -= 1
+                        changed.set()
+
+            results_closed = False
+
+            async def write_batch(
+                pending: List[Tuple[dict, str, bool]], failed: List[dict]
+            ) -> int:
+                """提交一批结果；数据库被占用时稍后重试（各项写入均可重复执行）"""
+                for attempt in range(1, self.WRITE_ATTEMPTS + 1):
+                    try:
+                        return await run_db(self.write_results, pending, failed)
+                    except sqlite3.OperationalError as e:
+                        busy = "locked" in str(e) or "busy" in str(e)
+                        if not busy or attempt == self.WRITE_ATTEMPTS:
+                            raise
+                        logger.warning(f"写入翻译结果失败，{attempt} 秒后重试: {e}")
+                        await asyncio.sleep(attempt)
+
+            async def commit_results():
+                nonlocal success_count, fail_count, results_closed
+                pending: List[Tuple[dict, str, bool]] = []
+                failed: List[dict] = []
+                finished = False
+
+                while not finished:
+                    try:
+                        item = await asyncio.wait_for(
+                            result_queue.get(), timeout=self.commit_interval
+                        )
+                    except asyncio.TimeoutError:
+                        item = ()
+                    if item is None:
+                        finished = results_closed = True
+                    elif item:
+                        tag, translation, flag = item
+                        if translation:
+                            pending.append(item)
+                        else:
+                            failed.append(tag)
+                            # flag 为 True 表示本次运行内还会重试，暂不计入结果
+                            if not flag:
+                                fail_count += 1
+                                progress_bar.update(1)
+
+                    size = len(pending) + len(failed)
+                    if size and (finished or not item or size >= self.commit_size):
+                        written = await write_batch(pending, failed)
+                        success_count += written
+                        # 标签已被删除时更新不到任何行
+                        fail_count += len(pending) - written
+                        progress_bar.update(len(pending))
+                        pending = []
+                        failed = []
+                        progress_bar.set_postfix(
+                            {"成功": success_count, "失败": fail_count}
+                        )
+
+            async def write_results():
+                nonlocal results_closed
+                try:
+                    await commit_results()
+                except Exception as e:
+                    # 写入失败：停止流水线并继续取走结果，worker 不会阻塞在已满的
+                    # 结果队列上；流水线结束后由 await writer 抛出
+                    logger.error(f"写入翻译结果失败，停止翻译: {e!r}")
+                    stop()
+                    while not results_closed:
+                        results_closed = await result_queue.get() is None
+                    raise
+
+            def stop():
+                stop_event.set()
+                changed.set()
+                # 唤醒等待并发许可的 worker，在途请求仍会完成并写入
+                loop.create_task(self.limiter.close())
+
+            def handle_stop(signum, frame):
+                loop.call_soon_threadsafe(stop)
+
+            original_sigint = signal.signal(signal.SIGINT, handle_stop)
+            original_sigterm = signal.signal(signal.SIGTERM, handle_stop)
 
-        try:
-            with tqdm(
-                total=total_tags,
-                desc="翻译进度",
-                unit="个",
-                ncols=100,
-                postfix="初始化中...",
-            ) as progress_bar:
-                tasks = [translate_single(tag) for tag in tags]
-                await asyncio.gather(*tasks)
-                progress_bar.set_postfix({"成功": success_count, "失败": fail_count})
+            try:
+                with tqdm(
+                    total=total_tags,
+                    desc="翻译进度",
+                    unit="个",
+                    ncols=100,
+                    postfix="初始化中...",
+                ) as progress_bar:
+                    writer = asyncio.create_task(write_results())
+                    await asyncio.gather(
+                        read_tags(),
+                        schedule_retries(),
+                        *(translate_worker() for _ in range(workers)),
+                    )
+                    await result_queue.put(None)
+                    await writer
+                    progress_bar.set_postfix({"成功": success_count, "失败": fail_count})
+            finally:
+                signal.signal(signal.SIGINT, original_sigint)
+                signal.signal(signal.SIGTERM, original_sigterm)
         finally:
-            signal.signal(signal.SIGINT, original_sigint)
-            signal.signal(signal.SIGTERM, original_sigterm)
+            db_executor.shutdown(wait=True)
 
         print(
-            f"\n翻译完成！总计: {total_tags} | 成功: {success_count} | 失败: {fail_count}"
+            f"\n翻译完成！总计: {total_tags} | 成功: {success_count} | 失败: {fail_count} | "
+            f"重试: {retry_count}"
         )
+        waiting, exhausted = self.failures.summary()
+        if waiting or exhausted:
+            print(
+                f"待下次运行重试: {waiting} | 已达到最多尝试次数 "
+                f"({self.failures.max_attempts} 次): {exhausted}"
+            )
+        usage = self.usage
+        print(
+            f"LLM 请求: {usage.requests} 次 (失败 {usage.failed_requests} 次) | "
+            f"输入 tokens: {usage.prompt_tokens} | 输出 tokens: {usage.completion_tokens} | "
+            f"重新请求的标签: {usage.invalid_entries}"
+        )
+        if self.cache is not None:
+            print(
+                f"翻译缓存命中: {usage.cache_hits} | 合并的相同请求: {usage.collapsed}"
+            )
+        print(self.limiter.summary())
 
 
 async def main_async():
@@ -274,17 +832,34 @@ async def main_async():
         print("未设置 OPENAI_API_KEY 环境变量")
         return 1
 
+    cache = None
+    if os.getenv("TRANSLATION_CACHE", "true").lower() == "true":
+        cache = TranslationCache(
+            os.getenv("TRANSLATION_CACHE_PATH", "data/translation_cache.db")
+        )
+
     try:
         llm_client = LLMClient(
             api_key=api_key,
             base_url=base_url,
             model=model_name,
-            timeout=5.0,
+            # 批量请求的输出随标签数增长，默认超时相应放宽
+            timeout=float(os.getenv("LLM_TIMEOUT", "30")),
             use_async=True,
         )
 
-        translator = TagTranslator(db_path, llm_client)
-        await translator.translate_all_async(concurrency=20)
+        translator = TagTranslator(
+            db_path,
+            llm_client,
+            batch_size=int(os.getenv("TRANSLATE_BATCH_SIZE", "20")),
+            batch_retries=int(os.getenv("TRANSLATE_BATCH_RETRIES", "2")),
+            page_size=int(os.getenv("TRANSLATE_PAGE_SIZE", "500")),
+            commit_size=int(os.getenv("TRANSLATE_COMMIT_SIZE", "100")),
+            limiter=AdaptiveConcurrencyLimiter.from_env(),
+            cache=cache,
+            failures=TranslationFailureLog.from_env(db_path),
+        )
+        await translator.translate_all_async()
 
     except Exception as e:
         print(f"Fatal error: {e}")
@@ -295,6 +870,10 @@ async def main_async():
                 await llm_client.close_async()
             except:
                 pass
+        if "translator" in locals():
+            translator.connection_manager.close()
+        if cache is not None:
+            cache.close()
 
     return 0
 
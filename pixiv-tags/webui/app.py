@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional
 from pathlib import Path
 
@@ -21,7 +22,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Pixiv Tag Review WebUI")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 关闭数据库长连接
+    storage.close()
+
+
+app = FastAPI(title="Pixiv Tag Review WebUI", lifespan=lifespan)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = os.getenv("SQLITE_DB_PATH", str(BASE_DIR / "data" / "pixiv_tags.db"))
@@ -46,12 +55,15 @@ async def index(request: Request, index: Optional[int] = 0, language: str = "chi
 
     stats = storage.get_review_count(language)
 
+    tag = None
     if index == 0:
-        first_unreviewed_index = storage.get_first_unreviewed_index(language)
-        if first_unreviewed_index is not None:
-            index = first_unreviewed_index
+        tag = storage.get_first_unreviewed(language)
+        if tag is not None:
+            # 位置由前端通过 /api/tag/index 按需获取
+            index = None
 
-    tag = storage.get_tag_by_index(index, language)
+    if tag is None:
+        tag = storage.get_tag_by_index(index, language)
 
     context = {
         "request": request,
@@ -65,27 +77,44 @@ async def index(request: Request, index: Optional[int] = 0, language: str = "chi
 
 
 @app.get("/api/tag/current")
-async def get_current_tag(index: int = 0, language: str = "chinese"):
-    """获取当前标签"""
+async def get_current_tag(
+    index: int = 0, name: Optional[str] = None, language: str = "chinese"
+):
+    """获取当前标签（按名称或索引）；按名称获取时 index 为 null，由前端按需获取位置"""
     if language not in ["chinese", "english"]:
         language = "chinese"
 
-    tag = storage.get_tag_by_index(index, language)
+    if name:
+        tag = storage.get_tag(name)
+        index = None
+    else:
+        tag = storage.get_tag_by_index(index, language)
 
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    return JSONResponse(content=tag.to_dict())
+    return JSONResponse(content={"index": index, **tag.to_dict()})
 
 
 @app.get("/api/tag/next")
-async def get_next_tag(current_index: int = 0, language: str = "chinese"):
-    """获取下一个标签"""
+async def get_next_tag(
+    current_index: Optional[int] = None,
+    current_tag_name: Optional[str] = None,
+    language: str = "chinese",
+):
+    """获取下一个标签（提供当前标签名时使用键集游标）
+
+    位置由前端传来的 current_index 加 1 得到；前端尚不知道当前位置时返回 null
+    """
     if language not in ["chinese", "english"]:
         language = "chinese"
 
-    next_index = current_index + 1
-    tag = storage.get_tag_by_index(next_index, language)
+    if current_tag_name:
+        next_index = None if current_index is None else current_index + 1
+        tag = storage.get_next_tag(current_tag_name)
+    else:
+        next_index = (current_index or 0) + 1
+        tag = storage.get_tag_by_index(next_index, language)
 
     if not tag:
         raise HTTPException(status_code=404, detail="No more tags")
@@ -94,20 +123,41 @@ async def get_next_tag(current_index: int = 0, language: str = "chinese"):
 
 
 @app.get("/api/tag/prev")
-async def get_prev_tag(current_index: int = 0, language: str = "chinese"):
-    """获取上一个标签"""
+async def get_prev_tag(
+    current_index: Optional[int] = None,
+    current_tag_name: Optional[str] = None,
+    language: str = "chinese",
+):
+    """获取上一个标签（提供当前标签名时使用键集游标）
+
+    位置由前端传来的 current_index 减 1 得到；前端尚不知道当前位置时返回 null
+    """
     if language not in ["chinese", "english"]:
         language = "chinese"
 
-    prev_index = max(0, current_index - 1)
-    tag = storage.get_tag_by_index(prev_index, language)
+    prev_index = max(0, (current_index or 0) - 1)
+    tag = None
+    if current_tag_name:
+        tag = storage.get_prev_tag(current_tag_name)
+        if tag is not None and current_index is None:
+            prev_index = None
+    if tag is None:
+        # 已经是第一个标签（或未提供游标）时按索引获取
+        tag = storage.get_tag_by_index(prev_index, language)
+
+    if not tag:
+        raise HTTPException(status_code=404, detail="Tag not found")
 
     return JSONResponse(content={"index": prev_index, **tag.to_dict()})
 
 
 @app.get("/api/tag/next-unreviewed")
 async def get_next_unreviewed(current_tag_name: str, language: str = "chinese"):
-    """获取下一个未审核标签"""
+    """获取下一个未审核标签
+
+    只做键集定位，不计算位置（同频率分组很大时计数耗时随位置增长），
+    index 为 null，由前端通过 /api/tag/index 按需获取
+    """
     if language not in ["chinese", "english"]:
         language = "chinese"
 
@@ -116,13 +166,16 @@ async def get_next_unreviewed(current_tag_name: str, language: str = "chinese"):
     if not tag:
         raise HTTPException(status_code=404, detail="No more unreviewed tags")
 
-    index = storage.get_tag_index(tag.name, language)
-    return JSONResponse(content={"index": index, **tag.to_dict()})
+    return JSONResponse(content={"index": None, **tag.to_dict()})
 
 
 @app.get("/api/tag/prev-unreviewed")
 async def get_prev_unreviewed(current_tag_name: str, language: str = "chinese"):
-    """获取上一个未审核标签"""
+    """获取上一个未审核标签
+
+    只做键集定位，不计算位置（同频率分组很大时计数耗时随位置增长），
+    index 为 null，由前端通过 /api/tag/index 按需获取
+    """
     if language not in ["chinese", "english"]:
         language = "chinese"
 
@@ -131,8 +184,7 @@ async def get_prev_unreviewed(current_tag_name: str, language: str = "chinese"):
     if not tag:
         return JSONResponse(content=None)
 
-    index = storage.get_tag_index(tag.name, language)
-    return JSONResponse(content={"index": index, **tag.to_dict()})
+    return JSONResponse(content={"index": None, **tag.to_dict()})
 
 
 @app.post("/api/tag/update")